@@ -0,0 +1,21 @@
+"""
+ASGI config for app project.
+
+It exposes the ASGI callable as a module-level variable named
+``application``. Serve it from the gunicorn production profile with
+uvicorn workers:
+
+    DJANGO_ENV=production \
+    GUNICORN_WORKER_CLASS=uvicorn.workers.UvicornWorker \
+    gunicorn -c gunicorn.conf.py app.asgi
+"""
+
+import os
+
+from django.core.wsgi import get_wsgi_application
+
+from core.asgi import ASGIHandler
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
+
+application = ASGIHandler(get_wsgi_application())
@@ -0,0 +1,19 @@
+"""
+Settings of the environment named by DJANGO_ENV
+
+base holds what every environment shares, and development (the default)
+or production override it.
+"""
+import os
+
+from django.core.exceptions import ImproperlyConfigured
+
+
+DJANGO_ENV = os.environ.get('DJANGO_ENV', 'development')
+
+if DJANGO_ENV == 'development':
+    from .development import *  # noqa
+elif DJANGO_ENV == 'production':
+    from .production import *  # noqa
+else:
+    raise ImproperlyConfigured(f'Unknown DJANGO_ENV {DJANGO_ENV!r}')
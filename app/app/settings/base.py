@@ -0,0 +1,257 @@
+
+
+import os
+
+# Build paths inside the project like this: os.path.join(BASE_DIR, ...)
+BASE_DIR = os.path.dirname(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+)
+
+
+# Settings shared by every environment, development and production
+# override them
+# See https://docs.djangoproject.com/en/2.1/howto/deployment/checklist/
+
+# SECURITY WARNING: keep the secret key used in production secret!
+SECRET_KEY = os.environ.get('DJANGO_SECRET_KEY')
+
+# SECURITY WARNING: don't run with debug turned on in production!
+DEBUG = False
+
+ALLOWED_HOSTS = [
+    host for host in os.environ.get('DJANGO_ALLOWED_HOSTS', '').split(',')
+    if host
+]
+
+
+# Application definition
+
+INSTALLED_APPS = [
+    'django.contrib.admin',
+    'django.contrib.auth',
+    'django.contrib.contenttypes',
+    'django.contrib.sessions',
+    'django.contrib.messages',
+    'django.contrib.staticfiles',
+    'rest_framework',
+    'rest_framework.authtoken',
+    'core',
+    'user',
+    'recipe',
+]
+
+MIDDLEWARE = [
+    # First, so the time of every other middleware is included
+    'core.middleware.MetricsMiddleware',
+    'django.middleware.security.SecurityMiddleware',
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'django.middleware.common.CommonMiddleware',
+    'django.middleware.csrf.CsrfViewMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+]
+
+ROOT_URLCONF = 'app.urls'
+
+TEMPLATES = [
+    {
+        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'DIRS': [],
+        'APP_DIRS': True,
+        'OPTIONS': {
+            'context_processors': [
+                'django.template.context_processors.debug',
+                'django.template.context_processors.request',
+                'django.contrib.auth.context_processors.auth',
+                'django.contrib.messages.context_processors.messages',
+            ],
+        },
+    },
+]
+
+WSGI_APPLICATION = 'app.wsgi.application'
+
+# Threads of each app.asgi worker process that run the (synchronous)
+# views, each holds one database connection so keep it within the pool
+ASGI_THREADS = int(os.environ.get('ASGI_THREADS', 10))
+
+
+# Database
+# https://docs.djangoproject.com/en/2.1/ref/settings/#databases
+
+DATABASES = {
+    'default': {
+        # Set DB_ENGINE=core.db.pooled to check connections out of an
+        # in-process pool sized by POOL, use it with DB_CONN_MAX_AGE=0 so
+        # connections go back to the pool after each request
+        'ENGINE': os.environ.get('DB_ENGINE', 'django.db.backends.postgresql'),
+        'HOST': os.environ.get('DB_HOST'),
+        'NAME': os.environ.get('DB_NAME'),
+        'USER': os.environ.get('DB_USER'),
+        'PASSWORD': os.environ.get('DB_PASS'),
+        # Seconds to keep a connection open between requests
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+        # Ping reused connections so a dropped one is replaced, not used
+        'CONN_HEALTH_CHECKS': os.environ.get('DB_CONN_HEALTH_CHECKS') != '0',
+        'POOL': {
+            'MIN_SIZE': int(os.environ.get('DB_POOL_MIN_SIZE', 1)),
+            'MAX_SIZE': int(os.environ.get('DB_POOL_MAX_SIZE', 10)),
+            'TIMEOUT': float(os.environ.get('DB_POOL_TIMEOUT', 30)),
+        },
+        # Required behind pgbouncer in transaction pooling mode
+        'DISABLE_SERVER_SIDE_CURSORS':
+            os.environ.get('DB_PGBOUNCER_TRANSACTION_MODE') == '1',
+    }
+}
+
+
+# Password validation
+# https://docs.djangoproject.com/en/2.1/ref/settings/#auth-password-validators
+
+AUTH_PASSWORD_VALIDATORS = [
+    {
+        'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.CommonPasswordValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.NumericPasswordValidator',
+    },
+]
+
+# New passwords are hashed with PASSWORD_HASHER (argon2, bcrypt or pbkdf2),
+# hashes made with another hasher or cost are upgraded on the next login.
+# core.hashers runs the hashing on WORKERS threads (CPUs by default), with
+# up to MAX_PENDING more waiting at most TIMEOUT seconds before a 503
+PASSWORD_HASHER = os.environ.get('PASSWORD_HASHER', 'argon2')
+_PASSWORD_HASHERS = {
+    'argon2': 'core.hashers.Argon2PasswordHasher',
+    'bcrypt': 'core.hashers.BCryptSHA256PasswordHasher',
+    'pbkdf2': 'core.hashers.PBKDF2PasswordHasher',
+}
+PASSWORD_HASHERS = [_PASSWORD_HASHERS[PASSWORD_HASHER]] + [
+    hasher for name, hasher in sorted(_PASSWORD_HASHERS.items())
+    if name != PASSWORD_HASHER
+]
+PASSWORD_HASHING = {
+    'WORKERS': int(os.environ.get('PASSWORD_HASH_WORKERS', 0)) or None,
+    'MAX_PENDING': int(os.environ.get('PASSWORD_HASH_MAX_PENDING', 64)),
+    'TIMEOUT': int(os.environ.get('PASSWORD_HASH_TIMEOUT', 10)),
+    'PBKDF2_ITERATIONS': int(
+        os.environ.get('PASSWORD_PBKDF2_ITERATIONS', 0)
+    ) or None,
+    'ARGON2_TIME_COST': int(os.environ.get('PASSWORD_ARGON2_TIME_COST', 2)),
+    'ARGON2_MEMORY_COST': int(
+        os.environ.get('PASSWORD_ARGON2_MEMORY_COST', 19456)
+    ),
+    'ARGON2_PARALLELISM': int(
+        os.environ.get('PASSWORD_ARGON2_PARALLELISM', 1)
+    ),
+    'BCRYPT_ROUNDS': int(os.environ.get('PASSWORD_BCRYPT_ROUNDS', 12)),
+}
+
+# Failed logins counted per client address and per email by
+# core.throttling.LoginThrottle in the BACKEND CACHES alias. Past a limit
+# /api/user/token/ answers 429 without hashing until the WINDOW is over
+LOGIN_THROTTLE = {
+    'BACKEND': os.environ.get('LOGIN_THROTTLE_BACKEND', 'default') or None,
+    'WINDOW': int(os.environ.get('LOGIN_THROTTLE_WINDOW', 300)),
+    'ADDRESS_LIMIT': int(os.environ.get('LOGIN_THROTTLE_ADDRESS_LIMIT', 50)),
+    'EMAIL_LIMIT': int(os.environ.get('LOGIN_THROTTLE_EMAIL_LIMIT', 10)),
+}
+
+
+# Internationalization
+# https://docs.djangoproject.com/en/2.1/topics/i18n/
+
+LANGUAGE_CODE = 'en-us'
+
+TIME_ZONE = 'UTC'
+
+USE_I18N = True
+
+USE_L10N = True
+
+USE_TZ = True
+
+
+# Static files (CSS, JavaScript, Images)
+# https://docs.djangoproject.com/en/2.1/howto/static-files/
+
+
+STATIC_URL = '/static/'
+MEDIA_URL = '/media/'
+MEDIA_ROOT = '/vol/web/media'
+STATIC_ROOT = 'vol/web/static'
+
+AUTH_USER_MODEL = 'core.MyUser'
+
+# Uploaded recipe images are rendered by recipe.images on a pool of
+# RECIPE_IMAGE_WORKERS threads, scaled to fit each of RECIPE_IMAGE_SIZES
+RECIPE_IMAGE_WORKERS = int(os.environ.get('RECIPE_IMAGE_WORKERS', 2))
+RECIPE_IMAGE_SIZES = (160, 480, 1080, 2048)
+RECIPE_IMAGE_QUALITY = 85
+# Let the web server send rendition files: '' streams them from Django,
+# 'x-accel-redirect' (nginx) or 'x-sendfile' (Apache, lighttpd) hand the
+# file over in a header. nginx maps RECIPE_IMAGE_ACCEL_PREFIX to MEDIA_ROOT
+# as an internal location.
+RECIPE_IMAGE_SENDFILE = os.environ.get('RECIPE_IMAGE_SENDFILE', '')
+RECIPE_IMAGE_ACCEL_PREFIX = '/protected-media/'
+
+REST_FRAMEWORK = {
+    # Default page size for list endpoints, clients may ask for up to the
+    # max_page_size of the pagination class with ?page_size=
+    'PAGE_SIZE': int(os.environ.get('API_PAGE_SIZE', 50)),
+    # Proxies in front of the app, each appending to X-Forwarded-For. The
+    # throttles identify clients by the address the first proxy saw, or by
+    # REMOTE_ADDR with 0, so clients cannot pick their own address
+    'NUM_PROXIES': int(os.environ.get('DJANGO_NUM_PROXIES') or 0),
+}
+
+# Token -> user lookups cached by core.authentication.CachedTokenAuthentication
+# BACKEND names a CACHES alias to share entries between worker processes
+TOKEN_AUTH_CACHE = {
+    'MAX_SIZE': int(os.environ.get('TOKEN_AUTH_CACHE_SIZE', 10000)),
+    'TTL': int(os.environ.get('TOKEN_AUTH_CACHE_TTL', 60)),
+    'BACKEND': os.environ.get('TOKEN_AUTH_CACHE_BACKEND') or None,
+}
+
+# CACHE_BACKEND takes any Django cache backend: the process local default,
+# django.core.cache.backends.filebased.FileBasedCache with a directory as
+# CACHE_LOCATION, or a Redis/memcached backend with its server url
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
+    }
+}
+
+# List and retrieve responses cached by the core.cache view mixins in
+# the BACKEND CACHES alias, None turns the cache off
+RESPONSE_CACHE = {
+    'BACKEND': os.environ.get('RESPONSE_CACHE_BACKEND', 'default') or None,
+    'TIMEOUT': int(os.environ.get('RESPONSE_CACHE_TIMEOUT', 300)),
+}
+
+# Request metrics of core.middleware.MetricsMiddleware, served at /metrics
+# in the Prometheus format. TOKEN makes /metrics require it as a Bearer
+# token, SERVER_TIMING adds a Server-Timing header to every response and
+# statements run REPEATED_QUERY_THRESHOLD times in one request are logged
+METRICS = {
+    'ENABLED': os.environ.get('METRICS_ENABLED', '1') == '1',
+    'SERVER_TIMING': os.environ.get('METRICS_SERVER_TIMING', '0') == '1',
+    'REPEATED_QUERY_THRESHOLD': int(
+        os.environ.get('METRICS_REPEATED_QUERY_THRESHOLD', 5)
+    ),
+    'TOKEN': os.environ.get('METRICS_TOKEN') or None,
+}
+
+# Pagination classes are set per viewset, PAGE_SIZE only sets their default
+SILENCED_SYSTEM_CHECKS = ['rest_framework.W001']
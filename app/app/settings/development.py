@@ -0,0 +1,9 @@
+from .base import *  # noqa
+
+
+SECRET_KEY = os.environ.get(
+    'DJANGO_SECRET_KEY', '#oub_%^vh5$jiedtllb$y2g7k&gl4bvjkq8p$don3f$1mdcvxa'
+)
+
+# Records every query in memory, never serve real traffic with it
+DEBUG = True
@@ -0,0 +1,44 @@
+from django.core.exceptions import ImproperlyConfigured
+
+from .base import *  # noqa
+
+
+if not SECRET_KEY:
+    raise ImproperlyConfigured('DJANGO_SECRET_KEY must be set in production')
+if not ALLOWED_HOSTS:
+    raise ImproperlyConfigured(
+        'DJANGO_ALLOWED_HOSTS must list the served host names in production'
+    )
+
+DEBUG = False
+
+# /metrics is only served behind a bearer token, and is off without one
+METRICS['ENABLED'] = os.environ.get(
+    'METRICS_ENABLED', '1' if METRICS['TOKEN'] else '0'
+) == '1'
+if METRICS['ENABLED'] and not METRICS['TOKEN']:
+    raise ImproperlyConfigured(
+        'METRICS_TOKEN must be set to enable metrics in production'
+    )
+
+# Behind a proxy terminating TLS, which sets X-Forwarded-Proto
+if os.environ.get('DJANGO_BEHIND_TLS_PROXY') == '1':
+    SECURE_PROXY_SSL_HEADER = ('HTTP_X_FORWARDED_PROTO', 'https')
+    SESSION_COOKIE_SECURE = True
+    CSRF_COOKIE_SECURE = True
+    REST_FRAMEWORK['NUM_PROXIES'] = int(
+        os.environ.get('DJANGO_NUM_PROXIES') or 1
+    )
+
+# Errors go to stderr, where the process manager collects them
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'root': {
+        'handlers': ['console'],
+        'level': os.environ.get('DJANGO_LOG_LEVEL', 'WARNING'),
+    },
+}
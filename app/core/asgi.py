@@ -0,0 +1,164 @@
+import asyncio
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+
+class ASGIHandler:
+    """
+    Serve a WSGI application, Django's, over ASGI
+
+    Django 2.1 views are synchronous, so they run on a pool of
+    ASGI_THREADS threads, each with its own database connection. What
+    waits on the client happens on the event loop instead: the request
+    body is received before a thread is taken and the response is sent
+    after it is given back, so a slow client costs a coroutine rather than
+    a thread. Streaming responses are read on the thread that made them,
+    as their iterator may hold a server side cursor.
+    """
+
+    def __init__(self, application, threads=None):
+        self.application = application
+        self.executor = ThreadPoolExecutor(
+            max_workers=threads or settings.ASGI_THREADS,
+            thread_name_prefix='asgi'
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            raise ValueError(f"Unsupported ASGI scope type {scope['type']}")
+
+        body = await self.read_body(receive)
+        if body is None:
+            # The client went away before sending its request
+            return
+        loop = asyncio.get_event_loop()
+        try:
+            start, content = await loop.run_in_executor(
+                self.executor, self.run, self.environ(scope, body), loop,
+                send
+            )
+        finally:
+            body.close()
+        if content is not None:
+            await send(start)
+            await send({'type': 'http.response.body', 'body': content})
+
+    async def lifespan(self, receive, send):
+        """Answer the server's startup and shutdown events"""
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await asyncio.get_event_loop().run_in_executor(
+                    None, self.executor.shutdown
+                )
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def read_body(self, receive):
+        """Return the request body as a file, None if the client left"""
+        body = tempfile.SpooledTemporaryFile(
+            max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE
+        )
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                body.close()
+                return None
+            body.write(message.get('body', b''))
+            if not message.get('more_body', False):
+                break
+        body.seek(0)
+        return body
+
+    def environ(self, scope, body):
+        """Return the WSGI environ of an ASGI HTTP scope"""
+        server = scope.get('server') or ('localhost', 80)
+        client = scope.get('client') or ('', 0)
+        environ = {
+            'REQUEST_METHOD': scope['method'],
+            'SCRIPT_NAME': _latin1(scope.get('root_path', '')),
+            'PATH_INFO': _latin1(scope['path']),
+            'QUERY_STRING': scope.get('query_string', b'').decode('latin1'),
+            'SERVER_NAME': server[0],
+            'SERVER_PORT': str(server[1]),
+            'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+            'REMOTE_ADDR': client[0],
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': scope.get('scheme', 'http'),
+            'wsgi.input': body,
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': True,
+            'wsgi.run_once': False,
+        }
+        for name, value in scope.get('headers', []):
+            name = name.decode('latin1')
+            value = value.decode('latin1')
+            if name == 'content-type':
+                key = 'CONTENT_TYPE'
+            elif name == 'content-length':
+                key = 'CONTENT_LENGTH'
+            else:
+                key = 'HTTP_' + name.upper().replace('-', '_')
+            if key in environ:
+                value = f'{environ[key]},{value}'
+            environ[key] = value
+        if 'CONTENT_LENGTH' not in environ:
+            # Chunked bodies arrive without a length, Django reads none
+            environ['CONTENT_LENGTH'] = str(body.seek(0, 2))
+            body.seek(0)
+        return environ
+
+    def run(self, environ, loop, send):
+        """
+        Run the application on a pool thread
+
+        Returns the response start message and its body, or a None body
+        when a streaming response was already sent from this thread.
+        """
+        started = {}
+
+        def start_response(status, headers, exc_info=None):
+            started.update({
+                'type': 'http.response.start',
+                'status': int(status.split(' ', 1)[0]),
+                'headers': [
+                    (name.lower().encode('latin1'), value.encode('latin1'))
+                    for name, value in headers
+                ],
+            })
+
+        response = self.application(environ, start_response)
+        try:
+            if not getattr(response, 'streaming', False):
+                return started, b''.join(response)
+
+            def send_from_thread(message):
+                asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+            send_from_thread(started)
+            for chunk in response:
+                if chunk:
+                    send_from_thread({'type': 'http.response.body',
+                                      'body': chunk, 'more_body': True})
+            send_from_thread({'type': 'http.response.body'})
+            return started, None
+        finally:
+            # Fires request_finished, which returns this thread's database
+            # connection
+            close = getattr(response, 'close', None)
+            if close is not None:
+                close()
+
+
+def _latin1(value):
+    """Return a str of the latin-1 decoded UTF-8 bytes, as WSGI wants"""
+    return value.encode('utf8').decode('latin1')
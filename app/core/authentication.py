@@ -0,0 +1,132 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.authentication import TokenAuthentication
+
+
+DEFAULT_TOKEN_AUTH_CACHE = {
+    'MAX_SIZE': 10000,
+    'TTL': 60,
+    'BACKEND': None,
+}
+
+
+class TokenCache:
+    """
+    Bounded, thread safe LRU of token key -> (user, token) with a TTL
+
+    When TOKEN_AUTH_CACHE['BACKEND'] names a CACHES alias, entries are also
+    stored there so processes can share them and invalidations reach every
+    process. The local LRU then only saves the round trip to that cache,
+    and TTL bounds how long it can serve an entry after an invalidation.
+    """
+    key_prefix = 'token-auth:'
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def config(self):
+        config = dict(DEFAULT_TOKEN_AUTH_CACHE)
+        config.update(getattr(settings, 'TOKEN_AUTH_CACHE', {}))
+        return config
+
+    @property
+    def backend(self):
+        alias = self.config['BACKEND']
+        return caches[alias] if alias else None
+
+    def get(self, key):
+        """Return the cached (user, token) for key or None"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return copy.deepcopy(entry[1])
+                del self._entries[key]
+
+        value = None
+        if self.backend is not None:
+            value = self.backend.get(self.key_prefix + key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        self._store(key, value)
+        return copy.deepcopy(value)
+
+    def set(self, key, value):
+        """Cache (user, token) for key"""
+        if self.backend is not None:
+            self.backend.set(
+                self.key_prefix + key, value, self.config['TTL']
+            )
+        self._store(key, value)
+
+    def delete(self, key):
+        """Drop key from the local and shared caches"""
+        with self._lock:
+            self._entries.pop(key, None)
+        if self.backend is not None:
+            self.backend.delete(self.key_prefix + key)
+
+    def clear(self):
+        """Drop every local entry and reset the counters"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        """Return the hit and miss counters"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+            }
+
+    def _store(self, key, value):
+        config = self.config
+        expires = time.monotonic() + config['TTL']
+        with self._lock:
+            self._entries[key] = (expires, copy.deepcopy(value))
+            self._entries.move_to_end(key)
+            while len(self._entries) > config['MAX_SIZE']:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+
+token_cache = TokenCache()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Token authentication that caches token -> user lookups
+
+    Valid tokens are kept in token_cache so repeated requests skip the
+    token/user query. Entries are dropped by the signal handlers in
+    core.signals when a token is deleted or its user is saved or deleted.
+    """
+
+    def authenticate_credentials(self, key):
+        cached = token_cache.get(key)
+        if cached is not None:
+            return cached
+        user, token = super().authenticate_credentials(key)
+        token_cache.set(key, (user, token))
+        return user, token
@@ -0,0 +1,274 @@
+import datetime
+import http.client
+import json
+import math
+import platform
+import socket
+import statistics
+import subprocess
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+import django
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+
+class Scenario:
+    """
+    A request to time repeatedly
+
+    path and data are called with the iteration number, so requests
+    that consume what they act on, like deletes, can each get their own
+    object. Any other keyword is passed on to the client method.
+    """
+
+    def __init__(self, name, route, client, method, path, data=None,
+                 **extra):
+        self.name = name
+        self.route = route
+        self.client = client
+        self.method = method
+        self.path = path
+        self.data = data
+        self.extra = extra
+
+    def request(self, i):
+        """Send the request of iteration i and return the response"""
+        kwargs = dict(self.extra)
+        if self.data is not None:
+            kwargs['data'] = self.data(i)
+        response = getattr(self.client, self.method)(self.path(i), **kwargs)
+        if response.streaming:
+            # Streamed bodies are only produced as they are read
+            b''.join(response.streaming_content)
+        return response
+
+
+def percentile(values, pct):
+    """Return the nearest-rank percentile of values"""
+    ordered = sorted(values)
+    rank = max(math.ceil(pct / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+def run_scenario(scenario, repeat, warmup=1):
+    """
+    Time repeat requests of a scenario and return their statistics
+
+    Latency and queries are recorded for every timed request.
+    Allocations are traced on one extra request only, since tracing
+    slows everything it watches.
+    """
+    for i in range(warmup):
+        scenario.request(i)
+    timings = []
+    queries = []
+    statuses = set()
+    for i in range(warmup, warmup + repeat):
+        with CaptureQueriesContext(connection) as captured:
+            start = time.perf_counter()
+            response = scenario.request(i)
+            timings.append((time.perf_counter() - start) * 1000)
+        queries.append(len(captured))
+        statuses.add(response.status_code)
+
+    tracemalloc.start()
+    try:
+        scenario.request(warmup + repeat)
+        allocated = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'route': scenario.route,
+        'method': scenario.method.upper(),
+        'requests': repeat,
+        'status': sorted(statuses),
+        'p50_ms': round(percentile(timings, 50), 3),
+        'p95_ms': round(percentile(timings, 95), 3),
+        'p99_ms': round(percentile(timings, 99), 3),
+        'mean_ms': round(sum(timings) / repeat, 3),
+        'queries': round(sum(queries) / repeat, 2),
+        'peak_alloc_kb': round(allocated / 1024, 1),
+    }
+
+
+def get_view(viewset, user, action='list', params=None):
+    """Return a viewset instance handling a GET of params by user"""
+    request = Request(APIRequestFactory().get('/', params or {}))
+    request.user = user
+    return viewset(
+        request=request, action=action, format_kwarg=None, kwargs={}
+    )
+
+
+def first_page(view, queryset=None):
+    """Return queryset, or the view's, limited to what one page fetches"""
+    if queryset is None:
+        queryset = view.get_queryset()
+    paginator = view.paginator
+    ordering = paginator.get_ordering(view.request, queryset, view)
+    # The paginator fetches one extra row to find the next page
+    return queryset.order_by(*ordering)[:paginator.page_size + 1]
+
+
+def time_queryset(name, queryset, repeat):
+    """Time evaluating queryset and return its median and worst run"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        rows = len(list(queryset.all()))
+        timings.append((time.perf_counter() - start) * 1000)
+    return (
+        f'{name:<32} rows={rows:<6} '
+        f'median={statistics.median(timings):.2f}ms '
+        f'max={max(timings):.2f}ms'
+    )
+
+
+def environment():
+    """Return what a result depends on besides the code under test"""
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL, universal_newlines=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'commit': commit,
+        'created': datetime.datetime.utcnow().isoformat() + 'Z',
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'database': connection.vendor,
+        'machine': platform.machine(),
+    }
+
+
+def compare(baseline, results, threshold=10):
+    """
+    Yield (name, metric, before, after, regressed) for shared scenarios
+
+    Latencies regress when they grow by more than threshold percent,
+    query counts and allocations whenever they grow at all.
+    """
+    for name, after in results.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        for metric in ('p50_ms', 'p95_ms', 'p99_ms', 'queries',
+                       'peak_alloc_kb'):
+            if metric not in before:
+                continue
+            if metric.endswith('_ms'):
+                limit = before[metric] * (1 + threshold / 100)
+            elif metric == 'peak_alloc_kb':
+                # Allowing for the noise of the allocator
+                limit = before[metric] * 1.05
+            else:
+                limit = before[metric]
+            yield (name, metric, before[metric], after[metric],
+                   after[metric] > limit)
+
+
+def load(path):
+    """Return the scenario results stored in a benchmark JSON file"""
+    with open(path) as f:
+        return json.load(f)['results']
+
+
+def drive(url, duration=10, concurrency=8, headers=None):
+    """
+    GET url from concurrency threads for duration seconds over HTTP
+
+    Each thread reuses one keep-alive connection where the server allows
+    it. Returns the request rate, latency percentiles and status counts.
+    """
+    parts = urlsplit(url)
+    path = parts.path + (f'?{parts.query}' if parts.query else '')
+    deadline = time.perf_counter() + duration
+    timings = []
+    statuses = Counter()
+    lock = threading.Lock()
+
+    def worker():
+        conn = http.client.HTTPConnection(parts.netloc, timeout=30)
+        local_timings = []
+        local_statuses = Counter()
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                conn.request('GET', path, headers=headers or {})
+                response = conn.getresponse()
+                response.read()
+                status = response.status
+            except (OSError, http.client.HTTPException):
+                conn.close()
+                status = 'error'
+            local_timings.append((time.perf_counter() - start) * 1000)
+            local_statuses[status] += 1
+        conn.close()
+        with lock:
+            timings.extend(local_timings)
+            statuses.update(local_statuses)
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return {
+        'requests': len(timings),
+        'rps': round(len(timings) / elapsed, 1),
+        'p50_ms': round(percentile(timings, 50), 3) if timings else None,
+        'p99_ms': round(percentile(timings, 99), 3) if timings else None,
+        'status': {str(key): count for key, count in statuses.items()},
+    }
+
+
+@contextmanager
+def slow_clients(url, count, interval=0.5):
+    """
+    Hold count connections to url open, sending headers at a trickle
+
+    Each connection sends a request line and then one header every
+    interval seconds without ever finishing the request, the way clients
+    on slow or stalled networks do. Closed connections are reopened until
+    the block exits.
+    """
+    parts = urlsplit(url)
+    host, port = parts.hostname, parts.port or 80
+    stop = threading.Event()
+
+    def client():
+        while not stop.is_set():
+            try:
+                with socket.create_connection((host, port), timeout=5) as s:
+                    s.sendall(f'GET {parts.path} HTTP/1.1\r\n'
+                              f'Host: {parts.netloc}\r\n'.encode())
+                    while not stop.wait(interval):
+                        s.sendall(b'X-Slow: 1\r\n')
+            except OSError:
+                stop.wait(interval)
+
+    threads = [threading.Thread(target=client, daemon=True)
+               for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    try:
+        # Let the connections reach the server before measuring
+        time.sleep(interval)
+        yield
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
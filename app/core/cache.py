@@ -0,0 +1,161 @@
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from rest_framework.response import Response
+
+
+DEFAULT_RESPONSE_CACHE = {
+    'BACKEND': 'default',
+    'TIMEOUT': 300,
+}
+
+
+class ResponseCache:
+    """
+    Per user cache of serialized API responses
+
+    Entries are keyed on the user's generation counter, which the signal
+    handlers in core.signals bump whenever one of the user's recipes, tags
+    or ingredients changes. Bumping it orphans every entry of that user at
+    once, and the orphans age out of the cache backend by TIMEOUT.
+    """
+    key_prefix = 'response-cache:'
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def config(self):
+        config = dict(DEFAULT_RESPONSE_CACHE)
+        config.update(getattr(settings, 'RESPONSE_CACHE', {}))
+        return config
+
+    @property
+    def backend(self):
+        alias = self.config['BACKEND']
+        return caches[alias] if alias else None
+
+    def generation(self, user_id):
+        """Return the user's current generation"""
+        key = self._generation_key(user_id)
+        generation = self.backend.get(key)
+        if generation is None:
+            # Start from the clock rather than 0 so a counter evicted from
+            # the backend never comes back at a value it had before
+            self.backend.add(key, time.time_ns(), None)
+            generation = self.backend.get(key)
+        return generation
+
+    def bump(self, user_id):
+        """Invalidate every cached response of the user on commit"""
+        # Bumped before the change commits, a concurrent request could
+        # still read the old rows and cache them under the new generation
+        transaction.on_commit(lambda: self._bump(user_id))
+
+    def _bump(self, user_id):
+        backend = self.backend
+        if backend is None:
+            return
+        key = self._generation_key(user_id)
+        try:
+            backend.incr(key)
+        except ValueError:
+            backend.set(key, time.time_ns(), None)
+
+    def key(self, user_id, *parts):
+        """Return the entry key for parts of a request by user"""
+        digest = hashlib.sha1(
+            '\n'.join(str(part) for part in parts).encode()
+        ).hexdigest()
+        generation = self.generation(user_id)
+        return f'{self.key_prefix}{user_id}:{generation}:{digest}'
+
+    def get(self, key):
+        """Return the cached data for key or None"""
+        data = self.backend.get(key)
+        with self._lock:
+            if data is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return data
+
+    def set(self, key, data):
+        """Cache data under key"""
+        self.backend.set(key, data, self.config['TIMEOUT'])
+
+    def clear(self):
+        """Reset the counters"""
+        with self._lock:
+            self.hits = self.misses = 0
+
+    def stats(self):
+        """Return the hit and miss counters"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+            }
+
+    def _generation_key(self, user_id):
+        return f'{self.key_prefix}{user_id}:generation'
+
+
+response_cache = ResponseCache()
+
+
+class CachedResponseMixin:
+    """
+    Serve a viewset action from response_cache
+
+    The serialized data is cached per user and full request url, so
+    repeated polls skip the queries and serialization until the user's
+    data changes. Responses carry X-Cache: HIT or MISS.
+    """
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        """Return the cached response of handler, calling it on a miss"""
+        if response_cache.backend is None:
+            return handler(request, *args, **kwargs)
+
+        key = response_cache.key(
+            request.user.pk,
+            type(self).__name__,
+            request.build_absolute_uri(),
+            request.accepted_media_type
+        )
+        data = response_cache.get(key)
+        if data is not None:
+            response = Response(data)
+            response['X-Cache'] = 'HIT'
+            return response
+
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            response_cache.set(key, response.data)
+        response['X-Cache'] = 'MISS'
+        return response
+
+
+class CachedListMixin(CachedResponseMixin):
+    """Cache the responses of the list action"""
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+
+class CachedRetrieveMixin(CachedResponseMixin):
+    """Cache the responses of the retrieve action"""
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            super().retrieve, request, *args, **kwargs
+        )
@@ -0,0 +1,151 @@
+import threading
+import time
+from collections import deque
+
+from django.core.exceptions import ImproperlyConfigured
+
+
+class PoolTimeout(Exception):
+    """No connection became free within the pool timeout"""
+
+
+class ConnectionPool:
+    """
+    Thread safe pool of DB-API connections
+
+    Keeps up to max_size connections open, min_size of them from the
+    start. getconn() hands out an idle connection, opens a new one while
+    below max_size, or waits up to timeout seconds for one to be returned.
+    Connections that are closed or fail the health check are replaced
+    rather than handed out.
+    """
+
+    def __init__(self, connect, min_size=1, max_size=10, timeout=30,
+                 health_check=None, reset=None):
+        if not 0 <= min_size <= max_size or max_size < 1:
+            raise ImproperlyConfigured(
+                'Pool sizes must satisfy 0 <= MIN_SIZE <= MAX_SIZE, '
+                '1 <= MAX_SIZE'
+            )
+        self.connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.health_check = health_check
+        self.reset = reset
+        self._idle = deque()
+        self._size = 0
+        self._cond = threading.Condition()
+        self.checkouts = 0
+        self.waits = 0
+        self.wait_time = 0.0
+        self.max_wait_time = 0.0
+        self.timeouts = 0
+        self.discarded = 0
+        for _ in range(min_size):
+            self._idle.append(self.connect())
+            self._size += 1
+
+    def getconn(self):
+        """Check out a healthy connection"""
+        start = time.monotonic()
+        waited = False
+        with self._cond:
+            while True:
+                if self._idle:
+                    conn = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    self._size += 1
+                    conn = None
+                    break
+                remaining = self.timeout - (time.monotonic() - start)
+                if remaining <= 0:
+                    self.timeouts += 1
+                    raise PoolTimeout(
+                        f'No connection available after {self.timeout}s'
+                    )
+                waited = True
+                self._cond.wait(remaining)
+
+            elapsed = time.monotonic() - start
+            self.checkouts += 1
+            if waited:
+                self.waits += 1
+            self.wait_time += elapsed
+            self.max_wait_time = max(self.max_wait_time, elapsed)
+
+        if conn is not None and not self._healthy(conn):
+            self._close(conn)
+            self.discarded += 1
+            conn = None
+        if conn is None:
+            try:
+                conn = self.connect()
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                    self._cond.notify()
+                raise
+        return conn
+
+    def putconn(self, conn):
+        """Return a connection, closing it if it cannot be reused"""
+        reusable = not getattr(conn, 'closed', False)
+        if reusable and self.reset is not None:
+            try:
+                self.reset(conn)
+            except Exception:
+                reusable = False
+        with self._cond:
+            if reusable:
+                self._idle.append(conn)
+            else:
+                self._size -= 1
+                self.discarded += 1
+            self._cond.notify()
+        if not reusable:
+            self._close(conn)
+
+    def close(self):
+        """Close every idle connection"""
+        with self._cond:
+            idle = list(self._idle)
+            self._idle.clear()
+            self._size -= len(idle)
+            self._cond.notify_all()
+        for conn in idle:
+            self._close(conn)
+
+    def stats(self):
+        """Return the pool size and checkout metrics"""
+        with self._cond:
+            return {
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': self._size - len(self._idle),
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+                'checkouts': self.checkouts,
+                'waits': self.waits,
+                'wait_time': self.wait_time,
+                'max_wait_time': self.max_wait_time,
+                'timeouts': self.timeouts,
+                'discarded': self.discarded,
+            }
+
+    def _healthy(self, conn):
+        if getattr(conn, 'closed', False):
+            return False
+        if self.health_check is None:
+            return True
+        try:
+            return self.health_check(conn)
+        except Exception:
+            return False
+
+    def _close(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
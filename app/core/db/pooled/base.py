@@ -0,0 +1,107 @@
+"""
+PostgreSQL backend that checks connections out of an in-process pool
+
+Set ENGINE to 'core.db.pooled' and size the pool with the POOL key of the
+database settings (MIN_SIZE, MAX_SIZE and TIMEOUT in seconds). With
+CONN_HEALTH_CHECKS set, idle connections are pinged before being
+reused. Django closes the connection at the end of each request when
+CONN_MAX_AGE is 0, which here returns it to the pool.
+"""
+import threading
+
+from django.db.backends.postgresql import base
+from django.db.backends.postgresql.creation import DatabaseCreation
+from psycopg2 import extensions
+
+from core.db.pool import ConnectionPool
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def _ping(conn):
+    """Return True if the connection answers a trivial query"""
+    with conn.cursor() as cursor:
+        cursor.execute('SELECT 1')
+    if not conn.autocommit:
+        conn.rollback()
+    return True
+
+
+def _reset(conn):
+    """Roll back anything left open before a connection is reused"""
+    status = conn.get_transaction_status()
+    if status == extensions.TRANSACTION_STATUS_UNKNOWN:
+        raise base.Database.OperationalError('connection is broken')
+    if status != extensions.TRANSACTION_STATUS_IDLE:
+        conn.rollback()
+
+
+def get_pool(alias, conn_params, settings_dict):
+    """Return the pool for a database, creating it on first use"""
+    options = settings_dict.get('POOL', {})
+    key = (alias, tuple(sorted(conn_params.items())))
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = ConnectionPool(
+                lambda: base.Database.connect(**conn_params),
+                min_size=options.get('MIN_SIZE', 1),
+                max_size=options.get('MAX_SIZE', 10),
+                timeout=options.get('TIMEOUT', 30),
+                health_check=(
+                    _ping if settings_dict.get('CONN_HEALTH_CHECKS') else None
+                ),
+                reset=_reset,
+            )
+        return pool
+
+
+def pool_stats():
+    """Return the stats of every pool keyed by alias and database name"""
+    with _pools_lock:
+        pools = list(_pools.items())
+    return {
+        (alias, dict(params).get('database')): pool.stats()
+        for (alias, params), pool in pools
+    }
+
+
+def close_pools(database=None):
+    """Close the idle connections of every pool, or those of a database"""
+    with _pools_lock:
+        pools = list(_pools.items())
+    for (alias, params), pool in pools:
+        if database is None or dict(params).get('database') == database:
+            pool.close()
+
+
+class PooledDatabaseCreation(DatabaseCreation):
+
+    def _destroy_test_db(self, test_database_name, verbosity):
+        # Idle pooled connections would block DROP DATABASE
+        close_pools(test_database_name)
+        super()._destroy_test_db(test_database_name, verbosity)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    creation_class = PooledDatabaseCreation
+
+    def get_new_connection(self, conn_params):
+        self.pool = get_pool(self.alias, conn_params, self.settings_dict)
+        connection = self.pool.getconn()
+        options = self.settings_dict['OPTIONS']
+        try:
+            self.isolation_level = options['isolation_level']
+        except KeyError:
+            self.isolation_level = connection.isolation_level
+        else:
+            if self.isolation_level != connection.isolation_level:
+                connection.set_session(isolation_level=self.isolation_level)
+        return connection
+
+    def _close(self):
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                self.pool.putconn(self.connection)
@@ -0,0 +1,241 @@
+from collections import OrderedDict
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db import models
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+from core.metrics import metrics
+
+
+# Fields whose value in a values() row is already what DRF would render
+PLAIN_FIELDS = (
+    serializers.IntegerField, serializers.CharField,
+    serializers.BooleanField,
+)
+
+
+class SparseFieldsetMixin:
+    """
+    Let list and retrieve callers choose fields with ?fields= or ?omit=
+
+    Both take comma separated serializer field names, the id is always
+    sent. The serializer drops the other fields, get_sparse_columns()
+    and get_sparse_relations() tell get_queryset() what to load, and
+    lists of plain columns are rendered straight from values() rows
+    without building a serializer per object.
+
+    Lists can also ?expand= the relations of expandable_fields, sending
+    each object's related objects in full rather than their ids, or
+    ?include= them, sending each related object once per page in an
+    included dictionary alongside the results. Both read the objects the
+    queryset prefetched.
+    """
+    sparse_actions = ('list', 'retrieve')
+    sparse_always = ('id',)
+    # Relation field name -> serializer of its objects
+    expandable_fields = {}
+
+    def get_sparse_fields(self):
+        """Return the names of the requested fields, None for all"""
+        if not hasattr(self, '_sparse_fields'):
+            self._sparse_fields = self._parse_sparse_fields()
+        return self._sparse_fields
+
+    def _parse_sparse_fields(self):
+        if self.action not in self.sparse_actions:
+            return None
+        params = self.request.query_params
+        fields, omit = params.get('fields'), params.get('omit')
+        if fields is None and omit is None:
+            return None
+        if fields is not None and omit is not None:
+            raise ValidationError(
+                {'fields': ['Use either fields or omit, not both.']}
+            )
+        param = 'fields' if fields is not None else 'omit'
+        names = {
+            name.strip() for name in params[param].split(',') if name.strip()
+        }
+        available = list(self._sparse_serializer().fields)
+        unknown = sorted(names.difference(available))
+        if unknown:
+            raise ValidationError(
+                {param: [f"Unknown fields: {', '.join(unknown)}."]}
+            )
+        # Expanded and included relations are sent whatever the fieldset
+        linked = self.get_expanded_fields() + self.get_included_fields()
+        if param == 'fields':
+            names.update(linked)
+        else:
+            names.difference_update(linked)
+        return tuple(
+            name for name in available
+            if name in self.sparse_always or (name in names) == (
+                param == 'fields'
+            )
+        )
+
+    def get_expanded_fields(self):
+        """Return the relations named by ?expand="""
+        return self._linked_fields('expand')
+
+    def get_included_fields(self):
+        """Return the relations named by ?include="""
+        return self._linked_fields('include')
+
+    def _linked_fields(self, param):
+        if self.action != 'list':
+            return ()
+        value = self.request.query_params.get(param)
+        if not value:
+            return ()
+        names = tuple(dict.fromkeys(
+            name.strip() for name in value.split(',') if name.strip()
+        ))
+        unknown = sorted(set(names).difference(self.expandable_fields))
+        if unknown:
+            raise ValidationError({param: [
+                f"Cannot {param} {', '.join(unknown)}, only "
+                f"{', '.join(sorted(self.expandable_fields))}."
+            ]})
+        return names
+
+    def _sparse_serializer(self):
+        """Return an unbound serializer to read the field definitions of"""
+        if not hasattr(self, '_sparse_definitions'):
+            self._sparse_definitions = self.get_serializer_class()(
+                context=self.get_serializer_context()
+            )
+        return self._sparse_definitions
+
+    def _sparse_model_fields(self, fields):
+        """Return {serializer field: model field or None} of fields"""
+        serializer_fields = self._sparse_serializer().fields
+        opts = self.queryset.model._meta
+        model_fields = {}
+        for name in fields:
+            try:
+                model_fields[name] = opts.get_field(
+                    serializer_fields[name].source
+                )
+            except FieldDoesNotExist:
+                model_fields[name] = None
+        return model_fields
+
+    def get_sparse_columns(self):
+        """Return the columns the requested fields need, None for all"""
+        fields = self.get_sparse_fields()
+        if fields is None:
+            return None
+        columns = [self.queryset.model._meta.pk.name]
+        for field in self._sparse_model_fields(fields).values():
+            if field is None:
+                # Computed from who knows what, load everything
+                return None
+            if field.concrete and not field.many_to_many and \
+                    field.name not in columns:
+                columns.append(field.name)
+        return columns
+
+    def get_sparse_relations(self, relations):
+        """Return which of relations the requested fields use"""
+        fields = self.get_sparse_fields()
+        if fields is None:
+            return relations
+        return tuple(relation for relation in relations if relation in fields)
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        target = getattr(serializer, 'child', serializer)
+        fields = self.get_sparse_fields()
+        if fields is not None:
+            for name in list(target.fields):
+                if name not in fields:
+                    target.fields.pop(name)
+        for name in self.get_expanded_fields():
+            target.fields[name] = self.expandable_fields[name](
+                many=True, read_only=True
+            )
+        if kwargs.get('many') and args:
+            # The listed objects, whose relations get_included() reads
+            self._listed = args[0]
+        return serializer
+
+    def get_included(self, objects):
+        """Return each included relation's distinct objects, by id"""
+        included = OrderedDict()
+        for name in self.get_included_fields():
+            related = {}
+            for obj in objects:
+                for item in getattr(obj, name).all():
+                    related[item.pk] = item
+            included[name] = self.expandable_fields[name](
+                sorted(related.values(), key=lambda item: item.pk),
+                many=True, context=self.get_serializer_context()
+            ).data
+        return included
+
+    def list(self, request, *args, **kwargs):
+        """Render lists of plain columns from values() rows"""
+        fields = self.get_sparse_fields()
+        sources = self._plain_columns(fields) if fields else None
+        if sources is None:
+            response = super().list(request, *args, **kwargs)
+            if self.get_included_fields():
+                data = response.data
+                if not isinstance(data, dict):
+                    data = response.data = OrderedDict(results=data)
+                data['included'] = self.get_included(self._listed)
+            return response
+
+        queryset = self.filter_queryset(self.get_queryset())
+        columns = list(sources.values())
+        if self.paginator is not None:
+            # The cursor is built from the ordering fields of the last row
+            columns.extend(
+                order.lstrip('-') for order in
+                self.paginator.get_ordering(request, queryset, self)
+            )
+        rows = queryset.values(*dict.fromkeys(columns))
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            rows = page
+
+        serializer_fields = self._sparse_serializer().fields
+        convert = {
+            name: serializer_fields[name].to_representation
+            for name in fields
+            if not isinstance(serializer_fields[name], PLAIN_FIELDS)
+        }
+        with metrics.timing('serialize'):
+            data = [
+                {name: _render(row[column], convert.get(name))
+                 for name, column in sources.items()}
+                for row in rows
+            ]
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
+
+    def _plain_columns(self, fields):
+        """
+        Return {field: column} if every field renders a stored column
+
+        Returns None if any is a relation, a file or not a column at all.
+        """
+        sources = {}
+        for name, field in self._sparse_model_fields(fields).items():
+            if field is None or not field.concrete or field.is_relation or \
+                    isinstance(field, models.FileField):
+                return None
+            sources[name] = field.name
+        return sources
+
+
+def _render(value, convert):
+    """Return value as its serializer field would render it"""
+    if value is None or convert is None:
+        return value
+    return convert(value)
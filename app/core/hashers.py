@@ -0,0 +1,130 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from django.conf import settings
+from django.contrib.auth import hashers
+from django.utils.translation import ugettext_lazy as _
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+DEFAULT_PASSWORD_HASHING = {
+    'WORKERS': None,
+    'MAX_PENDING': 64,
+    'TIMEOUT': 10,
+    'PBKDF2_ITERATIONS': None,
+    'ARGON2_TIME_COST': 2,
+    'ARGON2_MEMORY_COST': 19456,
+    'ARGON2_PARALLELISM': 1,
+    'BCRYPT_ROUNDS': 12,
+}
+
+
+class HashingBusy(APIException):
+    """Too many passwords are waiting to be hashed"""
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = _('Too many logins in progress, try again shortly.')
+    default_code = 'hashing_busy'
+
+
+def get_config():
+    config = dict(DEFAULT_PASSWORD_HASHING)
+    config.update(getattr(settings, 'PASSWORD_HASHING', {}))
+    return config
+
+
+_executor = None
+_pending = None
+_executor_lock = threading.Lock()
+_worker = threading.local()
+
+
+def _get_executor():
+    """Return the process wide hashing executor, created on first use"""
+    global _executor, _pending
+    with _executor_lock:
+        if _executor is None:
+            config = get_config()
+            workers = config['WORKERS'] or os.cpu_count() or 1
+            _executor = ThreadPoolExecutor(
+                max_workers=workers, thread_name_prefix='password-hash',
+                initializer=_mark_worker
+            )
+            _pending = threading.BoundedSemaphore(
+                workers + config['MAX_PENDING']
+            )
+        return _executor, _pending
+
+
+def _mark_worker():
+    _worker.active = True
+
+
+def run_hash(func, *args):
+    """
+    Run a hashing function on the hashing executor and return its result
+
+    At most WORKERS hashes run at once, so a burst of logins cannot take
+    every CPU from the other requests. Callers beyond MAX_PENDING waiting
+    ones give up after TIMEOUT seconds with HashingBusy.
+    """
+    if getattr(_worker, 'active', False):
+        return func(*args)
+    executor, pending = _get_executor()
+    if not pending.acquire(timeout=get_config()['TIMEOUT']):
+        raise HashingBusy()
+    try:
+        return executor.submit(func, *args).result()
+    finally:
+        pending.release()
+
+
+class ExecutorHasherMixin:
+    """Hash and verify on the hashing executor"""
+
+    def encode(self, *args, **kwargs):
+        return run_hash(partial(super().encode, *args, **kwargs))
+
+    def verify(self, password, encoded):
+        return run_hash(super().verify, password, encoded)
+
+    def harden_runtime(self, password, encoded):
+        return run_hash(super().harden_runtime, password, encoded)
+
+
+class PBKDF2PasswordHasher(ExecutorHasherMixin,
+                           hashers.PBKDF2PasswordHasher):
+    """PBKDF2 with PASSWORD_HASHING['PBKDF2_ITERATIONS'] iterations"""
+
+    @property
+    def iterations(self):
+        return (get_config()['PBKDF2_ITERATIONS'] or
+                hashers.PBKDF2PasswordHasher.iterations)
+
+
+class Argon2PasswordHasher(ExecutorHasherMixin,
+                           hashers.Argon2PasswordHasher):
+    """Argon2 with the costs of PASSWORD_HASHING"""
+
+    @property
+    def time_cost(self):
+        return get_config()['ARGON2_TIME_COST']
+
+    @property
+    def memory_cost(self):
+        return get_config()['ARGON2_MEMORY_COST']
+
+    @property
+    def parallelism(self):
+        return get_config()['ARGON2_PARALLELISM']
+
+
+class BCryptSHA256PasswordHasher(ExecutorHasherMixin,
+                                 hashers.BCryptSHA256PasswordHasher):
+    """bcrypt with PASSWORD_HASHING['BCRYPT_ROUNDS'] rounds"""
+
+    @property
+    def rounds(self):
+        return get_config()['BCRYPT_ROUNDS']
@@ -0,0 +1,317 @@
+import io
+import json
+import tempfile
+import uuid
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import override_settings
+from django.urls import reverse
+from PIL import Image
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core import benchmark
+from core.models import Recipe
+from core.seeding import seed_users
+from recipe import images
+
+
+PASSWORD = 'benchpass'
+
+
+class Command(BaseCommand):
+    """Django command to benchmark every recipe and user API route"""
+    help = (
+        'Seed users, time each API route in-process and report latency '
+        'percentiles, queries and allocations per request'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10)
+        parser.add_argument('--recipes', type=int, default=1000,
+                            help='Recipes per user')
+        parser.add_argument('--tags', type=int, default=50)
+        parser.add_argument('--ingredients', type=int, default=200)
+        parser.add_argument('--skew', type=float, default=1.0,
+                            help='Zipf exponent of tag/ingredient use')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--repeat', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=1)
+        parser.add_argument('--only', action='append', default=[],
+                            help='Only run scenarios with this name prefix')
+        parser.add_argument('--no-response-cache', action='store_true',
+                            help='Time lists without the response cache')
+        parser.add_argument('--output', help='Write the results as JSON')
+        parser.add_argument('--compare',
+                            help='JSON results of a baseline to compare')
+        parser.add_argument('--threshold', type=float, default=10,
+                            help='Latency growth in percent that regresses')
+        parser.add_argument('--fail-on-regression', action='store_true')
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 1 or options['users'] < 1:
+            raise CommandError('--repeat and --users must be positive')
+        baseline = (
+            benchmark.load(options['compare']) if options['compare'] else None
+        )
+        # The test client's requests come from the host testserver
+        overrides = {'ALLOWED_HOSTS': settings.ALLOWED_HOSTS + ['testserver']}
+        if options['no_response_cache']:
+            overrides['RESPONSE_CACHE'] = {'BACKEND': None}
+
+        with tempfile.TemporaryDirectory() as media, \
+                override_settings(MEDIA_ROOT=media, **overrides), \
+                transaction.atomic():
+            self.stdout.write(
+                f"Seeding {options['users']} users with "
+                f"{options['recipes']} recipes each..."
+            )
+            users = seed_users(
+                options['users'],
+                password=PASSWORD,
+                seed=options['seed'],
+                recipes=options['recipes'],
+                tags=options['tags'],
+                ingredients=options['ingredients'],
+                skew=options['skew']
+            )
+            if connection.vendor == 'postgresql':
+                with connection.cursor() as cursor:
+                    cursor.execute('ANALYZE')
+
+            results = {}
+            for scenario in self._scenarios(users[0], options):
+                if options['only'] and not any(
+                    scenario.name.startswith(prefix)
+                    for prefix in options['only']
+                ):
+                    continue
+                results[scenario.name] = result = benchmark.run_scenario(
+                    scenario, options['repeat'], options['warmup']
+                )
+                self._report(scenario.name, result)
+            # Nothing the benchmark wrote is kept
+            transaction.set_rollback(True)
+
+        report = {
+            'environment': benchmark.environment(),
+            'options': {
+                key: options[key] for key in (
+                    'users', 'recipes', 'tags', 'ingredients', 'skew',
+                    'seed', 'repeat', 'warmup', 'no_response_cache'
+                )
+            },
+            'results': results,
+        }
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(report, f, indent=2, sort_keys=True)
+            self.stdout.write(f"Results written to {options['output']}")
+        if baseline is not None:
+            regressed = self._compare(baseline, results, options['threshold'])
+            if regressed and options['fail_on_regression']:
+                raise CommandError(f'{regressed} metrics regressed')
+
+    def _scenarios(self, user, options):
+        """Return the scenarios timed for user, covering every route"""
+        repeat = options['warmup'] + options['repeat'] + 1
+        client = APIClient()
+        client.credentials(
+            HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=user).key}'
+        )
+        anonymous = APIClient()
+        recipe = user.recipe_set.order_by('id').first()
+        tag = user.tag_set.order_by('id').first()
+        ingredients = list(user.ingredients_set.order_by('id')[:2])
+        # Deletes consume a recipe per request, bulk deletes ten
+        doomed = [r.id for r in Recipe.objects.bulk_create(
+            Recipe(user=user, title=f'Doomed {i}', time_minutes=5, price=1)
+            for i in range(repeat * 11 + 1)
+        )]
+        uploaded = doomed.pop()
+        self._upload(client, recipe)
+        images.render_renditions(recipe.id)
+        sync_cursor = self._sync_cursor(client)
+        client.patch(
+            reverse('recipe:recipe-detail', args=[recipe.id]),
+            {'title': 'Benchmark curry'}
+        )
+        run = uuid.uuid4().hex[:8]
+
+        def url(route, *args, **params):
+            path = reverse(route, args=args)
+            return lambda i: path + _query(params)
+
+        def detail(i):
+            return reverse('recipe:recipe-detail', args=[doomed[i]])
+
+        def bulk_ids(i):
+            return {'ids': doomed[repeat + i * 10:repeat + i * 10 + 10]}
+
+        def new_recipe(i):
+            return {'title': f'Recipe {run}-{i}', 'time_minutes': 10,
+                    'price': '5.00', 'tags': [tag.id],
+                    'ingredients': [i.id for i in ingredients]}
+
+        def image_file(i):
+            return {'image': _image()}
+
+        recipe_url = reverse('recipe:recipe-detail', args=[recipe.id])
+        return [
+            benchmark.Scenario('api root', 'recipe:api-root', client, 'get',
+                               url('recipe:api-root')),
+            benchmark.Scenario('tags list', 'recipe:tag-list', client, 'get',
+                               url('recipe:tag-list')),
+            benchmark.Scenario('tags assigned_only', 'recipe:tag-list',
+                               client, 'get',
+                               url('recipe:tag-list', assigned_only=1)),
+            benchmark.Scenario('tags typeahead', 'recipe:tag-list', client,
+                               'get', url('recipe:tag-list', prefix='Tag 1')),
+            benchmark.Scenario('ingredients list', 'recipe:ingredients-list',
+                               client, 'get',
+                               url('recipe:ingredients-list')),
+            benchmark.Scenario('recipes list', 'recipe:recipe-list', client,
+                               'get', url('recipe:recipe-list')),
+            benchmark.Scenario('recipes list id,title', 'recipe:recipe-list',
+                               client, 'get',
+                               url('recipe:recipe-list', fields='id,title')),
+            benchmark.Scenario('recipes list expanded', 'recipe:recipe-list',
+                               client, 'get',
+                               url('recipe:recipe-list',
+                                   expand='tags,ingredients')),
+            benchmark.Scenario('recipes list included', 'recipe:recipe-list',
+                               client, 'get',
+                               url('recipe:recipe-list',
+                                   include='tags,ingredients')),
+            benchmark.Scenario('recipes by tag', 'recipe:recipe-list',
+                               client, 'get',
+                               url('recipe:recipe-list', tags=tag.id)),
+            benchmark.Scenario('recipes by all ingredients',
+                               'recipe:recipe-list', client, 'get',
+                               url('recipe:recipe-list', match='all',
+                                   ingredients=','.join(
+                                       str(i.id) for i in ingredients
+                                   ))),
+            benchmark.Scenario('recipes search', 'recipe:recipe-list',
+                               client, 'get',
+                               url('recipe:recipe-list', search='curry')),
+            benchmark.Scenario('recipe retrieve', 'recipe:recipe-detail',
+                               client, 'get', lambda i: recipe_url),
+            benchmark.Scenario('recipe image', 'recipe:recipe-image', client,
+                               'get', url('recipe:recipe-image', recipe.id,
+                                          size=480)),
+            benchmark.Scenario('recipes export', 'recipe:recipe-export',
+                               client, 'get',
+                               url('recipe:recipe-export', format='ndjson')),
+            benchmark.Scenario('sync full', 'recipe:sync-list', client,
+                               'get', url('recipe:sync-list')),
+            benchmark.Scenario('sync delta', 'recipe:sync-list', client,
+                               'get', url('recipe:sync-list',
+                                          since=sync_cursor)),
+            # Writes last, so the reads above see the seeded data only
+            benchmark.Scenario('tags create', 'recipe:tag-list', client,
+                               'post', url('recipe:tag-list'),
+                               lambda i: {'name': f'Tag {run}-{i}'}),
+            benchmark.Scenario('ingredients create',
+                               'recipe:ingredients-list', client, 'post',
+                               url('recipe:ingredients-list'),
+                               lambda i: {'name': f'Ingredient {run}-{i}'}),
+            benchmark.Scenario('recipes create', 'recipe:recipe-list',
+                               client, 'post', url('recipe:recipe-list'),
+                               new_recipe, format='json'),
+            benchmark.Scenario('recipe update', 'recipe:recipe-detail',
+                               client, 'patch', lambda i: recipe_url,
+                               lambda i: {'time_minutes': i + 1}),
+            benchmark.Scenario('recipe delete', 'recipe:recipe-detail',
+                               client, 'delete', detail),
+            benchmark.Scenario('recipes bulk create', 'recipe:recipe-bulk',
+                               client, 'post', url('recipe:recipe-bulk'),
+                               lambda i: [new_recipe(i)] * 10,
+                               format='json'),
+            benchmark.Scenario('recipes bulk delete', 'recipe:recipe-bulk',
+                               client, 'delete', url('recipe:recipe-bulk'),
+                               bulk_ids, format='json'),
+            benchmark.Scenario('recipe upload image',
+                               'recipe:recipe-upload-image', client, 'post',
+                               url('recipe:recipe-upload-image', uploaded),
+                               image_file, format='multipart'),
+            benchmark.Scenario('user create', 'user:create', anonymous,
+                               'post', url('user:create'),
+                               lambda i: {'email': f'{run}-{i}@example.com',
+                                          'password': PASSWORD,
+                                          'name': 'Bench'}),
+            benchmark.Scenario('user token', 'user:token', anonymous, 'post',
+                               url('user:token'),
+                               lambda i: {'email': user.email,
+                                          'password': PASSWORD}),
+            benchmark.Scenario('user me', 'user:me', client, 'get',
+                               url('user:me')),
+            benchmark.Scenario('user me update', 'user:me', client, 'patch',
+                               url('user:me'),
+                               lambda i: {'name': f'Bench {i}'}),
+        ]
+
+    def _sync_cursor(self, client):
+        """Sync through every change and return the final cursor"""
+        params = {}
+        while True:
+            data = client.get(reverse('recipe:sync-list'), params).data
+            params['since'] = data['cursor']
+            if not data['has_more']:
+                return data['cursor']
+
+    def _upload(self, client, recipe):
+        """Upload an image to recipe through the API"""
+        response = client.post(
+            reverse('recipe:recipe-upload-image', args=[recipe.id]),
+            {'image': _image()}, format='multipart'
+        )
+        if response.status_code != 200:
+            raise CommandError(
+                f'Uploading an image failed: {response.content!r}'
+            )
+
+    def _report(self, name, result):
+        """Print one scenario's result"""
+        self.stdout.write(
+            f"{name:<28} p50={result['p50_ms']:>8.2f}ms "
+            f"p95={result['p95_ms']:>8.2f}ms "
+            f"p99={result['p99_ms']:>8.2f}ms "
+            f"queries={result['queries']:<5g} "
+            f"alloc={result['peak_alloc_kb']:>8.1f}KB "
+            f"status={','.join(str(s) for s in result['status'])}"
+        )
+
+    def _compare(self, baseline, results, threshold):
+        """Print the changes against baseline, return the regressions"""
+        regressed = 0
+        self.stdout.write(self.style.MIGRATE_HEADING('Compared to baseline'))
+        for name, metric, before, after, worse in benchmark.compare(
+            baseline, results, threshold
+        ):
+            change = (after - before) / before * 100 if before else 0
+            line = (f'{name:<28} {metric:<14} {before:>10g} -> '
+                    f'{after:<10g} ({change:+.1f}%)')
+            if worse:
+                regressed += 1
+                self.stdout.write(self.style.ERROR(line))
+            else:
+                self.stdout.write(line)
+        return regressed
+
+
+def _query(params):
+    """Return params as a query string, or '' without any"""
+    return f'?{urlencode(params)}' if params else ''
+
+
+def _image():
+    """Return a named in-memory JPEG upload"""
+    buffer = io.BytesIO()
+    Image.new('RGB', (640, 480), (200, 80, 40)).save(buffer, 'JPEG')
+    buffer.name = 'bench.jpg'
+    buffer.seek(0)
+    return buffer
@@ -0,0 +1,134 @@
+import json
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth import authenticate, get_user_model
+from django.contrib.auth.hashers import (
+    check_password, get_hasher, make_password
+)
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test.utils import override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core import benchmark, hashers
+
+
+PASSWORD = 'benchpass'
+HASHERS = {
+    'argon2': 'core.hashers.Argon2PasswordHasher',
+    'bcrypt': 'core.hashers.BCryptSHA256PasswordHasher',
+    'pbkdf2': 'core.hashers.PBKDF2PasswordHasher',
+}
+
+
+class Command(BaseCommand):
+    """Django command to measure logins per second of each password hasher"""
+    help = (
+        'Time password hashing, authenticate() and /api/user/token/ with '
+        'each configured hasher and report logins per second per core'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hashers', nargs='+',
+                            choices=sorted(HASHERS), default=sorted(HASHERS))
+        parser.add_argument('--logins', type=int, default=20,
+                            help='Logins timed per measurement')
+        parser.add_argument('--threads', type=int,
+                            help='Concurrent logins, CPUs by default')
+        parser.add_argument('--output', help='Write the results as JSON')
+
+    def handle(self, *args, **options):
+        if options['logins'] < 1:
+            raise CommandError('--logins must be positive')
+        threads = options['threads'] or os.cpu_count() or 1
+        results = {}
+        for name in options['hashers']:
+            preferred = [HASHERS[name]] + [
+                hasher for hasher in settings.PASSWORD_HASHERS
+                if hasher != HASHERS[name]
+            ]
+            with override_settings(
+                PASSWORD_HASHERS=preferred,
+                ALLOWED_HOSTS=settings.ALLOWED_HOSTS + ['testserver'],
+                LOGIN_THROTTLE={'BACKEND': None}
+            ):
+                try:
+                    get_hasher().library
+                except ValueError as exc:
+                    self.stdout.write(f'{name:<7} skipped: {exc}')
+                    continue
+                results[name] = result = self._measure(
+                    options['logins'], threads
+                )
+            self.stdout.write(
+                f"{name:<7} hash={result['hash_ms']}ms "
+                f"authenticate={result['logins_per_second']}/s "
+                f"endpoint={result['endpoint_logins_per_second']}/s "
+                f"{threads} threads={result['concurrent_logins_per_second']}"
+                f"/s ({result['logins_per_second_per_core']}/s per core)"
+            )
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump({
+                    'environment': benchmark.environment(),
+                    'options': {
+                        'logins': options['logins'], 'threads': threads,
+                        'password_hashing': hashers.get_config(),
+                    },
+                    'results': results,
+                }, f, indent=2, sort_keys=True)
+
+    def _measure(self, logins, threads):
+        """Return the login rates with the current hasher"""
+        with transaction.atomic():
+            start = time.perf_counter()
+            encoded = make_password(PASSWORD)
+            hash_ms = (time.perf_counter() - start) * 1000
+            user = get_user_model().objects.create(
+                email='bench-login@londonappdev.com', password=encoded
+            )
+
+            start = time.perf_counter()
+            for i in range(logins):
+                authenticate(username=user.email, password=PASSWORD)
+            sequential = logins / (time.perf_counter() - start)
+
+            client = APIClient()
+            payload = {'email': user.email, 'password': PASSWORD}
+            start = time.perf_counter()
+            for i in range(logins):
+                client.post(reverse('user:token'), payload)
+            endpoint = logins / (time.perf_counter() - start)
+
+            # Threads share no transaction, so they verify the stored
+            # hash without the database, as a login does after its query
+            per_thread = max(logins // threads, 1)
+
+            def worker():
+                for i in range(per_thread):
+                    check_password(PASSWORD, encoded)
+
+            workers = [threading.Thread(target=worker)
+                       for i in range(threads)]
+            start = time.perf_counter()
+            for thread in workers:
+                thread.start()
+            for thread in workers:
+                thread.join()
+            concurrent = per_thread * threads / (time.perf_counter() - start)
+            transaction.set_rollback(True)
+
+        cores = min(threads, hashers.get_config()['WORKERS'] or
+                    os.cpu_count() or 1)
+        return {
+            'hash_ms': round(hash_ms, 1),
+            'logins_per_second': round(sequential, 1),
+            'endpoint_logins_per_second': round(endpoint, 1),
+            'concurrent_logins_per_second': round(concurrent, 1),
+            'logins_per_second_per_core': round(concurrent / cores, 1),
+        }
@@ -0,0 +1,150 @@
+import json
+import math
+import os
+import secrets
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+
+from core import benchmark
+from core.seeding import seed_users
+
+
+class Command(BaseCommand):
+    """Django command to compare the throughput of the serving modes"""
+    help = (
+        'Start runserver and the gunicorn production profile, with sync and '
+        'with uvicorn (ASGI) workers, against the configured database and '
+        'compare their requests per second'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--servers', nargs='+',
+                            choices=['runserver', 'gunicorn', 'uvicorn'],
+                            default=['runserver', 'gunicorn', 'uvicorn'])
+        parser.add_argument('--path',
+                            help='Path to GET, the recipe list by default')
+        parser.add_argument('--recipes', type=int, default=1000)
+        parser.add_argument('--duration', type=float, default=10)
+        parser.add_argument('--concurrency', type=int, default=16)
+        parser.add_argument('--slow-clients', type=int, default=0,
+                            help='Connections that trickle their headers '
+                                 'while the load runs')
+        parser.add_argument('--port', type=int, default=8100)
+        parser.add_argument('--workers', type=int,
+                            help='gunicorn workers, 2 * CPUs + 1 by default')
+        parser.add_argument('--threads', type=int, default=1,
+                            help='gunicorn threads per worker')
+        parser.add_argument('--output', help='Write the results as JSON')
+
+    def handle(self, *args, **options):
+        path = options['path'] or reverse('recipe:recipe-list')
+        # The servers are separate processes, so the data is committed
+        user = seed_users(1, recipes=options['recipes'])[0]
+        token = Token.objects.create(user=user)
+        results = {}
+        try:
+            for offset, server in enumerate(options['servers']):
+                port = options['port'] + offset
+                self.stdout.write(f'Starting {server} on port {port}...')
+                url = f'http://127.0.0.1:{port}{path}'
+                with self._serve(server, port, options):
+                    self._wait_until_up(port)
+                    with benchmark.slow_clients(url, options['slow_clients']):
+                        results[server] = result = benchmark.drive(
+                            url,
+                            duration=options['duration'],
+                            concurrency=options['concurrency'],
+                            headers={'Authorization': f'Token {token.key}'}
+                        )
+                self.stdout.write(
+                    f"{server:<10} rps={result['rps']:<8} "
+                    f"p50={result['p50_ms']}ms p99={result['p99_ms']}ms "
+                    f"status={result['status']}"
+                )
+        finally:
+            user.delete()
+
+        servers = list(results)
+        for server in servers[1:]:
+            first = results[servers[0]]['rps']
+            speedup = results[server]['rps'] / first if first else math.inf
+            self.stdout.write(self.style.SUCCESS(
+                f'{server} served {speedup:.1f}x the requests of '
+                f'{servers[0]}'
+            ))
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump({
+                    'environment': benchmark.environment(),
+                    'options': {
+                        key: options[key] for key in (
+                            'recipes', 'duration', 'concurrency',
+                            'slow_clients', 'workers', 'threads'
+                        )
+                    },
+                    'path': path,
+                    'results': results,
+                }, f, indent=2, sort_keys=True)
+
+    @contextmanager
+    def _serve(self, server, port, options):
+        """Run a server on port until the block exits"""
+        env = dict(os.environ)
+        if server == 'runserver':
+            env['DJANGO_ENV'] = 'development'
+            command = [
+                sys.executable, 'manage.py', 'runserver', '--noreload',
+                f'127.0.0.1:{port}'
+            ]
+        else:
+            # gunicorn serves both, uvicorn through its gunicorn worker
+            env.update({
+                'DJANGO_ENV': 'production',
+                'DJANGO_SECRET_KEY': env.get('DJANGO_SECRET_KEY')
+                or secrets.token_urlsafe(50),
+                'DJANGO_ALLOWED_HOSTS': '127.0.0.1',
+                'GUNICORN_BIND': f'127.0.0.1:{port}',
+                'GUNICORN_THREADS': str(options['threads']),
+            })
+            if options['workers']:
+                env['WEB_CONCURRENCY'] = str(options['workers'])
+            env['GUNICORN_WORKER_CLASS'] = 'sync'
+            module = 'app.wsgi'
+            if server == 'uvicorn':
+                env['GUNICORN_WORKER_CLASS'] = 'uvicorn.workers.UvicornWorker'
+                module = 'app.asgi'
+            command = [
+                sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py',
+                module
+            ]
+        process = subprocess.Popen(
+            command, cwd=settings.BASE_DIR, env=env,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        try:
+            yield process
+        finally:
+            process.terminate()
+            process.wait(timeout=30)
+
+    def _wait_until_up(self, port, timeout=30):
+        """Wait for a server to answer on port"""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            try:
+                urllib.request.urlopen(f'http://127.0.0.1:{port}/metrics')
+                return
+            except urllib.error.HTTPError:
+                return
+            except OSError:
+                time.sleep(0.2)
+        raise CommandError(f'No server answered on port {port}')
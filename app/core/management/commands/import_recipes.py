@@ -0,0 +1,81 @@
+import io
+import sys
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from core.importing import READERS, InvalidRecord, RecipeImporter
+
+
+class Command(BaseCommand):
+    """Django command to import recipes from an NDJSON or CSV file"""
+    help = (
+        'Stream recipes in the export format into a user\'s cookbook, '
+        'committing every batch'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="File to read, or '-' for stdin")
+        parser.add_argument('--user', required=True,
+                            help='Email of the user owning the recipes')
+        parser.add_argument('--format', choices=sorted(READERS),
+                            help='Defaults to the file extension, or ndjson')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--copy', action='store_true',
+                            help='Write rows with COPY on PostgreSQL')
+        parser.add_argument('--checkpoint',
+                            help='Name to record committed progress under, '
+                                 'an interrupted import run again with it '
+                                 'resumes from there')
+
+    def handle(self, *args, **options):
+        try:
+            user = get_user_model().objects.get(email=options['user'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"User {options['user']} does not exist")
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive')
+
+        path = options['path']
+        fmt = options['format'] or (
+            'csv' if path.lower().endswith('.csv') else 'ndjson'
+        )
+        start = time.perf_counter()
+
+        def on_batch(imported):
+            rate = (imported - skip) / (time.perf_counter() - start)
+            self.stdout.write(
+                f'Imported {imported} recipes ({rate:.0f} rows/s)'
+            )
+
+        importer = RecipeImporter(
+            user,
+            batch_size=options['batch_size'],
+            use_copy=options['copy'],
+            on_batch=on_batch,
+            checkpoint=options['checkpoint']
+        )
+        skip = importer.checkpointed()
+        if skip:
+            self.stdout.write(f'Resuming after {skip} records')
+
+        if path == '-':
+            source = io.TextIOWrapper(
+                sys.stdin.buffer, encoding='utf-8', newline=''
+            )
+        else:
+            try:
+                source = open(path, encoding='utf-8', newline='')
+            except OSError as exc:
+                raise CommandError(f'Cannot read {path}: {exc.strerror}')
+        try:
+            with source:
+                imported = importer.run(READERS[fmt](source), skip=skip)
+        except InvalidRecord as exc:
+            raise CommandError(f'{exc}, earlier batches were kept')
+
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {imported - skip} recipes in {elapsed:.2f}s'
+        ))
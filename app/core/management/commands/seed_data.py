@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.seeding import seed_users
+
+
+class Command(BaseCommand):
+    """Django command to seed users with synthetic cookbooks"""
+    help = 'Create users with reproducible recipes, tags and ingredients'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10)
+        parser.add_argument('--recipes', type=int, default=1000,
+                            help='Recipes per user')
+        parser.add_argument('--tags', type=int, default=50,
+                            help='Tags per user')
+        parser.add_argument('--ingredients', type=int, default=200,
+                            help='Ingredients per user')
+        parser.add_argument('--tags-per-recipe', type=int, default=3)
+        parser.add_argument('--ingredients-per-recipe', type=int, default=8)
+        parser.add_argument('--skew', type=float, default=0,
+                            help='Zipf exponent of tag/ingredient use, '
+                                 '0 picks them uniformly')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--prefix', help='Prefix of the user emails')
+        parser.add_argument('--password', default='benchpass')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            users = seed_users(
+                options['users'],
+                password=options['password'],
+                prefix=options['prefix'],
+                seed=options['seed'],
+                recipes=options['recipes'],
+                tags=options['tags'],
+                ingredients=options['ingredients'],
+                tags_per_recipe=options['tags_per_recipe'],
+                ingredients_per_recipe=options['ingredients_per_recipe'],
+                skew=options['skew']
+            )
+        for user in users:
+            self.stdout.write(user.email)
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {len(users)} users with {options['recipes']} "
+            f"recipes each"
+        ))
@@ -0,0 +1,270 @@
+import bisect
+import logging
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from django.conf import settings
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_METRICS = {
+    'ENABLED': True,
+    'SERVER_TIMING': False,
+    'REPEATED_QUERY_THRESHOLD': 5,
+    'BUCKETS': (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+    'TOKEN': None,
+}
+
+
+class RequestMetrics:
+    """What one request spent its time on"""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.action = None
+        self.queries = 0
+        self.sql_time = 0.0
+        self.serialize_time = 0.0
+        self.render_time = 0.0
+        self.statements = Counter()
+
+    def repeated(self, threshold):
+        """Return the statements run at least threshold times"""
+        return {
+            sql: count for sql, count in self.statements.items()
+            if count >= threshold
+        }
+
+
+class EndpointMetrics:
+    """Totals of the requests to one view, action and method"""
+
+    def __init__(self, buckets):
+        self.statuses = Counter()
+        self.buckets = [0] * (len(buckets) + 1)
+        self.duration = 0.0
+        self.queries = 0
+        self.sql_time = 0.0
+        self.serialize_time = 0.0
+        self.render_time = 0.0
+        self.repeated_queries = 0
+
+
+class MetricsRegistry:
+    """
+    Process local per endpoint request, SQL, serializer and render metrics
+
+    MetricsMiddleware tracks the request being served in a thread local
+    and adds it to its endpoint's totals when the response is returned.
+    Every worker process keeps its own totals, so each one has to be
+    scraped on its own.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._endpoints = {}
+
+    @property
+    def config(self):
+        config = dict(DEFAULT_METRICS)
+        config.update(getattr(settings, 'METRICS', {}))
+        return config
+
+    @property
+    def current(self):
+        """Return the metrics of the request being served, or None"""
+        return getattr(self._local, 'request', None)
+
+    def begin(self):
+        """Start tracking a request on this thread"""
+        self._local.request = RequestMetrics()
+        return self._local.request
+
+    def end(self):
+        """Stop tracking the request of this thread"""
+        self._local.request = None
+
+    def execute_wrapper(self, execute, sql, params, many, context):
+        """Count and time a query of the current request"""
+        current = self.current
+        if current is None:
+            return execute(sql, params, many, context)
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            current.sql_time += time.perf_counter() - start
+            current.queries += 1
+            current.statements[sql] += 1
+
+    @contextmanager
+    def timing(self, phase):
+        """Add the time of the block less its SQL to a phase"""
+        current = self.current
+        if current is None:
+            yield
+            return
+        start = time.perf_counter()
+        sql_time = current.sql_time
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            elapsed -= current.sql_time - sql_time
+            attribute = f'{phase}_time'
+            setattr(current, attribute, getattr(current, attribute) + elapsed)
+
+    def observe(self, view, action, method, status, current):
+        """Add a finished request to its endpoint's totals"""
+        config = self.config
+        duration = time.perf_counter() - current.start
+        repeated = current.repeated(config['REPEATED_QUERY_THRESHOLD'])
+        for sql, count in repeated.items():
+            logger.warning(
+                '%s %s ran the same query %d times: %s',
+                method, view, count, sql
+            )
+        buckets = config['BUCKETS']
+        with self._lock:
+            key = (view, action, method)
+            endpoint = self._endpoints.get(key)
+            if endpoint is None:
+                endpoint = self._endpoints[key] = EndpointMetrics(buckets)
+            endpoint.statuses[status] += 1
+            endpoint.buckets[bisect.bisect_left(buckets, duration)] += 1
+            endpoint.duration += duration
+            endpoint.queries += current.queries
+            endpoint.sql_time += current.sql_time
+            endpoint.serialize_time += current.serialize_time
+            endpoint.render_time += current.render_time
+            endpoint.repeated_queries += sum(repeated.values())
+        return duration
+
+    def server_timing(self, current, duration):
+        """Return the Server-Timing header value of a request"""
+        return ', '.join([
+            f'db;dur={current.sql_time * 1000:.2f};'
+            f'desc="{current.queries} queries"',
+            f'serialize;dur={current.serialize_time * 1000:.2f}',
+            f'render;dur={current.render_time * 1000:.2f}',
+            f'total;dur={duration * 1000:.2f}',
+        ])
+
+    def render(self):
+        """Return the totals in the Prometheus text format"""
+        buckets = self.config['BUCKETS']
+        with self._lock:
+            endpoints = sorted(self._endpoints.items())
+            lines = []
+            lines.extend(_header(
+                'http_requests_total', 'counter',
+                'Requests served, by endpoint and status'
+            ))
+            for key, endpoint in endpoints:
+                for status, count in sorted(endpoint.statuses.items()):
+                    lines.append(_sample(
+                        'http_requests_total', key, count,
+                        status=str(status)
+                    ))
+            lines.extend(_header(
+                'http_request_duration_seconds', 'histogram',
+                'Time until the response was returned'
+            ))
+            for key, endpoint in endpoints:
+                cumulative = 0
+                bounds = [str(bound) for bound in buckets] + ['+Inf']
+                for bound, count in zip(bounds, endpoint.buckets):
+                    cumulative += count
+                    lines.append(_sample(
+                        'http_request_duration_seconds_bucket', key,
+                        cumulative, le=bound
+                    ))
+                lines.append(_sample(
+                    'http_request_duration_seconds_sum', key,
+                    endpoint.duration
+                ))
+                lines.append(_sample(
+                    'http_request_duration_seconds_count', key, cumulative
+                ))
+            for name, attribute, kind, description in (
+                ('http_request_db_queries_total', 'queries', 'counter',
+                 'Queries run'),
+                ('http_request_db_seconds_total', 'sql_time', 'counter',
+                 'Time spent running queries'),
+                ('http_request_serialize_seconds_total', 'serialize_time',
+                 'counter', 'Time spent serializing, less its queries'),
+                ('http_request_render_seconds_total', 'render_time',
+                 'counter', 'Time spent rendering responses'),
+                ('http_request_repeated_queries_total', 'repeated_queries',
+                 'counter', 'Runs of queries repeated within a request, '
+                            'a sign of N+1 queries'),
+            ):
+                lines.extend(_header(name, kind, description))
+                for key, endpoint in endpoints:
+                    lines.append(
+                        _sample(name, key, getattr(endpoint, attribute))
+                    )
+        return '\n'.join(lines) + '\n'
+
+    def stats(self):
+        """Return the request count and mean timings of every endpoint"""
+        with self._lock:
+            return {
+                key: {
+                    'requests': sum(endpoint.statuses.values()),
+                    'queries': endpoint.queries,
+                    'sql_time': endpoint.sql_time,
+                    'serialize_time': endpoint.serialize_time,
+                    'render_time': endpoint.render_time,
+                    'repeated_queries': endpoint.repeated_queries,
+                }
+                for key, endpoint in self._endpoints.items()
+            }
+
+    def clear(self):
+        """Drop every total"""
+        with self._lock:
+            self._endpoints.clear()
+
+
+metrics = MetricsRegistry()
+
+
+class SerializerTimingMixin:
+    """Add the time a view's serializers take to the request's metrics"""
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        to_representation = serializer.to_representation
+
+        def timed(instance):
+            with metrics.timing('serialize'):
+                return to_representation(instance)
+        serializer.to_representation = timed
+        return serializer
+
+
+def _header(name, kind, description):
+    """Return the HELP and TYPE lines of a metric"""
+    return [f'# HELP {name} {description}', f'# TYPE {name} {kind}']
+
+
+def _sample(name, key, value, **labels):
+    """Return a sample line of an endpoint key with extra labels"""
+    view, action, method = key
+    labels = dict(view=view, action=action, method=method, **labels)
+    rendered = ','.join(
+        f'{label}="{_escape(value)}"' for label, value in labels.items()
+    )
+    return f'{name}{{{rendered}}} {value}'
+
+
+def _escape(value):
+    """Escape a label value"""
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace(
+        '\n', r'\n'
+    )
@@ -0,0 +1,66 @@
+import time
+from contextlib import ExitStack
+
+from django.db import connections
+
+from core.metrics import metrics
+
+
+class MetricsMiddleware:
+    """
+    Record the queries, SQL, serializer and render time of every request
+
+    Queries are counted through an execute wrapper on every database
+    connection, and requests are labelled with their resolved view name
+    and viewset action. With METRICS['SERVER_TIMING'] the breakdown is
+    also sent in a Server-Timing header. Streamed bodies are produced
+    after the response is returned, so their queries are not counted.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        config = metrics.config
+        if not config['ENABLED']:
+            return self.get_response(request)
+
+        current = metrics.begin()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(metrics.execute_wrapper)
+                    )
+                response = self.get_response(request)
+            match = request.resolver_match
+            duration = metrics.observe(
+                match.view_name if match else '<unresolved>',
+                current.action or request.method.lower(),
+                request.method,
+                response.status_code,
+                current
+            )
+        finally:
+            metrics.end()
+        if config['SERVER_TIMING']:
+            response['Server-Timing'] = metrics.server_timing(
+                current, duration
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        current = metrics.current
+        actions = getattr(view_func, 'actions', None)
+        if current is not None and actions:
+            current.action = actions.get(request.method.lower())
+
+    def process_template_response(self, request, response):
+        current = metrics.current
+        if current is not None:
+            start = time.perf_counter()
+
+            def rendered(response):
+                current.render_time += time.perf_counter() - start
+            response.add_post_render_callback(rendered)
+        return response
@@ -0,0 +1,45 @@
+# Generated by Django 2.1.15 on 2026-10-17 06:20
+
+import hashlib
+
+from django.db import migrations, models
+
+
+def hash_renditions(apps, schema_editor):
+    """Fill in content_hash for renditions rendered before it existed"""
+    RecipeImageRendition = apps.get_model('core', 'RecipeImageRendition')
+    for rendition in RecipeImageRendition.objects.filter(content_hash=''):
+        try:
+            with rendition.image.open('rb') as image_file:
+                digest = hashlib.sha256(image_file.read()).hexdigest()
+        except OSError:
+            continue
+        rendition.content_hash = digest
+        rendition.save(update_fields=['content_hash'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_recipe_image_renditions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipeimagerendition',
+            name='size',
+            field=models.PositiveIntegerField(default=2048),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='recipeimagerendition',
+            name='content_hash',
+            field=models.CharField(default='', max_length=64),
+            preserve_default=False,
+        ),
+        migrations.AlterUniqueTogether(
+            name='recipeimagerendition',
+            unique_together={('recipe', 'format', 'size')},
+        ),
+        migrations.RunPython(hash_renditions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 2.1.15 on 2026-10-17 06:30
+
+from django.db import migrations
+
+
+# Typeahead filters names with ILIKE, which a pg_trgm GIN index can serve.
+# Servers without the contrib extension still answer from a scan of the
+# user's rows, so the index is only created where pg_trgm is available.
+CREATE_TRIGRAM_INDEXES = """
+DO $$
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'
+    ) THEN
+        CREATE EXTENSION IF NOT EXISTS pg_trgm;
+        CREATE INDEX core_tag_name_trgm_idx
+            ON core_tag USING gin (name gin_trgm_ops);
+        CREATE INDEX core_ingredients_name_trgm_idx
+            ON core_ingredients USING gin (name gin_trgm_ops);
+    END IF;
+END
+$$;
+"""
+
+DROP_TRIGRAM_INDEXES = """
+DROP INDEX IF EXISTS core_tag_name_trgm_idx;
+DROP INDEX IF EXISTS core_ingredients_name_trgm_idx;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_recipe_search_vector'),
+    ]
+
+    operations = [
+        migrations.RunSQL(CREATE_TRIGRAM_INDEXES, DROP_TRIGRAM_INDEXES),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 2.1.15 on 2026-10-17 06:26
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+# Log every existing object once so a sync from the start of the log
+# returns the whole account
+BACKFILL_CHANGE_LOG = """
+INSERT INTO core_changelogentry (user_id, kind, object_id, deleted, changed_at)
+SELECT user_id, kind, id, false, now() FROM (
+    SELECT user_id, 'tag' AS kind, id FROM core_tag
+    UNION ALL
+    SELECT user_id, 'ingredient', id FROM core_ingredients
+    UNION ALL
+    SELECT user_id, 'recipe', id FROM core_recipe
+) AS existing
+ORDER BY user_id, kind, id
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeLogEntry',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('kind', models.CharField(choices=[('recipe', 'Recipe'), ('tag', 'Tag'), ('ingredient', 'Ingredient')], max_length=10)),
+                ('object_id', models.PositiveIntegerField()),
+                ('deleted', models.BooleanField(default=False)),
+                ('changed_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='changelogentry',
+            index=models.Index(fields=['user', 'id'], name='core_changelog_user_id_idx'),
+        ),
+        migrations.RunSQL(BACKFILL_CHANGE_LOG, migrations.RunSQL.noop),
+    ]
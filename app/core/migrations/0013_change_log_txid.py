@@ -0,0 +1,28 @@
+# Generated by Django 2.1.15 on 2026-10-17 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_change_log'),
+    ]
+
+    # Existing entries keep transaction 0, so cursors handed out before
+    # this migration, which are ids, still point at the same place
+    operations = [
+        migrations.AddField(
+            model_name='changelogentry',
+            name='txid',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.RemoveIndex(
+            model_name='changelogentry',
+            name='core_changelog_user_id_idx',
+        ),
+        migrations.AddIndex(
+            model_name='changelogentry',
+            index=models.Index(fields=['user', 'txid', 'id'], name='core_changelog_user_txid_idx'),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 2.1.15 on 2026-10-17 09:40
+
+from django.db import migrations
+
+
+# istartswith and icontains compile to UPPER("name"::text) LIKE UPPER(...)
+# on Postgres, which only an index on the same expression can serve
+CREATE_UPPER_TRIGRAM_INDEXES = """
+DO $$
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'
+    ) THEN
+        CREATE EXTENSION IF NOT EXISTS pg_trgm;
+        DROP INDEX IF EXISTS core_tag_name_trgm_idx;
+        DROP INDEX IF EXISTS core_ingredients_name_trgm_idx;
+        CREATE INDEX core_tag_upper_name_trgm_idx
+            ON core_tag USING gin (upper(name) gin_trgm_ops);
+        CREATE INDEX core_ingredients_upper_name_trgm_idx
+            ON core_ingredients USING gin (upper(name) gin_trgm_ops);
+    END IF;
+END
+$$;
+"""
+
+DROP_UPPER_TRIGRAM_INDEXES = """
+DO $$
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'
+    ) THEN
+        DROP INDEX IF EXISTS core_tag_upper_name_trgm_idx;
+        DROP INDEX IF EXISTS core_ingredients_upper_name_trgm_idx;
+        CREATE INDEX IF NOT EXISTS core_tag_name_trgm_idx
+            ON core_tag USING gin (name gin_trgm_ops);
+        CREATE INDEX IF NOT EXISTS core_ingredients_name_trgm_idx
+            ON core_ingredients USING gin (name gin_trgm_ops);
+    END IF;
+END
+$$;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_change_log_txid'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            CREATE_UPPER_TRIGRAM_INDEXES, DROP_UPPER_TRIGRAM_INDEXES
+        ),
+    ]
@@ -1,10 +1,18 @@
 import uuid
 import os
+import threading
+from contextlib import contextmanager
+
 from django.db import models
+from django.db.models.expressions import RawSQL
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector, SearchVectorField
 from django.contrib.auth.models import (
     BaseUserManager, AbstractBaseUser, PermissionsMixin
 )
 from django.conf import settings
+from django.utils import timezone
 
 
 def recipe_image_file_path(instance, filename):
@@ -15,7 +23,23 @@ def recipe_image_file_path(instance, filename):
     return os.path.join('uploads/recipe/', filename)
 
 
-class MyUserManager(BaseUserManager):
+def recipe_rendition_file_path(instance, filename):
+    """Generate file path for a new image rendition"""
+    filename = f'{uuid.uuid4()}.{instance.format}'
+
+    return os.path.join('uploads/recipe/renditions/', filename)
+
+
+class MyUserQuerySet(models.QuerySet):
+
+    def delete(self):
+        """Delete the users without logging what the deletion cascades to"""
+        # Their log is deleted with them, new entries would dangle
+        with quiet_changes(*self.values_list('pk', flat=True)):
+            return super().delete()
+
+
+class MyUserManager(BaseUserManager.from_queryset(MyUserQuerySet)):
 
     def create_user(self, email, password=None, **extra_fields):
         """Creates and saves a user with given email"""
@@ -52,6 +76,11 @@ class MyUser(AbstractBaseUser, PermissionsMixin):
     objects = MyUserManager()
     USERNAME_FIELD = 'email'
 
+    def delete(self, *args, **kwargs):
+        # Their log is deleted with them, new entries would dangle
+        with quiet_changes(self.pk):
+            return super().delete(*args, **kwargs)
+
     def __str__(self):
         return self.email
 
@@ -63,6 +92,21 @@ class Tag(models.Model):
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE
     )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Serves the per-user listing ordered by (name, id)
+            models.Index(
+                fields=['user', 'name', 'id'],
+                name='core_tag_user_name_idx'
+            ),
+            # Serves the per-user max(updated_at) behind list ETags
+            models.Index(
+                fields=['user', 'updated_at'],
+                name='core_tag_user_updated_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -75,13 +119,76 @@ class Ingredients(models.Model):
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE
     )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Serves the per-user listing ordered by (name, id)
+            models.Index(
+                fields=['user', 'name', 'id'],
+                name='core_ingredients_user_name_idx'
+            ),
+            # Serves the per-user max(updated_at) behind list ETags
+            models.Index(
+                fields=['user', 'updated_at'],
+                name='core_ingr_user_updated_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.name
 
 
+# Text search configuration used to build and query Recipe.search_vector
+SEARCH_CONFIG = 'english'
+
+
+def _names_of(model):
+    """Return a subquery of the space separated names linked to a recipe"""
+    return models.Subquery(
+        model.objects.filter(
+            recipe=models.OuterRef('pk')
+        ).order_by().values('recipe').annotate(
+            names=StringAgg('name', ' ')
+        ).values('names'),
+        output_field=models.TextField()
+    )
+
+
+class RecipeQuerySet(models.QuerySet):
+
+    def update_search_vector(self, **fields):
+        """
+        Rebuild the search vector of every recipe in the queryset
+
+        Any other fields given are updated by the same statement.
+        """
+        return self.update(search_vector=(
+            SearchVector('title', config=SEARCH_CONFIG, weight='A') +
+            SearchVector(_names_of(Tag), config=SEARCH_CONFIG, weight='B') +
+            SearchVector(
+                _names_of(Ingredients), config=SEARCH_CONFIG, weight='C'
+            )
+        ), **fields)
+
+    def touch(self, **fields):
+        """Mark the recipes as changed, updating any other fields given"""
+        return self.update(updated_at=timezone.now(), **fields)
+
+
 class Recipe(models.Model):
     """Recipe Object"""
+    IMAGE_PENDING = 'pending'
+    IMAGE_PROCESSING = 'processing'
+    IMAGE_READY = 'ready'
+    IMAGE_FAILED = 'failed'
+    IMAGE_STATUS_CHOICES = (
+        (IMAGE_PENDING, 'Pending'),
+        (IMAGE_PROCESSING, 'Processing'),
+        (IMAGE_READY, 'Ready'),
+        (IMAGE_FAILED, 'Failed'),
+    )
+
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE
@@ -93,6 +200,188 @@ class Recipe(models.Model):
     ingredients = models.ManyToManyField('Ingredients')
     tags = models.ManyToManyField('Tag')
     image = models.ImageField(null=True, upload_to=recipe_image_file_path)
+    image_status = models.CharField(
+        max_length=10,
+        choices=IMAGE_STATUS_CHOICES,
+        blank=True
+    )
+    # Also touched by core.signals when the tags or ingredients change
+    updated_at = models.DateTimeField(auto_now=True)
+    # Title, tag and ingredient names, kept current by core.signals
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = RecipeQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Serves the per-user listing ordered by id
+            models.Index(
+                fields=['user', 'id'],
+                name='core_recipe_user_id_idx'
+            ),
+            models.Index(
+                fields=['user', 'updated_at'],
+                name='core_recipe_user_updated_idx'
+            ),
+            GinIndex(
+                fields=['search_vector'],
+                name='core_recipe_search_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.title
+
+
+class RecipeImageRendition(models.Model):
+    """Copy of a recipe image scaled to one size in one format"""
+    JPEG = 'jpeg'
+    WEBP = 'webp'
+    FORMAT_CHOICES = (
+        (JPEG, 'JPEG'),
+        (WEBP, 'WebP'),
+    )
+
+    recipe = models.ForeignKey(
+        'Recipe',
+        on_delete=models.CASCADE,
+        related_name='renditions'
+    )
+    format = models.CharField(max_length=4, choices=FORMAT_CHOICES)
+    # Bounding box the image was scaled to fit, one of RECIPE_IMAGE_SIZES
+    size = models.PositiveIntegerField()
+    width = models.PositiveIntegerField()
+    height = models.PositiveIntegerField()
+    image = models.ImageField(upload_to=recipe_rendition_file_path)
+    content_hash = models.CharField(max_length=64)
+
+    class Meta:
+        unique_together = ('recipe', 'format', 'size')
+
+    def __str__(self):
+        return f'{self.recipe} {self.width}x{self.height} {self.format}'
+
+
+# Users whose objects this thread changes in bulk, see quiet_changes()
+_quiet = threading.local()
+
+
+@contextmanager
+def quiet_changes(*user_ids):
+    """
+    Skip the per object change log entries and cache bumps of users
+
+    For code changing many objects at once, which records the change log
+    and bumps the response cache itself, once for all of them, and for
+    deleting the users themselves.
+    """
+    users = _quiet.__dict__.setdefault('users', [])
+    users.extend(user_ids)
+    try:
+        yield
+    finally:
+        for user_id in user_ids:
+            users.remove(user_id)
+
+
+def changes_quieted(user_id=None):
+    """Return whether the user's changes, or any if None, are quiet"""
+    users = getattr(_quiet, 'users', ())
+    return bool(users) if user_id is None else user_id in users
+
+
+class TxidCurrent(models.Func):
+    """The id of the current transaction"""
+    function = 'txid_current'
+    output_field = models.BigIntegerField()
+
+
+# Every transaction with a lower id than this has committed or rolled back,
+# so no entry can still appear before a cursor below it. The oldest
+# running transaction also reads its own entries.
+COMMITTED_TXID = """
+CASE WHEN txid_current_if_assigned() =
+          txid_snapshot_xmin(txid_current_snapshot())
+     THEN txid_current_if_assigned() + 1
+     ELSE txid_snapshot_xmin(txid_current_snapshot())
+END
+"""
+
+
+class ChangeLogManager(models.Manager):
+
+    def record(self, user_id, kind, object_ids, deleted=False):
+        """Append one entry per object id of kind for the user"""
+        return self.bulk_create(
+            (self.model(
+                user_id=user_id,
+                kind=kind,
+                object_id=object_id,
+                deleted=deleted,
+                txid=TxidCurrent()
+            ) for object_id in object_ids),
+            batch_size=1000
+        )
+
+    def committed(self):
+        """Return the entries no running transaction can precede"""
+        return self.filter(txid__lt=RawSQL(COMMITTED_TXID, ()))
+
+
+class ChangeLogEntry(models.Model):
+    """A recipe, tag or ingredient of a user that was saved or deleted"""
+    RECIPE = 'recipe'
+    TAG = 'tag'
+    INGREDIENT = 'ingredient'
+    KIND_CHOICES = (
+        (RECIPE, 'Recipe'),
+        (TAG, 'Tag'),
+        (INGREDIENT, 'Ingredient'),
+    )
+
+    # Ids are taken when entries are written, not when they commit, so the
+    # log is ordered by the writing transaction first. Both are the cursor
+    id = models.BigAutoField(primary_key=True)
+    txid = models.BigIntegerField(default=0)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE
+    )
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    object_id = models.PositiveIntegerField()
+    deleted = models.BooleanField(default=False)
+    changed_at = models.DateTimeField(auto_now_add=True)
+
+    objects = ChangeLogManager()
+
+    class Meta:
+        indexes = [
+            # Serves reading a user's log from a cursor onwards
+            models.Index(
+                fields=['user', 'txid', 'id'],
+                name='core_changelog_user_txid_idx'
+            ),
+        ]
+
+    def __str__(self):
+        action = 'deleted' if self.deleted else 'saved'
+        return f'{self.kind} {self.object_id} {action}'
+
+
+class ImportCheckpoint(models.Model):
+    """The records of a named import committed so far"""
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE
+    )
+    name = models.CharField(max_length=255)
+    # Written in the transaction of each batch, so it never disagrees
+    # with the rows committed
+    records = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('user', 'name')
+
+    def __str__(self):
+        return f'{self.name}: {self.records} records'
@@ -0,0 +1,122 @@
+import itertools
+import random
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+
+from core.models import Tag, Ingredients, Recipe, ChangeLogEntry
+
+
+def seed_users(users=10, password='benchpass', prefix=None, seed=0,
+               **cookbook):
+    """
+    Bulk create users, each with a seeded cookbook, and return them
+
+    The password is hashed once and shared by every user. Each user's
+    cookbook is seeded from seed plus the user's index, and cookbook
+    takes the keyword arguments of seed_recipes.
+    """
+    prefix = prefix or f'seed-{uuid.uuid4().hex[:8]}'
+    password = make_password(password)
+    user_objs = get_user_model().objects.bulk_create(
+        get_user_model()(
+            email=f'{prefix}-{i}@example.com',
+            name=f'User {i}',
+            password=password
+        ) for i in range(users)
+    )
+    for i, user in enumerate(user_objs):
+        seed_recipes(user, seed=seed + i, **cookbook)
+    return user_objs
+
+
+def seed_recipes(user, recipes=1000, tags=50, ingredients=200,
+                 tags_per_recipe=3, ingredients_per_recipe=8,
+                 batch_size=1000, seed=0, skew=0):
+    """
+    Bulk create a synthetic cookbook for user and return its recipes
+
+    Every row, including the M2M links, is written with bulk_create so
+    large datasets can be seeded in seconds. The same seed always
+    produces the same dataset. With a skew above 0 the n-th tag and
+    ingredient is picked with a weight of 1 / n ** skew, so a few names
+    are linked to most recipes like in real cookbooks.
+    """
+    rng = random.Random(seed)
+    tag_objs = Tag.objects.bulk_create(
+        (Tag(user=user, name=f'Tag {i}') for i in range(tags)),
+        batch_size=batch_size
+    )
+    ingredient_objs = Ingredients.objects.bulk_create(
+        (Ingredients(user=user, name=f'Ingredient {i}')
+         for i in range(ingredients)),
+        batch_size=batch_size
+    )
+    recipe_objs = Recipe.objects.bulk_create(
+        (Recipe(
+            user=user,
+            title=f'Recipe {i}',
+            time_minutes=rng.randint(5, 240),
+            price=rng.randint(100, 9999) / 100
+        ) for i in range(recipes)),
+        batch_size=batch_size
+    )
+
+    pick_tags = _picker(rng, tag_objs, tags_per_recipe, skew)
+    pick_ingredients = _picker(
+        rng, ingredient_objs, ingredients_per_recipe, skew
+    )
+    tag_links = []
+    ingredient_links = []
+    for recipe in recipe_objs:
+        for tag in pick_tags():
+            tag_links.append(
+                Recipe.tags.through(recipe_id=recipe.id, tag_id=tag.id)
+            )
+        for ingredient in pick_ingredients():
+            ingredient_links.append(Recipe.ingredients.through(
+                recipe_id=recipe.id, ingredients_id=ingredient.id
+            ))
+        # Flush links as we go so memory stays bounded by batch_size
+        if len(tag_links) + len(ingredient_links) >= batch_size:
+            _flush_links(tag_links, ingredient_links, batch_size)
+    _flush_links(tag_links, ingredient_links, batch_size)
+    # bulk_create skips the signals that maintain search vectors and the
+    # change log
+    Recipe.objects.filter(user=user).update_search_vector()
+    for kind, objs in ((ChangeLogEntry.TAG, tag_objs),
+                       (ChangeLogEntry.INGREDIENT, ingredient_objs),
+                       (ChangeLogEntry.RECIPE, recipe_objs)):
+        ChangeLogEntry.objects.record(user.pk, kind, (o.id for o in objs))
+    return recipe_objs
+
+
+def _picker(rng, objs, k, skew):
+    """Return a function sampling k distinct objs with a Zipf skew"""
+    k = min(k, len(objs))
+    if not skew:
+        return lambda: rng.sample(objs, k)
+    cum_weights = list(itertools.accumulate(
+        1 / n ** skew for n in range(1, len(objs) + 1)
+    ))
+
+    def pick():
+        picked = {}
+        while len(picked) < k:
+            for obj in rng.choices(objs, cum_weights=cum_weights, k=k):
+                picked.setdefault(obj.id, obj)
+        return list(picked.values())[:k]
+    return pick
+
+
+def _flush_links(tag_links, ingredient_links, batch_size):
+    """Write and clear the pending through table rows"""
+    Recipe.tags.through.objects.bulk_create(
+        tag_links, batch_size=batch_size
+    )
+    Recipe.ingredients.through.objects.bulk_create(
+        ingredient_links, batch_size=batch_size
+    )
+    tag_links.clear()
+    ingredient_links.clear()
@@ -0,0 +1,166 @@
+from django.conf import settings
+from django.core.signals import request_started
+from django.db import connections
+from django.db.models.signals import (
+    m2m_changed, post_delete, post_save, pre_delete
+)
+from django.dispatch import receiver
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from core.authentication import token_cache
+from core.cache import response_cache
+from core.models import (
+    Tag, Ingredients, Recipe, RecipeImageRendition, ChangeLogEntry,
+    changes_quieted
+)
+
+
+# Recipe field linking to each model whose names are in the search vector
+SEARCH_RELATIONS = {Tag: 'tags', Ingredients: 'ingredients'}
+
+# Change log kind recorded for each synced model
+CHANGE_KINDS = {
+    Recipe: ChangeLogEntry.RECIPE,
+    Tag: ChangeLogEntry.TAG,
+    Ingredients: ChangeLogEntry.INGREDIENT,
+}
+
+
+@receiver([post_save, post_delete], sender=Token)
+def invalidate_token(sender, instance, **kwargs):
+    """Drop a saved or deleted token from the token cache"""
+    token_cache.delete(instance.key)
+
+
+@receiver([post_save, post_delete], sender=settings.AUTH_USER_MODEL)
+def invalidate_user_tokens(sender, instance, **kwargs):
+    """Drop a user's tokens so deactivation or changes apply right away"""
+    for key in Token.objects.filter(
+        user_id=instance.pk
+    ).values_list('key', flat=True):
+        token_cache.delete(key)
+
+
+@receiver(request_started)
+def check_connection_health(**kwargs):
+    """Close persistent connections that stopped answering before reuse"""
+    for conn in connections.all():
+        if conn.settings_dict.get('CONN_HEALTH_CHECKS') and \
+                conn.connection is not None and not conn.is_usable():
+            conn.close()
+
+
+@receiver(post_save, sender=Recipe)
+def update_recipe_search_vector(sender, instance, update_fields=None,
+                                **kwargs):
+    """Rebuild a saved recipe's search vector when its title may differ"""
+    if update_fields is None or 'title' in update_fields:
+        Recipe.objects.filter(pk=instance.pk).update_search_vector()
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def update_linked_search_vector(sender, instance, action, reverse, pk_set,
+                                **kwargs):
+    """Refresh the recipes whose tags or ingredients changed"""
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            _refresh_recipes(instance.user_id, [instance.pk])
+    elif action == 'pre_clear':
+        _remember_linked_recipes(instance)
+    elif action == 'post_clear':
+        _update_remembered_recipes(instance)
+    elif action in ('post_add', 'post_remove'):
+        _refresh_recipes(instance.user_id, pk_set)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredients)
+def update_renamed_search_vector(sender, instance, created, **kwargs):
+    """Refresh the recipes linked to a saved tag or ingredient"""
+    if not created:
+        _remember_linked_recipes(instance)
+        _update_remembered_recipes(instance)
+
+
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Ingredients)
+def remember_deleted_links(sender, instance, **kwargs):
+    """Note the recipes of a tag/ingredient before its links cascade"""
+    _remember_linked_recipes(instance)
+
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredients)
+def update_deleted_search_vector(sender, instance, **kwargs):
+    """Refresh the recipes a deleted tag or ingredient was linked to"""
+    _update_remembered_recipes(instance)
+
+
+def _remember_linked_recipes(instance):
+    instance._search_recipe_ids = list(Recipe.objects.filter(**{
+        SEARCH_RELATIONS[type(instance)]: instance
+    }).values_list('pk', flat=True))
+
+
+def _update_remembered_recipes(instance):
+    recipe_ids = getattr(instance, '_search_recipe_ids', None)
+    if recipe_ids:
+        _refresh_recipes(instance.user_id, recipe_ids)
+
+
+def _refresh_recipes(user_id, recipe_ids):
+    """Rebuild the search vectors of recipes and mark them as changed"""
+    Recipe.objects.filter(pk__in=recipe_ids).update_search_vector(
+        updated_at=timezone.now()
+    )
+    _log_changes(user_id, ChangeLogEntry.RECIPE, recipe_ids)
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredients)
+def log_saved(sender, instance, **kwargs):
+    """Log a saved recipe, tag or ingredient for delta sync"""
+    _log_changes(instance.user_id, CHANGE_KINDS[sender], [instance.pk])
+
+
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredients)
+def log_deleted(sender, instance, **kwargs):
+    """Log a tombstone for a deleted recipe, tag or ingredient"""
+    _log_changes(
+        instance.user_id, CHANGE_KINDS[sender], [instance.pk], deleted=True
+    )
+
+
+def _log_changes(user_id, kind, object_ids, deleted=False):
+    if not changes_quieted(user_id):
+        ChangeLogEntry.objects.record(user_id, kind, object_ids, deleted)
+
+
+@receiver([post_save, post_delete], sender=Recipe)
+@receiver([post_save, post_delete], sender=Tag)
+@receiver([post_save, post_delete], sender=Ingredients)
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def invalidate_user_responses(sender, instance, **kwargs):
+    """Drop the cached responses of the user owning a changed object"""
+    if kwargs.get('action', 'post').startswith('pre') or \
+            changes_quieted(instance.user_id):
+        return
+    response_cache.bump(instance.user_id)
+
+
+@receiver([post_save, post_delete], sender=RecipeImageRendition)
+def invalidate_rendition_responses(sender, instance, **kwargs):
+    """Drop the cached responses listing a changed rendition"""
+    if changes_quieted():
+        # Cascading from recipes changed in bulk, whose owner is bumped
+        return
+    for user_id in Recipe.objects.filter(
+        pk=instance.recipe_id
+    ).values_list('user_id', flat=True):
+        response_cache.bump(user_id)
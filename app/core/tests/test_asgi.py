@@ -0,0 +1,130 @@
+import asyncio
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.wsgi import get_wsgi_application
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+
+from core.asgi import ASGIHandler
+from core.models import Recipe, Tag
+
+
+TAGS_URL = reverse('recipe:tag-list')
+EXPORT_URL = reverse('recipe:recipe-export')
+
+
+def http_scope(path, method='GET', query_string=b'', headers=()):
+    return {
+        'type': 'http',
+        'http_version': '1.1',
+        'method': method,
+        'scheme': 'http',
+        'path': path,
+        'root_path': '',
+        'query_string': query_string,
+        'headers': [(b'host', b'testserver')] + list(headers),
+        'server': ('testserver', 80),
+        'client': ('127.0.0.1', 50000),
+    }
+
+
+@override_settings(RESPONSE_CACHE={'BACKEND': None})
+class ASGIHandlerTests(TransactionTestCase):
+    # Views run on the handler's threads, which only see committed rows
+
+    def setUp(self):
+        self.handler = ASGIHandler(get_wsgi_application(), threads=2)
+        self.user = get_user_model().objects.create_user(
+            'test@londonappdev.com', 'testpass'
+        )
+        token = Token.objects.create(user=self.user)
+        self.auth = (b'authorization', f'Token {token.key}'.encode())
+
+    def tearDown(self):
+        # The connections of the pool threads close as the threads end
+        self.handler.executor.shutdown()
+
+    def request(self, scope, *messages):
+        """Send scope and messages to the handler and return its replies"""
+        messages = list(messages) or [{'type': 'http.request'}]
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message)
+
+        asyncio.run(self.handler(scope, receive, send))
+        return sent
+
+    def test_get(self):
+        """Test a read is served and sent as one body"""
+        Tag.objects.create(user=self.user, name='Vegan')
+
+        start, body = self.request(
+            http_scope(TAGS_URL, headers=[self.auth])
+        )
+
+        self.assertEqual(start['type'], 'http.response.start')
+        self.assertEqual(start['status'], 200)
+        self.assertIn(
+            (b'content-type', b'application/json'), start['headers']
+        )
+        self.assertFalse(body.get('more_body', False))
+        names = [tag['name'] for tag in json.loads(body['body'])['results']]
+        self.assertEqual(names, ['Vegan'])
+
+    def test_post_body_in_chunks(self):
+        """Test a request body sent in several messages is reassembled"""
+        payload = json.dumps({'name': 'Hot'}).encode()
+        headers = [self.auth, (b'content-type', b'application/json')]
+
+        start, body = self.request(
+            http_scope(TAGS_URL, method='POST', headers=headers),
+            {'type': 'http.request', 'body': payload[:5], 'more_body': True},
+            {'type': 'http.request', 'body': payload[5:]}
+        )
+
+        self.assertEqual(start['status'], 201)
+        self.assertTrue(Tag.objects.filter(name='Hot').exists())
+
+    def test_streaming_response(self):
+        """Test a streaming response is sent as it is produced"""
+        for i in range(3):
+            Recipe.objects.create(user=self.user, title=f'Recipe {i}',
+                                  time_minutes=5, price=1)
+
+        sent = self.request(http_scope(
+            EXPORT_URL, query_string=b'format=ndjson', headers=[self.auth]
+        ))
+
+        self.assertEqual(sent[0]['status'], 200)
+        self.assertTrue(all(m['more_body'] for m in sent[1:-1]))
+        self.assertFalse(sent[-1].get('more_body', False))
+        lines = b''.join(m.get('body', b'') for m in sent[1:]).splitlines()
+        self.assertEqual(len(lines), 3)
+
+    def test_client_disconnect(self):
+        """Test nothing runs for a client that left mid request"""
+        sent = self.request(
+            http_scope(TAGS_URL, method='POST', headers=[self.auth]),
+            {'type': 'http.disconnect'}
+        )
+
+        self.assertEqual(sent, [])
+        self.assertFalse(Tag.objects.exists())
+
+    def test_lifespan(self):
+        """Test startup and shutdown are acknowledged"""
+        sent = self.request(
+            {'type': 'lifespan'},
+            {'type': 'lifespan.startup'},
+            {'type': 'lifespan.shutdown'}
+        )
+
+        self.assertEqual([m['type'] for m in sent], [
+            'lifespan.startup.complete', 'lifespan.shutdown.complete'
+        ])
@@ -0,0 +1,128 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.authentication import token_cache
+
+
+ME_URL = reverse('user:me')
+TAGS_URL = reverse('recipe:tag-list')
+
+LOCMEM_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'tokens': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'token-auth-tests',
+    },
+}
+
+
+# Count the queries of every request rather than serving cached responses
+@override_settings(RESPONSE_CACHE={'BACKEND': None})
+class CachedTokenAuthenticationTests(TestCase):
+
+    def setUp(self):
+        token_cache.clear()
+        self.user = get_user_model().objects.create_user(
+            'test@londonappdev.com',
+            'testpass',
+            name='Test'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def tearDown(self):
+        token_cache.clear()
+
+    def test_second_request_skips_token_query(self):
+        """Test a cached token is authenticated without a query"""
+        self.client.get(TAGS_URL)
+
+        # Only the tag list and its ETag queries remain once cached
+        with self.assertNumQueries(2):
+            res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        stats = token_cache.stats()
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['misses'], 1)
+
+    def test_invalid_token_rejected(self):
+        """Test an unknown token is still rejected"""
+        self.client.credentials(HTTP_AUTHORIZATION='Token not-a-key')
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(token_cache.stats()['size'], 0)
+
+    def test_deleted_token_invalidated(self):
+        """Test deleting a token removes it from the cache"""
+        self.client.get(TAGS_URL)
+        self.token.delete()
+
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user_invalidated(self):
+        """Test deactivating a user stops their cached token working"""
+        self.client.get(TAGS_URL)
+        self.user.is_active = False
+        self.user.save()
+
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_updated_user_not_stale(self):
+        """Test requests see changes made to the user"""
+        self.client.patch(ME_URL, {'name': 'New Name'})
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.data['name'], 'New Name')
+
+    @patch('core.authentication.time.monotonic')
+    def test_entries_expire(self, monotonic):
+        """Test entries older than the TTL are looked up again"""
+        monotonic.return_value = 1000
+        self.client.get(TAGS_URL)
+        monotonic.return_value = 1000 + token_cache.config['TTL'] + 1
+
+        with self.assertNumQueries(3):
+            self.client.get(TAGS_URL)
+
+    @override_settings(TOKEN_AUTH_CACHE={'MAX_SIZE': 1})
+    def test_least_recently_used_evicted(self):
+        """Test the cache never holds more than MAX_SIZE entries"""
+        other = get_user_model().objects.create_user('other@appdev.com')
+        other_token = Token.objects.create(user=other)
+        self.client.get(TAGS_URL)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {other_token.key}')
+        self.client.get(TAGS_URL)
+
+        stats = token_cache.stats()
+        self.assertEqual(stats['size'], 1)
+        self.assertEqual(stats['evictions'], 1)
+
+    @override_settings(
+        CACHES=LOCMEM_CACHES, TOKEN_AUTH_CACHE={'BACKEND': 'tokens'}
+    )
+    def test_shared_backend(self):
+        """Test entries are shared through the configured cache"""
+        self.client.get(TAGS_URL)
+        token_cache.clear()
+
+        with self.assertNumQueries(2):
+            res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        key = self.token.key
+        self.token.delete()
+        self.assertIsNone(token_cache.get(key))
@@ -0,0 +1,31 @@
+from django.test import SimpleTestCase
+
+from core import benchmark
+
+
+class BenchmarkTests(SimpleTestCase):
+
+    def test_percentile(self):
+        """Test percentiles use the nearest rank"""
+        values = list(range(100, 0, -1))
+
+        self.assertEqual(benchmark.percentile(values, 50), 50)
+        self.assertEqual(benchmark.percentile(values, 99), 99)
+        self.assertEqual(benchmark.percentile([7], 95), 7)
+
+    def test_compare(self):
+        """Test latency regresses past the threshold, queries at once"""
+        before = {'list': {'p50_ms': 10, 'p95_ms': 20, 'queries': 2}}
+        after = {
+            'list': {'p50_ms': 10.5, 'p95_ms': 25, 'queries': 3},
+            'new': {'p50_ms': 1, 'p95_ms': 1, 'queries': 1},
+        }
+
+        changes = {
+            metric: regressed for name, metric, _, _, regressed
+            in benchmark.compare(before, after, threshold=10)
+        }
+
+        self.assertEqual(
+            changes, {'p50_ms': False, 'p95_ms': True, 'queries': True}
+        )
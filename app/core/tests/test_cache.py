@@ -0,0 +1,179 @@
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import transaction
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.cache import response_cache
+from core.models import Tag, Recipe
+
+
+TAGS_URL = reverse('recipe:tag-list')
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+def detail_url(recipe_id):
+    """Return the url for specific recipe"""
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+class ResponseCacheTests(TransactionTestCase):
+    # Cached responses are invalidated as changes commit
+
+    def setUp(self):
+        response_cache.clear()
+        self.user = get_user_model().objects.create_user(
+            'test@londonappdev.com',
+            'testpass'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_repeated_list_served_from_cache(self):
+        """Test polling a list again only runs the ETag query"""
+        Tag.objects.create(user=self.user, name='Vegan')
+        first = self.client.get(TAGS_URL)
+
+        with self.assertNumQueries(1):
+            second = self.client.get(TAGS_URL)
+
+        self.assertEqual(first['X-Cache'], 'MISS')
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(response_cache.stats()['hit_ratio'], 0.5)
+
+    def test_query_params_cached_apart(self):
+        """Test different query params are cached as different responses"""
+        self.client.get(TAGS_URL)
+
+        res = self.client.get(TAGS_URL, {'page_size': 1})
+
+        self.assertEqual(res['X-Cache'], 'MISS')
+
+    def test_users_cached_apart(self):
+        """Test users never see each other's cached responses"""
+        Tag.objects.create(user=self.user, name='Vegan')
+        self.client.get(TAGS_URL)
+        other = get_user_model().objects.create_user('other@appdev.com')
+        self.client.force_authenticate(other)
+
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res['X-Cache'], 'MISS')
+        self.assertEqual(res.data['results'], [])
+
+    def test_save_and_delete_invalidate(self):
+        """Test saving or deleting an object drops its user's responses"""
+        self.client.get(TAGS_URL)
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+
+        res = self.client.get(TAGS_URL)
+        self.assertEqual(len(res.data['results']), 1)
+
+        tag.delete()
+        res = self.client.get(TAGS_URL)
+        self.assertEqual(res.data['results'], [])
+
+    def test_invalidated_on_commit(self):
+        """Test responses cached before a change commits are dropped"""
+        generation = response_cache.generation(self.user.pk)
+        with transaction.atomic():
+            Tag.objects.create(user=self.user, name='Vegan')
+            # A concurrent request still reads the old rows here
+            self.assertEqual(
+                response_cache.generation(self.user.pk), generation
+            )
+
+        self.assertNotEqual(
+            response_cache.generation(self.user.pk), generation
+        )
+
+    def test_rolled_back_change_keeps_cache(self):
+        """Test a change that rolls back does not drop responses"""
+        self.client.get(TAGS_URL)
+        try:
+            with transaction.atomic():
+                Tag.objects.create(user=self.user, name='Vegan')
+                raise RuntimeError
+        except RuntimeError:
+            pass
+
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res['X-Cache'], 'HIT')
+
+    def test_link_change_invalidates(self):
+        """Test adding a tag to a recipe drops the cached detail"""
+        recipe = Recipe.objects.create(
+            user=self.user, title='Curry', time_minutes=5, price=5.00
+        )
+        self.client.get(detail_url(recipe.id))
+        Tag.objects.create(user=self.user, name='Vegan')
+        self.client.get(detail_url(recipe.id))
+
+        recipe.tags.add(Tag.objects.get(user=self.user))
+        res = self.client.get(detail_url(recipe.id))
+
+        self.assertEqual(res['X-Cache'], 'MISS')
+        self.assertEqual(res.data['tags'][0]['name'], 'Vegan')
+
+    def test_bulk_create_invalidates(self):
+        """Test recipes created in bulk show up in a cached list"""
+        self.client.get(RECIPES_URL)
+        payload = [{'title': 'Curry', 'time_minutes': 5, 'price': '5.00'}]
+        self.client.post(reverse('recipe:recipe-bulk'), payload,
+                         format='json')
+
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_evicted_generation_does_not_revive_entries(self):
+        """Test losing the generation counter never serves old entries"""
+        self.client.get(TAGS_URL)
+        caches['default'].delete(
+            response_cache._generation_key(self.user.pk)
+        )
+
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res['X-Cache'], 'MISS')
+
+    def test_file_based_backend(self):
+        """Test responses can be shared through a file based cache"""
+        with tempfile.TemporaryDirectory() as location:
+            file_caches = {
+                'default': {
+                    'BACKEND': 'django.core.cache.backends.locmem.'
+                               'LocMemCache',
+                },
+                'files': {
+                    'BACKEND': 'django.core.cache.backends.filebased.'
+                               'FileBasedCache',
+                    'LOCATION': location,
+                },
+            }
+            with override_settings(
+                CACHES=file_caches, RESPONSE_CACHE={'BACKEND': 'files'}
+            ):
+                self.client.get(TAGS_URL)
+                res = self.client.get(TAGS_URL)
+                self.assertEqual(res['X-Cache'], 'HIT')
+
+                Tag.objects.create(user=self.user, name='Vegan')
+                res = self.client.get(TAGS_URL)
+                self.assertEqual(res['X-Cache'], 'MISS')
+
+    @override_settings(RESPONSE_CACHE={'BACKEND': None})
+    def test_disabled(self):
+        """Test no caching happens without a backend"""
+        self.client.get(TAGS_URL)
+
+        res = self.client.get(TAGS_URL)
+
+        self.assertNotIn('X-Cache', res)
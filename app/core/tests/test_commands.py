@@ -1,8 +1,22 @@
+import io
+import json
+import os
+import tempfile
+from decimal import Decimal
 from unittest.mock import patch
 
+from django.contrib.auth import get_user_model
 from django.core.management import call_command
-from django.db.utils import OperationalError
-from django.test import TestCase
+from django.core.management.base import CommandError
+from django.db import connection
+from django.db.utils import DatabaseError, OperationalError
+from django.test import TestCase, override_settings
+from django.urls import get_resolver
+
+from core.importing import RecipeImporter
+from core.models import (
+    Tag, Ingredients, Recipe, ChangeLogEntry, ImportCheckpoint
+)
 
 
 class CommandTest(TestCase):
@@ -21,3 +35,273 @@ class CommandTest(TestCase):
             gi.side_effect = [OperationalError] * 5 + [True]
             call_command('wait_for_db')
             self.assertEqual(gi.call_count, 6)
+
+
+class ImportRecipesCommandTests(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@londonappdev.com',
+            'testpass'
+        )
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+
+    def write(self, name, content):
+        """Write content to a file in the test directory and return it"""
+        path = os.path.join(self.dir.name, name)
+        with open(path, 'w') as f:
+            f.write(content)
+        return path
+
+    def ndjson(self, name, records):
+        """Write records as an NDJSON file and return its path"""
+        return self.write(
+            name, ''.join(json.dumps(record) + '\n' for record in records)
+        )
+
+    def import_recipes(self, *args, **options):
+        """Run the import for the user and return its output"""
+        out = io.StringIO()
+        call_command('import_recipes', *args, user=self.user.email,
+                     stdout=out, **options)
+        return out.getvalue()
+
+    def test_import_ndjson(self):
+        """Test recipes are imported with their tags and ingredients"""
+        path = self.ndjson('recipes.ndjson', [
+            {'id': 99, 'title': 'Curry', 'time_minutes': 20,
+             'price': '5.50', 'link': '', 'tags': ['Vegan', 'Hot'],
+             'ingredients': ['Rice']},
+            {'title': 'Stew', 'time_minutes': 90, 'price': 8,
+             'tags': ['Vegan'], 'ingredients': []},
+        ])
+
+        out = self.import_recipes(path, batch_size=1)
+
+        recipes = Recipe.objects.filter(user=self.user).order_by('id')
+        self.assertEqual([r.title for r in recipes], ['Curry', 'Stew'])
+        self.assertEqual(
+            sorted(recipes[0].tags.values_list('name', flat=True)),
+            ['Hot', 'Vegan']
+        )
+        self.assertEqual(recipes[1].price, Decimal('8.00'))
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+        self.assertTrue(
+            Recipe.objects.filter(search_vector='rice').exists()
+        )
+        self.assertEqual(ChangeLogEntry.objects.filter(
+            user=self.user, kind=ChangeLogEntry.RECIPE
+        ).count(), 2)
+        self.assertIn('Imported 2 recipes (', out)
+
+    def test_import_csv(self):
+        """Test the CSV of an export can be imported"""
+        path = self.write(
+            'recipes.csv',
+            'id,title,time_minutes,price,link,tags,ingredients\n'
+            '1,Curry,20,5.50,,Vegan|Hot,Rice|Peas\n'
+        )
+
+        self.import_recipes(path)
+
+        recipe = Recipe.objects.get(user=self.user)
+        self.assertEqual(
+            sorted(recipe.ingredients.values_list('name', flat=True)),
+            ['Peas', 'Rice']
+        )
+
+    def test_import_stdin(self):
+        """Test recipes can be piped in"""
+        stdin = io.TextIOWrapper(io.BytesIO(
+            b'{"title": "Curry", "time_minutes": 20, "price": 5}\n'
+        ))
+
+        with patch('sys.stdin', stdin):
+            self.import_recipes('-')
+
+        self.assertTrue(Recipe.objects.filter(user=self.user).exists())
+
+    def test_existing_names_reused(self):
+        """Test names the user already has are linked, not duplicated"""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        other = get_user_model().objects.create_user('other@appdev.com')
+        Ingredients.objects.create(user=other, name='Rice')
+        path = self.ndjson('recipes.ndjson', [
+            {'title': 'Curry', 'time_minutes': 20, 'price': 5,
+             'tags': ['Vegan'], 'ingredients': ['Rice']},
+        ])
+
+        self.import_recipes(path)
+
+        recipe = Recipe.objects.get(user=self.user)
+        self.assertEqual(list(recipe.tags.all()), [tag])
+        self.assertEqual(recipe.ingredients.get().user, self.user)
+        self.assertEqual(Tag.objects.count(), 1)
+
+    def test_invalid_record_keeps_committed_batches(self):
+        """Test a bad record stops the import after the earlier batches"""
+        path = self.ndjson('recipes.ndjson', [
+            {'title': 'Curry', 'time_minutes': 20, 'price': 5},
+            {'title': 'Stew', 'time_minutes': 'long', 'price': 5},
+        ])
+
+        with self.assertRaisesRegex(CommandError, 'Line 2'):
+            self.import_recipes(path, batch_size=1)
+
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 1)
+
+    def test_resume_from_checkpoint(self):
+        """Test an interrupted import continues after its last batch"""
+        records = [
+            {'title': f'Recipe {i}', 'time_minutes': 5, 'price': 1}
+            for i in range(5)
+        ]
+        checkpoint = 'cookbook'
+        path = self.ndjson('recipes.ndjson', records[:3] + [{}])
+        with self.assertRaises(CommandError):
+            self.import_recipes(path, batch_size=2, checkpoint=checkpoint)
+        path = self.ndjson('recipes.ndjson', records)
+
+        out = self.import_recipes(path, batch_size=2, checkpoint=checkpoint)
+
+        self.assertIn('Resuming after 2 records', out)
+        self.assertEqual(
+            sorted(Recipe.objects.values_list('title', flat=True)),
+            [r['title'] for r in records]
+        )
+        self.assertEqual(ImportCheckpoint.objects.get(
+            user=self.user, name=checkpoint
+        ).records, 5)
+
+    def test_checkpoint_committed_with_batch(self):
+        """Test a batch failing to commit does not advance the checkpoint"""
+        path = self.ndjson('recipes.ndjson', [
+            {'title': f'Recipe {i}', 'time_minutes': 5, 'price': 1}
+            for i in range(4)
+        ])
+        write = RecipeImporter.write
+        batches = []
+
+        def write_then_fail(importer, batch):
+            write(importer, batch)
+            batches.append(batch)
+            if len(batches) == 2:
+                raise DatabaseError('connection lost')
+
+        with patch.object(RecipeImporter, 'write', write_then_fail):
+            with self.assertRaises(DatabaseError):
+                self.import_recipes(path, batch_size=2, checkpoint='cookbook')
+
+        self.assertEqual(Recipe.objects.count(), 2)
+        self.assertEqual(ImportCheckpoint.objects.get().records, 2)
+        out = self.import_recipes(path, batch_size=2, checkpoint='cookbook')
+        self.assertIn('Resuming after 2 records', out)
+        self.assertEqual(Recipe.objects.count(), 4)
+
+    def test_missing_file(self):
+        """Test a file that cannot be read fails the command cleanly"""
+        path = os.path.join(self.dir.name, 'missing.ndjson')
+
+        with self.assertRaisesRegex(CommandError, 'Cannot read'):
+            self.import_recipes(path)
+
+    def test_import_with_copy(self):
+        """Test the COPY path writes the same rows"""
+        if connection.vendor != 'postgresql':
+            self.skipTest('COPY needs PostgreSQL')
+        path = self.ndjson('recipes.ndjson', [
+            {'title': 'Curry, "hot"', 'time_minutes': 20, 'price': 5,
+             'tags': ['Vegan'], 'ingredients': ['Rice', 'Peas']},
+        ] * 3)
+
+        self.import_recipes(path, copy=True, batch_size=2)
+
+        recipes = Recipe.objects.filter(user=self.user)
+        self.assertEqual(recipes.count(), 3)
+        self.assertEqual(recipes[0].title, 'Curry, "hot"')
+        self.assertEqual(recipes[0].ingredients.count(), 2)
+        self.assertEqual(Recipe.ingredients.through.objects.count(), 6)
+        self.assertEqual(Ingredients.objects.count(), 2)
+        last_id = max(r.id for r in recipes)
+        new = Recipe.objects.create(
+            user=self.user, title='After', time_minutes=5, price=1
+        )
+        self.assertGreater(new.id, last_id)
+
+    def test_unknown_user(self):
+        """Test importing for a missing user fails"""
+        path = self.ndjson('recipes.ndjson', [])
+
+        with self.assertRaises(CommandError):
+            call_command('import_recipes', path, user='nobody@appdev.com')
+
+
+class BenchApiCommandTests(TestCase):
+
+    def test_bench_api(self):
+        """Test every API route is timed, recorded and rolled back"""
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'bench.json')
+            call_command('bench_api', users=1, recipes=5, tags=3,
+                         ingredients=3, repeat=2, warmup=0, output=output,
+                         stdout=io.StringIO())
+            with open(output) as f:
+                report = json.load(f)
+
+            out = io.StringIO()
+            call_command('bench_api', users=1, recipes=5, tags=3,
+                         ingredients=3, repeat=1, warmup=0,
+                         only=['user me'], compare=output, stdout=out)
+
+        resolver = get_resolver()
+        routes = {
+            f'{namespace}:{pattern.name}'
+            for namespace in ('recipe', 'user')
+            for pattern in _named_patterns(
+                resolver.namespace_dict[namespace][1]
+            )
+        }
+        results = report['results']
+        self.assertEqual({r['route'] for r in results.values()}, routes)
+        for name, result in results.items():
+            self.assertTrue(
+                all(code < 400 for code in result['status']), name
+            )
+            self.assertLessEqual(result['p50_ms'], result['p99_ms'])
+        self.assertEqual(report['options']['repeat'], 2)
+        self.assertIn('user me update', out.getvalue())
+        self.assertFalse(Recipe.objects.exists())
+        self.assertFalse(get_user_model().objects.exists())
+
+
+def _named_patterns(resolver):
+    """Yield the named url patterns under resolver"""
+    for pattern in resolver.url_patterns:
+        if hasattr(pattern, 'url_patterns'):
+            yield from _named_patterns(pattern)
+        elif pattern.name:
+            yield pattern
+
+
+class BenchLoginCommandTests(TestCase):
+
+    @override_settings(PASSWORD_HASHING={'ARGON2_MEMORY_COST': 1024,
+                                         'BCRYPT_ROUNDS': 4,
+                                         'PBKDF2_ITERATIONS': 1000})
+    def test_bench_login(self):
+        """Test each hasher is timed and nothing is kept"""
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'logins.json')
+            call_command('bench_login', logins=2, threads=2, output=output,
+                         stdout=io.StringIO())
+            with open(output) as f:
+                report = json.load(f)
+
+        self.assertEqual(
+            set(report['results']), {'argon2', 'bcrypt', 'pbkdf2'}
+        )
+        for result in report['results'].values():
+            self.assertGreater(result['logins_per_second'], 0)
+            self.assertGreater(result['logins_per_second_per_core'], 0)
+        self.assertFalse(get_user_model().objects.exists())
@@ -0,0 +1,215 @@
+import threading
+import time
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TransactionTestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tag, Recipe
+from recipe.views import RecipeViewSet
+
+
+TAGS_URL = reverse('recipe:tag-list')
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+def detail_url(recipe_id):
+    """Return the url for specific recipe"""
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+class ConditionalRequestTests(TransactionTestCase):
+    # Cached responses are invalidated as changes commit
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@londonappdev.com',
+            'testpass'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.recipe = Recipe.objects.create(
+            user=self.user, title='Curry', time_minutes=5, price=5.00
+        )
+
+    def test_unchanged_list_not_modified(self):
+        """Test a list with the current ETag gets a 304 from one query"""
+        etag = self.client.get(RECIPES_URL)['ETag']
+
+        with self.assertNumQueries(1):
+            res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res['ETag'], etag)
+        self.assertIn('no-cache', res['Cache-Control'])
+
+    def test_list_etag_follows_changes(self):
+        """Test creating, linking and deleting all change the list ETag"""
+        etags = [self.client.get(RECIPES_URL)['ETag']]
+        other = Recipe.objects.create(
+            user=self.user, title='Stew', time_minutes=5, price=5.00
+        )
+        etags.append(self.client.get(RECIPES_URL)['ETag'])
+        self.recipe.tags.add(Tag.objects.create(user=self.user, name='Hot'))
+        etags.append(self.client.get(RECIPES_URL)['ETag'])
+        other.delete()
+        etags.append(self.client.get(RECIPES_URL)['ETag'])
+
+        self.assertEqual(len(set(etags)), 4)
+
+    def test_list_etag_per_query(self):
+        """Test different query params get different ETags"""
+        res = self.client.get(RECIPES_URL)
+        other = self.client.get(RECIPES_URL, {'page_size': 1})
+
+        self.assertNotEqual(res['ETag'], other['ETag'])
+
+    def test_assigned_only_etag_follows_links(self):
+        """Test linking a tag changes the assigned_only ETag"""
+        tag = Tag.objects.create(user=self.user, name='Hot')
+        params = {'assigned_only': 1}
+        etag = self.client.get(TAGS_URL, params)['ETag']
+
+        self.recipe.tags.add(tag)
+        res = self.client.get(TAGS_URL, params, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_unchanged_detail_not_modified(self):
+        """Test a recipe with the current ETag or date gets a 304"""
+        res = self.client.get(detail_url(self.recipe.id))
+        self.assertIn('Last-Modified', res)
+
+        not_modified = self.client.get(
+            detail_url(self.recipe.id), HTTP_IF_NONE_MATCH=res['ETag']
+        )
+        self.assertEqual(
+            not_modified.status_code, status.HTTP_304_NOT_MODIFIED
+        )
+        not_modified = self.client.get(
+            detail_url(self.recipe.id),
+            HTTP_IF_MODIFIED_SINCE=res['Last-Modified']
+        )
+        self.assertEqual(
+            not_modified.status_code, status.HTTP_304_NOT_MODIFIED
+        )
+
+    def test_detail_etag_per_representation(self):
+        """Test a detail in other fields or formats gets another ETag"""
+        url = detail_url(self.recipe.id)
+        etags = {
+            self.client.get(url)['ETag'],
+            self.client.get(url, {'fields': 'title'})['ETag'],
+            self.client.get(url, HTTP_ACCEPT='text/html')['ETag'],
+        }
+
+        self.assertEqual(len(etags), 3)
+
+    def test_renamed_tag_changes_detail_etag(self):
+        """Test renaming a linked tag changes the recipe's ETag"""
+        tag = Tag.objects.create(user=self.user, name='Hot')
+        self.recipe.tags.add(tag)
+        etag = self.client.get(detail_url(self.recipe.id))['ETag']
+
+        tag.name = 'Mild'
+        tag.save()
+        res = self.client.get(
+            detail_url(self.recipe.id), HTTP_IF_NONE_MATCH=etag
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['tags'][0]['name'], 'Mild')
+
+    def test_update_with_stale_etag_rejected(self):
+        """Test If-Match with an outdated ETag does not update"""
+        etag = self.client.get(detail_url(self.recipe.id))['ETag']
+        Recipe.objects.get(pk=self.recipe.id).save()
+
+        res = self.client.patch(
+            detail_url(self.recipe.id), {'title': 'Lost update'},
+            HTTP_IF_MATCH=etag
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.title, 'Curry')
+
+    def test_concurrent_updates_with_same_etag(self):
+        """Test of two updates checked against one ETag only one wins"""
+        etag = self.client.get(detail_url(self.recipe.id))['ETag']
+        saving, release = threading.Event(), threading.Event()
+        perform_update = RecipeViewSet.perform_update
+        statuses = {}
+
+        def pause_first_save(view, serializer):
+            if not saving.is_set():
+                saving.set()
+                release.wait(10)
+            perform_update(view, serializer)
+
+        def update(title):
+            client = APIClient()
+            client.force_authenticate(self.user)
+            try:
+                statuses[title] = client.patch(
+                    detail_url(self.recipe.id), {'title': title},
+                    HTTP_IF_MATCH=etag
+                ).status_code
+            finally:
+                connection.close()
+
+        with patch.object(RecipeViewSet, 'perform_update', pause_first_save):
+            first = threading.Thread(target=update, args=('First',))
+            first.start()
+            self.assertTrue(saving.wait(10))
+            # Checked while the first update is between its check and save
+            second = threading.Thread(target=update, args=('Second',))
+            second.start()
+            self._wait_for_lock(second)
+            release.set()
+            first.join()
+            second.join()
+
+        self.assertEqual(statuses, {
+            'First': status.HTTP_200_OK,
+            'Second': status.HTTP_412_PRECONDITION_FAILED,
+        })
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.title, 'First')
+
+    def _wait_for_lock(self, thread):
+        """Wait until thread ends or a session waits for a lock"""
+        with connection.cursor() as cursor:
+            while thread.is_alive():
+                cursor.execute(
+                    "SELECT count(*) FROM pg_stat_activity "
+                    "WHERE datname = current_database() "
+                    "AND wait_event_type = 'Lock'"
+                )
+                if cursor.fetchone()[0]:
+                    return
+                time.sleep(0.05)
+
+    def test_update_with_current_etag(self):
+        """Test If-Match with the current ETag updates and sends the next"""
+        etag = self.client.get(detail_url(self.recipe.id))['ETag']
+
+        res = self.client.patch(
+            detail_url(self.recipe.id), {'title': 'Green curry'},
+            HTTP_IF_MATCH=etag
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res['ETag'], etag)
+        res = self.client.put(
+            detail_url(self.recipe.id),
+            {'title': 'Red curry', 'time_minutes': 5, 'price': '5.00',
+             'tags': [], 'ingredients': []},
+            HTTP_IF_MATCH=res['ETag']
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
@@ -0,0 +1,158 @@
+import threading
+from unittest import skipUnless
+from unittest.mock import Mock, patch
+
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+
+from core.db.pool import ConnectionPool, PoolTimeout
+from core.db.pooled import base as pooled
+from core.signals import check_connection_health
+
+
+class FakeConnection:
+
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class ConnectionPoolTests(SimpleTestCase):
+
+    def test_min_size_opened_up_front(self):
+        """Test MIN_SIZE connections are opened when the pool is made"""
+        connect = Mock(side_effect=FakeConnection)
+        pool = ConnectionPool(connect, min_size=2, max_size=4)
+
+        self.assertEqual(connect.call_count, 2)
+        self.assertEqual(pool.stats()['idle'], 2)
+
+    def test_connections_reused(self):
+        """Test a returned connection is handed out again"""
+        pool = ConnectionPool(FakeConnection, min_size=0, max_size=2)
+        conn = pool.getconn()
+        pool.putconn(conn)
+
+        self.assertIs(pool.getconn(), conn)
+        stats = pool.stats()
+        self.assertEqual(stats['checkouts'], 2)
+        self.assertEqual(stats['size'], 1)
+        self.assertEqual(stats['in_use'], 1)
+
+    def test_timeout_when_exhausted(self):
+        """Test getconn gives up once max_size connections are out"""
+        pool = ConnectionPool(
+            FakeConnection, min_size=0, max_size=1, timeout=0.01
+        )
+        pool.getconn()
+
+        with self.assertRaises(PoolTimeout):
+            pool.getconn()
+        self.assertEqual(pool.stats()['timeouts'], 1)
+
+    def test_waits_for_returned_connection(self):
+        """Test a waiting checkout gets the next returned connection"""
+        pool = ConnectionPool(FakeConnection, min_size=0, max_size=1)
+        conn = pool.getconn()
+        timer = threading.Timer(0.05, pool.putconn, [conn])
+        timer.start()
+
+        self.assertIs(pool.getconn(), conn)
+        timer.join()
+        stats = pool.stats()
+        self.assertEqual(stats['waits'], 1)
+        self.assertGreater(stats['max_wait_time'], 0)
+
+    def test_unhealthy_connection_replaced(self):
+        """Test an idle connection failing its health check is replaced"""
+        pool = ConnectionPool(
+            FakeConnection, min_size=1, max_size=1,
+            health_check=Mock(return_value=False)
+        )
+        stale = pool._idle[0]
+
+        conn = pool.getconn()
+
+        self.assertIsNot(conn, stale)
+        self.assertTrue(stale.closed)
+        self.assertEqual(pool.stats()['discarded'], 1)
+
+    def test_connection_failing_reset_discarded(self):
+        """Test a connection that cannot be reset is not pooled"""
+        pool = ConnectionPool(
+            FakeConnection, min_size=0, max_size=1,
+            reset=Mock(side_effect=Exception)
+        )
+        conn = pool.getconn()
+        pool.putconn(conn)
+
+        self.assertTrue(conn.closed)
+        self.assertEqual(pool.stats()['size'], 0)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'requires PostgreSQL')
+class PooledBackendTests(TestCase):
+
+    def setUp(self):
+        self.wrapper = pooled.DatabaseWrapper(
+            dict(
+                connection.settings_dict,
+                ENGINE='core.db.pooled',
+                CONN_HEALTH_CHECKS=True,
+                POOL={'MIN_SIZE': 0, 'MAX_SIZE': 2, 'TIMEOUT': 5}
+            ),
+            alias='pooled-test'
+        )
+
+    def tearDown(self):
+        self.wrapper.close()
+        pooled.close_pools(connection.settings_dict['NAME'])
+
+    def test_connection_returned_to_pool(self):
+        """Test closing the wrapper keeps the connection for reuse"""
+        with self.wrapper.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        raw = self.wrapper.connection
+        self.wrapper.close()
+
+        with self.wrapper.cursor() as cursor:
+            cursor.execute('SELECT 1')
+            self.assertEqual(cursor.fetchone(), (1,))
+
+        self.assertIs(self.wrapper.connection, raw)
+        stats = self.wrapper.pool.stats()
+        self.assertEqual(stats['checkouts'], 2)
+        self.assertEqual(stats['size'], 1)
+
+    def test_open_transaction_rolled_back(self):
+        """Test a connection returned mid transaction is rolled back"""
+        self.wrapper.set_autocommit(False)
+        with self.wrapper.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        raw = self.wrapper.connection
+        self.wrapper.close()
+
+        self.assertEqual(
+            raw.get_transaction_status(),
+            pooled.extensions.TRANSACTION_STATUS_IDLE
+        )
+
+
+class ConnectionHealthCheckTests(SimpleTestCase):
+
+    def test_unusable_connection_closed(self):
+        """Test persistent connections failing a ping are closed"""
+        broken = Mock(
+            settings_dict={'CONN_HEALTH_CHECKS': True},
+            is_usable=Mock(return_value=False)
+        )
+        unchecked = Mock(settings_dict={'CONN_HEALTH_CHECKS': False})
+
+        with patch('core.signals.connections') as connections:
+            connections.all.return_value = [broken, unchecked]
+            check_connection_health()
+
+        broken.close.assert_called_once_with()
+        unchecked.is_usable.assert_not_called()
@@ -0,0 +1,106 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import identify_hasher, make_password
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import hashers
+
+
+TOKEN_URL = reverse('user:token')
+PBKDF2_FIRST = [
+    'core.hashers.PBKDF2PasswordHasher',
+    'core.hashers.Argon2PasswordHasher',
+]
+ARGON2_FIRST = list(reversed(PBKDF2_FIRST))
+
+
+class PasswordHasherTests(TestCase):
+
+    def setUp(self):
+        caches['default'].clear()
+        self.client = APIClient()
+        self.payload = {
+            'email': 'test@londonappdev.com',
+            'password': 'testpass',
+        }
+
+    def _create_user(self):
+        return get_user_model().objects.create_user(**self.payload)
+
+    @override_settings(PASSWORD_HASHERS=ARGON2_FIRST)
+    def test_new_passwords_use_preferred_hasher(self):
+        """Test passwords are hashed with the first configured hasher"""
+        user = self._create_user()
+
+        self.assertEqual(identify_hasher(user.password).algorithm, 'argon2')
+        self.assertIn('m=19456,t=2,p=1', user.password)
+
+    def test_rehash_on_login(self):
+        """Test a login upgrades a hash of another hasher"""
+        with override_settings(PASSWORD_HASHERS=PBKDF2_FIRST):
+            user = self._create_user()
+        self.assertTrue(user.password.startswith('pbkdf2_sha256$'))
+
+        with override_settings(PASSWORD_HASHERS=ARGON2_FIRST):
+            res = self.client.post(TOKEN_URL, self.payload)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        user.refresh_from_db()
+        self.assertTrue(user.password.startswith('argon2$'))
+        self.assertTrue(user.check_password(self.payload['password']))
+
+    @override_settings(PASSWORD_HASHERS=ARGON2_FIRST)
+    def test_rehash_on_cost_change(self):
+        """Test a login upgrades a hash made with an older cost"""
+        with override_settings(PASSWORD_HASHING={'ARGON2_TIME_COST': 1}):
+            user = self._create_user()
+        self.assertIn('t=1', user.password)
+
+        res = self.client.post(TOKEN_URL, self.payload)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        user.refresh_from_db()
+        self.assertIn('t=2', user.password)
+
+    @override_settings(PASSWORD_HASHERS=ARGON2_FIRST)
+    def test_failed_login_keeps_hash(self):
+        """Test a wrong password never rewrites the stored hash"""
+        with override_settings(PASSWORD_HASHERS=PBKDF2_FIRST):
+            user = self._create_user()
+        encoded = user.password
+
+        self.client.post(
+            TOKEN_URL, {'email': user.email, 'password': 'wrong'}
+        )
+
+        user.refresh_from_db()
+        self.assertEqual(user.password, encoded)
+
+    def test_hashing_runs_on_executor(self):
+        """Test hashes are computed on the hashing threads"""
+        with patch.object(hashers, 'run_hash',
+                          wraps=hashers.run_hash) as run_hash:
+            make_password('testpass')
+
+        self.assertTrue(run_hash.called)
+
+    @override_settings(PASSWORD_HASHING={'TIMEOUT': 0})
+    def test_busy_when_queue_full(self):
+        """Test hashing is refused once every slot is taken"""
+        executor, pending = hashers._get_executor()
+        taken = 0
+        while pending.acquire(blocking=False):
+            taken += 1
+        try:
+            with self.assertRaises(hashers.HashingBusy):
+                hashers.run_hash(make_password, 'testpass')
+        finally:
+            for i in range(taken):
+                pending.release()
+
+        self.assertTrue(hashers.run_hash(make_password, 'testpass'))
@@ -0,0 +1,121 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.metrics import metrics
+from core.models import Tag
+
+
+TAGS_URL = reverse('recipe:tag-list')
+METRICS_URL = reverse('metrics')
+
+
+@override_settings(RESPONSE_CACHE={'BACKEND': None})
+class MetricsTests(TestCase):
+
+    def setUp(self):
+        metrics.clear()
+        self.user = get_user_model().objects.create_user(
+            'test@londonappdev.com',
+            'testpass'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_request_recorded_per_action(self):
+        """Test a request is counted under its view and action"""
+        Tag.objects.create(user=self.user, name='Vegan')
+
+        self.client.get(TAGS_URL)
+        self.client.post(TAGS_URL, {'name': 'Hot'})
+
+        stats = metrics.stats()
+        listed = stats[('recipe:tag-list', 'list', 'GET')]
+        self.assertEqual(listed['requests'], 1)
+        self.assertEqual(listed['queries'], 2)
+        self.assertGreater(listed['sql_time'], 0)
+        self.assertGreater(listed['serialize_time'], 0)
+        self.assertGreater(listed['render_time'], 0)
+        self.assertIn(('recipe:tag-list', 'create', 'POST'), stats)
+
+    def test_prometheus_endpoint(self):
+        """Test the totals are served in the Prometheus text format"""
+        self.client.get(TAGS_URL)
+
+        res = self.client.get(METRICS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res['Content-Type'].startswith('text/plain'))
+        body = res.content.decode()
+        labels = 'view="recipe:tag-list",action="list",method="GET"'
+        self.assertIn(
+            f'http_requests_total{{{labels},status="200"}} 1', body
+        )
+        self.assertIn(
+            f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} 1',
+            body
+        )
+        self.assertIn(f'http_request_db_queries_total{{{labels}}} 2', body)
+        self.assertIn('# TYPE http_request_duration_seconds histogram', body)
+
+    @override_settings(METRICS={'TOKEN': 'secret'})
+    def test_endpoint_token(self):
+        """Test a configured token is required to read the metrics"""
+        res = self.client.get(METRICS_URL)
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+        res = self.client.get(
+            METRICS_URL, HTTP_AUTHORIZATION='Bearer secret'
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    @override_settings(METRICS={'SERVER_TIMING': True})
+    def test_server_timing(self):
+        """Test the breakdown is sent when Server-Timing is on"""
+        res = self.client.get(TAGS_URL)
+
+        timing = res['Server-Timing']
+        for metric in ('db;', 'serialize;', 'render;', 'total;'):
+            self.assertIn(metric, timing)
+        self.assertIn('desc="2 queries"', timing)
+
+    def test_no_server_timing_by_default(self):
+        """Test no Server-Timing header is sent unless configured"""
+        res = self.client.get(TAGS_URL)
+
+        self.assertNotIn('Server-Timing', res)
+
+    @override_settings(METRICS={'ENABLED': False})
+    def test_disabled(self):
+        """Test nothing is recorded or served when disabled"""
+        self.client.get(TAGS_URL)
+
+        res = self.client.get(METRICS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(metrics.stats(), {})
+
+    @override_settings(METRICS={'REPEATED_QUERY_THRESHOLD': 3})
+    def test_repeated_queries_flagged(self):
+        """Test a statement run repeatedly in one request is reported"""
+        current = metrics.begin()
+        try:
+            for i in range(3):
+                metrics.execute_wrapper(
+                    lambda *args: None, 'SELECT %s', [i], False, {}
+                )
+            metrics.execute_wrapper(
+                lambda *args: None, 'SELECT 1', [], False, {}
+            )
+            with self.assertLogs('core.metrics', 'WARNING') as logs:
+                metrics.observe('recipe:tag-list', 'list', 'GET', 200,
+                                current)
+        finally:
+            metrics.end()
+
+        self.assertIn('ran the same query 3 times: SELECT %s', logs.output[0])
+        stats = metrics.stats()[('recipe:tag-list', 'list', 'GET')]
+        self.assertEqual(stats['queries'], 4)
+        self.assertEqual(stats['repeated_queries'], 3)
@@ -0,0 +1,107 @@
+import os
+import runpy
+import subprocess
+import sys
+from unittest.mock import patch
+
+from django.conf import settings
+from django.test import LiveServerTestCase, SimpleTestCase
+from django.urls import reverse
+
+from core import benchmark
+
+
+def import_settings(setting='DEBUG', **env):
+    """Import the settings in a fresh interpreter and print a setting"""
+    environ = {
+        key: value for key, value in os.environ.items()
+        if key not in ('DJANGO_ENV', 'DJANGO_SETTINGS_MODULE')
+    }
+    environ.update(env)
+    return subprocess.run(
+        [sys.executable, '-c', 'from app import settings; '
+                               f'print(settings.{setting})'],
+        cwd=settings.BASE_DIR, env=environ, stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE, universal_newlines=True
+    )
+
+
+class ServingProfileTests(SimpleTestCase):
+
+    def test_development_by_default(self):
+        """Test the development settings are used without DJANGO_ENV"""
+        result = import_settings()
+
+        self.assertEqual(result.stdout.strip(), 'True')
+
+    def test_production_requires_secrets(self):
+        """Test production refuses to start without a secret key"""
+        result = import_settings(
+            DJANGO_ENV='production', DJANGO_SECRET_KEY='',
+            DJANGO_ALLOWED_HOSTS='example.com'
+        )
+
+        self.assertNotEqual(result.returncode, 0)
+        self.assertIn('DJANGO_SECRET_KEY', result.stderr)
+
+    def test_production(self):
+        """Test production turns DEBUG off"""
+        result = import_settings(
+            DJANGO_ENV='production', DJANGO_SECRET_KEY='secret',
+            DJANGO_ALLOWED_HOSTS='example.com'
+        )
+
+        self.assertEqual(result.stdout.strip(), 'False')
+
+    def test_production_metrics_need_token(self):
+        """Test production only serves metrics behind a token"""
+        env = {
+            'DJANGO_ENV': 'production', 'DJANGO_SECRET_KEY': 'secret',
+            'DJANGO_ALLOWED_HOSTS': 'example.com', 'METRICS_TOKEN': '',
+        }
+        result = import_settings("METRICS['ENABLED']", **env)
+        self.assertEqual(result.stdout.strip(), 'False')
+
+        result = import_settings(METRICS_ENABLED='1', **env)
+        self.assertNotEqual(result.returncode, 0)
+        self.assertIn('METRICS_TOKEN', result.stderr)
+
+        env['METRICS_TOKEN'] = 'token'
+        result = import_settings("METRICS['ENABLED']", **env)
+        self.assertEqual(result.stdout.strip(), 'True')
+
+    def test_gunicorn_sized_from_cpus(self):
+        """Test gunicorn runs 2 * CPUs + 1 workers unless configured"""
+        path = os.path.join(settings.BASE_DIR, 'gunicorn.conf.py')
+        with patch.dict(os.environ, {'WEB_CONCURRENCY': ''}), \
+                patch('multiprocessing.cpu_count', return_value=4):
+            config = runpy.run_path(path)
+        self.assertEqual(config['workers'], 9)
+        self.assertTrue(config['preload_app'])
+        self.assertEqual(config['worker_class'], 'sync')
+        self.assertGreater(config['max_requests'], 0)
+
+        with patch.dict(os.environ, {'WEB_CONCURRENCY': '3'}):
+            self.assertEqual(runpy.run_path(path)['workers'], 3)
+
+
+class DriveTests(LiveServerTestCase):
+
+    def test_drive(self):
+        """Test the load driver reports the rate and statuses it got"""
+        result = benchmark.drive(
+            self.live_server_url + reverse('metrics'),
+            duration=0.5, concurrency=2
+        )
+
+        self.assertGreater(result['requests'], 0)
+        self.assertGreater(result['rps'], 0)
+        self.assertEqual(result['status'], {'200': result['requests']})
+
+    def test_drive_with_slow_clients(self):
+        """Test slow clients stay connected while the load runs"""
+        url = self.live_server_url + reverse('metrics')
+        with benchmark.slow_clients(url, 2, interval=0.1):
+            result = benchmark.drive(url, duration=0.5, concurrency=2)
+
+        self.assertEqual(result['status'], {'200': result['requests']})
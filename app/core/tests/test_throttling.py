@@ -0,0 +1,128 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+
+TOKEN_URL = reverse('user:token')
+
+
+@override_settings(LOGIN_THROTTLE={'EMAIL_LIMIT': 3, 'ADDRESS_LIMIT': 5})
+class LoginThrottleTests(TestCase):
+
+    def setUp(self):
+        caches['default'].clear()
+        # Stay in one window, a new one would start the counts over
+        clock = patch('core.throttling.time')
+        clock.start().time.return_value = 1_000_000.0
+        self.addCleanup(clock.stop)
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@londonappdev.com', 'testpass'
+        )
+
+    def tearDown(self):
+        caches['default'].clear()
+
+    def _login(self, password, email='test@londonappdev.com', **extra):
+        return self.client.post(
+            TOKEN_URL, {'email': email, 'password': password}, **extra
+        )
+
+    def test_email_throttled_before_hashing(self):
+        """Test an email with too many failures is refused unhashed"""
+        for i in range(3):
+            res = self._login('wrong')
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        with patch('user.serializers.authenticate') as authenticate:
+            res = self._login('testpass')
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn('Retry-After', res)
+        authenticate.assert_not_called()
+
+    def test_email_case_counted_together(self):
+        """Test failures for the same email in any case share a counter"""
+        for email in ('test@londonappdev.com', 'TEST@londonappdev.com',
+                      ' Test@LondonAppDev.com'):
+            self._login('wrong', email=email)
+
+        res = self._login('testpass')
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_success_resets_email(self):
+        """Test a successful login forgets the failures of its email"""
+        for i in range(2):
+            self._login('wrong')
+
+        res = self._login('testpass')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        for i in range(2):
+            self._login('wrong')
+        res = self._login('testpass')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_address_throttled(self):
+        """Test an address failing for many emails is refused"""
+        for i in range(5):
+            self._login('wrong', email=f'user{i}@londonappdev.com')
+
+        res = self._login('testpass')
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+        res = self._login('testpass', REMOTE_ADDR='10.0.0.2')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_forwarded_for_ignored(self):
+        """Test a client changing X-Forwarded-For is still throttled"""
+        for i in range(5):
+            self._login('wrong', email=f'user{i}@londonappdev.com',
+                        HTTP_X_FORWARDED_FOR=f'192.0.2.{i}')
+
+        res = self._login('testpass', HTTP_X_FORWARDED_FOR='192.0.2.99')
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    @override_settings(REST_FRAMEWORK={'NUM_PROXIES': 1})
+    def test_address_from_proxy(self):
+        """Test behind a proxy only the address it appended counts"""
+        for i in range(5):
+            self._login('wrong', email=f'user{i}@londonappdev.com',
+                        HTTP_X_FORWARDED_FOR=f'192.0.2.{i}, 198.51.100.7')
+
+        res = self._login('testpass',
+                          HTTP_X_FORWARDED_FOR='192.0.2.99, 198.51.100.7')
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+        res = self._login('testpass', HTTP_X_FORWARDED_FOR='198.51.100.8')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_list_body_counted_by_address(self):
+        """Test a body that is not an object is refused, not an error"""
+        for i in range(5):
+            res = self.client.post(
+                TOKEN_URL, [{'email': 'test@londonappdev.com'}],
+                format='json'
+            )
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.client.post(TOKEN_URL, ['x'], format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    @override_settings(LOGIN_THROTTLE={'BACKEND': None})
+    def test_disabled(self):
+        """Test logins are never throttled without a backend"""
+        for i in range(5):
+            self._login('wrong')
+
+        res = self._login('testpass')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
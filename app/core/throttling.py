@@ -0,0 +1,91 @@
+import hashlib
+import time
+from collections.abc import Mapping
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.throttling import BaseThrottle
+
+
+DEFAULT_LOGIN_THROTTLE = {
+    'BACKEND': 'default',
+    'WINDOW': 300,
+    'ADDRESS_LIMIT': 50,
+    'EMAIL_LIMIT': 10,
+}
+
+
+class LoginThrottle(BaseThrottle):
+    """
+    Reject logins from addresses or for emails with too many failures
+
+    Failures are counted in fixed windows of WINDOW seconds, per client
+    address and per email. The check runs before the credentials are
+    looked at, so a throttled attempt costs no password hash. The view
+    reports the outcome of every attempt it lets through with failed()
+    and succeeded().
+    """
+    key_prefix = 'login-throttle:'
+
+    @property
+    def config(self):
+        config = dict(DEFAULT_LOGIN_THROTTLE)
+        config.update(getattr(settings, 'LOGIN_THROTTLE', {}))
+        return config
+
+    @property
+    def backend(self):
+        alias = self.config['BACKEND']
+        return caches[alias] if alias else None
+
+    def allow_request(self, request, view):
+        if self.backend is None:
+            return True
+        keys = self._keys(request)
+        counts = self.backend.get_many([key for key, limit in keys])
+        return all(counts.get(key, 0) < limit for key, limit in keys)
+
+    def wait(self):
+        window = self.config['WINDOW']
+        return window - time.time() % window
+
+    def failed(self, request):
+        """Count a failed login"""
+        backend = self.backend
+        if backend is None:
+            return
+        for key, limit in self._keys(request):
+            # Kept past the window so a slow clock never reads it early
+            backend.add(key, 0, self.config['WINDOW'] * 2)
+            try:
+                backend.incr(key)
+            except ValueError:
+                backend.set(key, 1, self.config['WINDOW'] * 2)
+
+    def succeeded(self, request):
+        """Forget the failures of an email once its owner logs in"""
+        backend = self.backend
+        if backend is None:
+            return
+        backend.delete_many([
+            key for key, limit in self._keys(request) if ':email:' in key
+        ])
+
+    def _keys(self, request):
+        """Return (cache key, limit) of each counter of the request"""
+        config = self.config
+        window = int(time.time() // config['WINDOW'])
+        keys = [(
+            f'{self.key_prefix}address:{self.get_ident(request)}:{window}',
+            config['ADDRESS_LIMIT']
+        )]
+        # Bodies that are not objects only count towards the address
+        data = request.data
+        email = data.get('email') if isinstance(data, Mapping) else None
+        if isinstance(email, str) and email:
+            digest = hashlib.sha1(email.strip().lower().encode()).hexdigest()
+            keys.append((
+                f'{self.key_prefix}email:{digest}:{window}',
+                config['EMAIL_LIMIT']
+            ))
+        return keys
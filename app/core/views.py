@@ -0,0 +1,21 @@
+from django.http import Http404, HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.http import require_GET
+
+from core.metrics import metrics
+
+
+@require_GET
+def metrics_view(request):
+    """Return the request metrics in the Prometheus text format"""
+    config = metrics.config
+    if not config['ENABLED']:
+        raise Http404
+    token = config['TOKEN']
+    if token and not constant_time_compare(
+        request.META.get('HTTP_AUTHORIZATION', ''), f'Bearer {token}'
+    ):
+        return HttpResponseForbidden()
+    return HttpResponse(
+        metrics.render(), content_type='text/plain; version=0.0.4'
+    )
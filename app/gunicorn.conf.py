@@ -0,0 +1,56 @@
+"""
+gunicorn settings of the production serving profile
+
+Run from the project directory with:
+
+    DJANGO_ENV=production gunicorn -c gunicorn.conf.py app.wsgi
+
+Every value can be overridden from the environment. Workers default to
+2 * CPUs + 1 processes, each serving GUNICORN_THREADS requests at once.
+See app/asgi.py for the ASGI mode.
+"""
+import multiprocessing
+import os
+
+
+def _env_int(name, default):
+    """Return an integer from the environment, empty counts as unset"""
+    return int(os.environ.get(name) or default)
+
+
+bind = os.environ.get('GUNICORN_BIND') or '0.0.0.0:8000'
+
+workers = _env_int('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1)
+# More than one thread switches to the gthread worker
+threads = _env_int('GUNICORN_THREADS', 1)
+# uvicorn.workers.UvicornWorker serves app.asgi, each worker then runs
+# views on ASGI_THREADS threads and waits on clients in its event loop
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS') or 'sync'
+
+# Import the app once in the master so workers fork with it loaded
+preload_app = True
+
+# Recycle workers after about this many requests to bound their memory,
+# the jitter keeps them from restarting all at once
+max_requests = _env_int('GUNICORN_MAX_REQUESTS', 1000)
+max_requests_jitter = _env_int('GUNICORN_MAX_REQUESTS_JITTER', 100)
+
+timeout = _env_int('GUNICORN_TIMEOUT', 30)
+graceful_timeout = _env_int('GUNICORN_GRACEFUL_TIMEOUT', 30)
+keepalive = _env_int('GUNICORN_KEEPALIVE', 5)
+
+# Worker heartbeats on a disk backed /tmp can stall under Docker
+if os.path.isdir('/dev/shm'):
+    worker_tmp_dir = '/dev/shm'
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG') or None
+errorlog = '-'
+
+
+def pre_fork(server, worker):
+    """Close connections the master opened so no worker shares them"""
+    from django.db import connections
+    from core.db.pooled.base import close_pools
+
+    connections.close_all()
+    close_pools()
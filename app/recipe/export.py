@@ -0,0 +1,77 @@
+import csv
+import json
+from itertools import islice
+
+from core.models import Recipe
+
+
+FIELDS = ('id', 'title', 'time_minutes', 'price', 'link')
+CHUNK_SIZE = 1000
+
+
+def iter_recipes(user, chunk_size=CHUNK_SIZE):
+    """
+    Yield every recipe of user as a dict with its tag and ingredient names
+
+    Recipes are read through a server side cursor chunk_size rows at a
+    time, and each chunk's names are fetched with one query per relation,
+    so memory use does not grow with the size of the account.
+    """
+    rows = Recipe.objects.filter(user=user).order_by('id').values(
+        *FIELDS
+    ).iterator(chunk_size=chunk_size)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        ids = [row['id'] for row in chunk]
+        tags = _names_by_recipe(Recipe.tags.through, 'tag', ids)
+        ingredients = _names_by_recipe(
+            Recipe.ingredients.through, 'ingredients', ids
+        )
+        for row in chunk:
+            row['price'] = str(row['price'])
+            row['tags'] = tags.get(row['id'], [])
+            row['ingredients'] = ingredients.get(row['id'], [])
+            yield row
+
+
+def _names_by_recipe(through, field, recipe_ids):
+    """Return {recipe id: [names]} of the objects linked through field"""
+    names = {}
+    for recipe_id, name in through.objects.filter(
+        recipe_id__in=recipe_ids
+    ).order_by(f'{field}__name').values_list('recipe_id', f'{field}__name'):
+        names.setdefault(recipe_id, []).append(name)
+    return names
+
+
+def to_ndjson(recipes):
+    """Yield each recipe as a line of JSON"""
+    for recipe in recipes:
+        yield json.dumps(recipe) + '\n'
+
+
+class _Echo:
+    """File-like object handing back what csv.writer writes to it"""
+
+    def write(self, value):
+        return value
+
+
+def to_csv(recipes):
+    """Yield a header and one CSV line per recipe, names joined by '|'"""
+    writer = csv.writer(_Echo())
+    yield writer.writerow(FIELDS + ('tags', 'ingredients'))
+    for recipe in recipes:
+        yield writer.writerow(
+            [recipe[field] for field in FIELDS] +
+            ['|'.join(recipe['tags']), '|'.join(recipe['ingredients'])]
+        )
+
+
+# Content type and encoder of each export format
+FORMATS = {
+    'ndjson': ('application/x-ndjson', to_ndjson),
+    'csv': ('text/csv', to_csv),
+}
@@ -0,0 +1,132 @@
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from PIL import Image
+
+from core.cache import response_cache
+from core.models import Recipe, RecipeImageRendition, ChangeLogEntry
+
+
+logger = logging.getLogger(__name__)
+
+PIL_FORMATS = {
+    RecipeImageRendition.JPEG: 'JPEG',
+    RecipeImageRendition.WEBP: 'WEBP',
+}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Return the worker pool that renders recipe images"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.RECIPE_IMAGE_WORKERS,
+                thread_name_prefix='recipe-image'
+            )
+        return _executor
+
+
+def schedule_renditions(recipe_id):
+    """Render a recipe's image in the background once the upload commits"""
+    transaction.on_commit(
+        lambda: get_executor().submit(_render_in_worker, recipe_id)
+    )
+
+
+def _render_in_worker(recipe_id):
+    """Render renditions from a worker thread with its own DB connection"""
+    close_old_connections()
+    try:
+        render_renditions(recipe_id)
+    except Exception:
+        logger.exception('Rendering image of recipe %s failed', recipe_id)
+    finally:
+        close_old_connections()
+
+
+def render_renditions(recipe_id):
+    """
+    Decode a recipe's uploaded image and store its renditions
+
+    The image is converted to RGB and, for every size in
+    RECIPE_IMAGE_SIZES, scaled down to fit that size and saved in every
+    rendition format. The previous renditions are replaced and
+    image_status records the outcome. Renditions of an image that was
+    replaced while rendering are thrown away.
+    """
+    recipe = Recipe.objects.get(pk=recipe_id)
+    name = recipe.image.name
+    if not name:
+        return
+    current = Recipe.objects.filter(pk=recipe_id, image=name)
+    current.touch(image_status=Recipe.IMAGE_PROCESSING)
+    _changed(recipe)
+
+    renditions = []
+    try:
+        with recipe.image.open('rb') as image_file:
+            image = Image.open(image_file)
+            image = image.convert('RGB')
+        # Scale largest first so each size is resampled from the last one
+        for size in sorted(settings.RECIPE_IMAGE_SIZES, reverse=True):
+            image.thumbnail((size, size), Image.LANCZOS)
+            for fmt, pil_format in PIL_FORMATS.items():
+                renditions.append(_save_rendition(
+                    recipe, image, size, fmt, pil_format
+                ))
+    except Exception:
+        current.touch(image_status=Recipe.IMAGE_FAILED)
+        _changed(recipe)
+        for rendition in renditions:
+            rendition.image.delete(save=False)
+        raise
+
+    with transaction.atomic():
+        still_current = current.select_for_update().exists()
+        if still_current:
+            stale = list(recipe.renditions.all())
+            RecipeImageRendition.objects.filter(
+                pk__in=[rendition.pk for rendition in stale]
+            ).delete()
+            RecipeImageRendition.objects.bulk_create(renditions)
+            current.touch(image_status=Recipe.IMAGE_READY)
+        else:
+            stale = renditions
+    _changed(recipe)
+    for rendition in stale:
+        rendition.image.delete(save=False)
+
+
+def _changed(recipe):
+    """Invalidate and log a recipe changed without sending signals"""
+    response_cache.bump(recipe.user_id)
+    ChangeLogEntry.objects.record(
+        recipe.user_id, ChangeLogEntry.RECIPE, [recipe.id]
+    )
+
+
+def _save_rendition(recipe, image, size, fmt, pil_format):
+    """Encode image and store it as an unsaved rendition of recipe"""
+    buffer = BytesIO()
+    image.save(buffer, pil_format, quality=settings.RECIPE_IMAGE_QUALITY)
+    content = buffer.getvalue()
+    rendition = RecipeImageRendition(
+        recipe=recipe,
+        format=fmt,
+        size=size,
+        width=image.width,
+        height=image.height,
+        content_hash=hashlib.sha256(content).hexdigest()
+    )
+    rendition.image.save(f'rendition.{fmt}', ContentFile(content), save=False)
+    return rendition
@@ -0,0 +1,63 @@
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from core import benchmark
+from core.models import Tag, Ingredients
+from core.seeding import seed_recipes
+from recipe import views
+
+
+class Command(BaseCommand):
+    """Django command to benchmark the assigned_only tag/ingredient filter"""
+    help = 'Compare the DISTINCT join and EXISTS versions of assigned_only'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=100000)
+        parser.add_argument('--tags', type=int, default=200)
+        parser.add_argument('--ingredients', type=int, default=1000)
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            user = get_user_model().objects.create_user(
+                f'bench-{uuid.uuid4().hex}@example.com'
+            )
+            self.stdout.write(f"Seeding {options['recipes']} recipes...")
+            seed_recipes(
+                user,
+                recipes=options['recipes'],
+                tags=options['tags'],
+                ingredients=options['ingredients']
+            )
+            if connection.vendor == 'postgresql':
+                with connection.cursor() as cursor:
+                    cursor.execute('ANALYZE')
+
+            for model, viewset in [(Tag, views.TagViewSet),
+                                   (Ingredients, views.IngredientViewSet)]:
+                view = benchmark.get_view(
+                    viewset, user, params={'assigned_only': '1'}
+                )
+                ordering = view.paginator.get_ordering(
+                    view.request, view.get_queryset(), view
+                )
+                page = view.paginator.page_size + 1
+                querysets = [
+                    ('distinct join', model.objects.filter(
+                        recipe__isnull=False, user=user
+                    ).order_by(*ordering).distinct()),
+                    ('exists', view.get_queryset().order_by(*ordering)),
+                ]
+                for name, queryset in querysets:
+                    self.stdout.write(benchmark.time_queryset(
+                        f'{model.__name__} {name} page',
+                        queryset[:page], options['repeat']
+                    ))
+                    self.stdout.write(benchmark.time_queryset(
+                        f'{model.__name__} {name} all',
+                        queryset, options['repeat']
+                    ))
+            transaction.set_rollback(True)
@@ -0,0 +1,62 @@
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Q
+
+from core import benchmark
+from core.models import Recipe
+from core.seeding import seed_recipes
+from recipe import views
+
+
+class Command(BaseCommand):
+    """Django command to benchmark the recipe search"""
+    help = 'Compare the search vector with LIKE matching on recipe names'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=1000000)
+        parser.add_argument('--tags', type=int, default=200)
+        parser.add_argument('--ingredients', type=int, default=1000)
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            user = get_user_model().objects.create_user(
+                f'bench-{uuid.uuid4().hex}@example.com'
+            )
+            self.stdout.write(f"Seeding {options['recipes']} recipes...")
+            seed_recipes(
+                user,
+                recipes=options['recipes'],
+                tags=options['tags'],
+                ingredients=options['ingredients']
+            )
+            if connection.vendor == 'postgresql':
+                with connection.cursor() as cursor:
+                    cursor.execute('ANALYZE')
+
+            terms = [
+                ('rare', f"Recipe {options['recipes'] // 2}"),
+                ('common', 'Tag 7'),
+            ]
+            for name, term in terms:
+                view = benchmark.get_view(
+                    views.RecipeViewSet, user, params={'search': term}
+                )
+                page = view.paginator.page_size + 1
+                like = Recipe.objects.filter(
+                    Q(title__icontains=term) |
+                    Q(tags__name__icontains=term) |
+                    Q(ingredients__name__icontains=term),
+                    user=user
+                ).order_by('-id').distinct()
+                self.stdout.write(benchmark.time_queryset(
+                    f'{name} search page', benchmark.first_page(view),
+                    options['repeat']
+                ))
+                self.stdout.write(benchmark.time_queryset(
+                    f'{name} like page', like[:page], options['repeat']
+                ))
+            transaction.set_rollback(True)
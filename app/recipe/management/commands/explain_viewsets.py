@@ -0,0 +1,74 @@
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from core import benchmark
+from core.seeding import seed_recipes
+from recipe import views
+
+
+class Command(BaseCommand):
+    """Django command to print the query plans of the recipe viewsets"""
+    help = 'Seed a user and print EXPLAIN ANALYZE for each viewset queryset'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=10000)
+        parser.add_argument('--tags', type=int, default=100)
+        parser.add_argument('--ingredients', type=int, default=500)
+        parser.add_argument(
+            '--keep', action='store_true',
+            help='Keep the seeded data instead of rolling it back'
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            user = get_user_model().objects.create_user(
+                f'explain-{uuid.uuid4().hex}@example.com'
+            )
+            self.stdout.write(f"Seeding {options['recipes']} recipes...")
+            recipes = seed_recipes(
+                user,
+                recipes=options['recipes'],
+                tags=options['tags'],
+                ingredients=options['ingredients']
+            )
+            if connection.vendor == 'postgresql':
+                with connection.cursor() as cursor:
+                    cursor.execute('ANALYZE')
+
+            tag = user.tag_set.first()
+            ingredient = user.ingredients_set.first()
+            scenarios = [
+                ('tags list', views.TagViewSet, 'list', {}),
+                ('tags assigned_only', views.TagViewSet, 'list',
+                 {'assigned_only': '1'}),
+                ('ingredients list', views.IngredientViewSet, 'list', {}),
+                ('ingredients assigned_only', views.IngredientViewSet, 'list',
+                 {'assigned_only': '1'}),
+                ('recipes list', views.RecipeViewSet, 'list', {}),
+                ('recipes by tag', views.RecipeViewSet, 'list',
+                 {'tags': str(tag.id)}),
+                ('recipes by ingredient', views.RecipeViewSet, 'list',
+                 {'ingredients': str(ingredient.id)}),
+                ('recipe retrieve', views.RecipeViewSet, 'retrieve', {}),
+            ]
+            for title, viewset, action, params in scenarios:
+                view = benchmark.get_view(viewset, user, action, params)
+                if action == 'retrieve':
+                    queryset = view.get_queryset().filter(pk=recipes[0].pk)
+                else:
+                    queryset = benchmark.first_page(view)
+                self.stdout.write(self.style.MIGRATE_HEADING(title))
+                self.stdout.write(str(queryset.query))
+                self.stdout.write(self._explain(queryset))
+
+            if not options['keep']:
+                transaction.set_rollback(True)
+
+    def _explain(self, queryset):
+        """EXPLAIN a queryset, with ANALYZE where the database supports it"""
+        if connection.vendor == 'postgresql':
+            return queryset.explain(analyze=True, buffers=True)
+        return queryset.explain()
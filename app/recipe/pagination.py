@@ -0,0 +1,160 @@
+import json
+from functools import reduce
+from operator import or_
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Cursor pagination keyed on every field in the ordering
+
+    DRF's cursor pagination only positions on the first ordering field and
+    falls back to an offset on ties. Here the cursor holds the value of
+    every ordering field, so as long as the last one is unique each page is
+    a range scan on an index and deep pages cost the same as the first.
+    """
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.ordering_fields = [
+            _ordering_field(queryset, order.lstrip('-'))
+            for order in self.ordering
+        ]
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            reverse, current_position = False, None
+        else:
+            reverse, current_position = self.cursor[1:]
+
+        if reverse:
+            queryset = queryset.order_by(*_reverse_ordering(self.ordering))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+
+        if current_position is not None:
+            queryset = queryset.filter(
+                self._keyset_filter(self.position_values, reverse)
+            )
+
+        # Fetch one extra row to know whether a following page exists
+        results = list(queryset[:self.page_size + 1])
+        self.page = results[:self.page_size]
+
+        if len(results) > len(self.page):
+            has_following_position = True
+            following_position = self._get_position_from_instance(
+                results[-1], self.ordering
+            )
+        else:
+            has_following_position = False
+            following_position = None
+
+        if reverse:
+            self.page = list(reversed(self.page))
+            self.has_next = current_position is not None
+            self.has_previous = has_following_position
+            self.next_position = current_position
+            self.previous_position = following_position
+        else:
+            self.has_next = has_following_position
+            self.has_previous = current_position is not None
+            self.next_position = following_position
+            self.previous_position = current_position
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+
+        return self.page
+
+    def decode_cursor(self, request):
+        """Decode the cursor and convert its position to the ordering types"""
+        cursor = super().decode_cursor(request)
+        if cursor is None or cursor.position is None:
+            return cursor
+        try:
+            position = json.loads(cursor.position)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or \
+                len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        try:
+            self.position_values = [
+                field.to_python(value)
+                for field, value in zip(self.ordering_fields, position)
+            ]
+        except (ValueError, TypeError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        return cursor
+
+    def _keyset_filter(self, values, reverse):
+        """Return a filter for the rows that sort after values"""
+        fields = [order.lstrip('-') for order in self.ordering]
+        lookups = []
+        for order in self.ordering:
+            # Test for: (cursor reversed) XOR (field reversed)
+            if reverse != order.startswith('-'):
+                lookups.append('__lt')
+            else:
+                lookups.append('__gt')
+        clauses = []
+        for index, field in enumerate(fields):
+            equal = dict(zip(fields[:index], values[:index]))
+            clauses.append(
+                Q(**equal) & Q(**{field + lookups[index]: values[index]})
+            )
+        # The inclusive bound on the leading field keeps it a range scan
+        leading = Q(**{fields[0] + lookups[0] + 'e': values[0]})
+        return leading & reduce(or_, clauses)
+
+    def _get_position_from_instance(self, instance, ordering):
+        values = []
+        for order in ordering:
+            field_name = order.lstrip('-')
+            if isinstance(instance, dict):
+                values.append(str(instance[field_name]))
+            else:
+                values.append(str(getattr(instance, field_name)))
+        return json.dumps(values)
+
+
+def _ordering_field(queryset, name):
+    """Return the model field or annotation output field for name"""
+    if name in queryset.query.annotations:
+        return queryset.query.annotations[name].output_field
+    return queryset.model._meta.get_field(name)
+
+
+def _reverse_ordering(ordering):
+    """Reverse each field of an ordering tuple"""
+    return tuple(
+        order[1:] if order.startswith('-') else '-' + order
+        for order in ordering
+    )
+
+
+class RecipePagination(KeysetPagination):
+    """Paginate recipes newest first, or best match first when searching"""
+    ordering = '-id'
+    search_ordering = ('-rank', '-id')
+
+    def get_ordering(self, request, queryset, view):
+        if 'rank' in queryset.query.annotations:
+            return self.search_ordering
+        return super().get_ordering(request, queryset, view)
+
+
+class NamePagination(KeysetPagination):
+    """Paginate tags and ingredients by descending name"""
+    ordering = ('-name', '-id')
@@ -1,6 +1,18 @@
+from django.db import transaction
+from django.db.models import Case, Value, When
+from django.db.models.functions import Cast
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import urlencode
+from django.utils.translation import ugettext_lazy as _
 from rest_framework import serializers
+from rest_framework.settings import api_settings
 
-from core.models import Tag, Ingredients, Recipe
+from core.models import (
+    Tag, Ingredients, Recipe, RecipeImageRendition, ChangeLogEntry
+)
+
+from recipe.fields import UserPrimaryKeyRelatedField
 
 
 class TagSerializer(serializers.ModelSerializer):
@@ -21,22 +33,52 @@ class IngredientSerializer(serializers.ModelSerializer):
         read_only_fields = ('id',)
 
 
+class NameSerializer(serializers.Serializer):
+    """Read only serializer for typeahead rows of id and name"""
+    id = serializers.IntegerField(read_only=True)
+    name = serializers.CharField(read_only=True)
+
+
+class RecipeImageRenditionSerializer(serializers.ModelSerializer):
+    """Serializer for a rendition of a recipe image"""
+    url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = RecipeImageRendition
+        fields = ('format', 'size', 'width', 'height', 'url')
+        read_only_fields = fields
+
+    def get_url(self, obj):
+        """Return the image url, versioned by the rendition's content"""
+        url = reverse('recipe:recipe-image', args=[obj.recipe_id])
+        url += '?' + urlencode({
+            'size': obj.size,
+            'format': obj.format,
+            'v': obj.content_hash[:16],
+        })
+        request = self.context.get('request')
+        if request is not None:
+            return request.build_absolute_uri(url)
+        return url
+
+
 class RecipeSerializer(serializers.ModelSerializer):
     """serializer for recipe object"""
-    ingredients = serializers.PrimaryKeyRelatedField(
+    ingredients = UserPrimaryKeyRelatedField(
         many=True,
         queryset=Ingredients.objects.all()
     )
-    tags = serializers.PrimaryKeyRelatedField(
+    tags = UserPrimaryKeyRelatedField(
         many=True,
         queryset=Tag.objects.all()
     )
+    renditions = RecipeImageRenditionSerializer(many=True, read_only=True)
 
     class Meta:
         model = Recipe
         fields = (
                   'id', 'title', 'ingredients', 'time_minutes', 'price',
-                  'link', 'tags'
+                  'link', 'tags', 'renditions'
         )
         read_only_fields = ('id',)
 
@@ -46,11 +88,255 @@ class RecipeDetailSerializer(RecipeSerializer):
     ingredients = IngredientSerializer(many=True, read_only=True)
     tags = TagSerializer(many=True, read_only=True)
 
+    class Meta(RecipeSerializer.Meta):
+        fields = RecipeSerializer.Meta.fields + ('image', 'image_status')
+        read_only_fields = ('id', 'image', 'image_status')
+
+
+class RecipeBulkListSerializer(serializers.ListSerializer):
+    """
+    Validate and create or update many recipes at once
+
+    Each item's tag and ingredient ids are checked against the user's ids
+    fetched with one query per relation for the whole list, and everything
+    is written in a single transaction. New recipes and all links are
+    written with bulk_create, updated recipes with one UPDATE of CASE
+    expressions per batch of items changing the same fields. Updates are
+    given the user's recipes as instance, the ids are checked against it
+    with one query too.
+    """
+    max_items = 10000
+    batch_size = 1000
+    default_error_messages = {
+        'max_items': _('Ensure this list has no more than {max_items} items.'),
+        'does_not_exist': _('Invalid pks {pk_values} - objects do not exist.'),
+        'not_found': _('Not found.'),
+        'duplicate': _('Listed more than once.'),
+    }
+
+    def to_internal_value(self, data):
+        if isinstance(data, list) and len(data) > self.max_items:
+            raise serializers.ValidationError({
+                api_settings.NON_FIELD_ERRORS_KEY: [
+                    self.error_messages['max_items'].format(
+                        max_items=self.max_items
+                    )
+                ]
+            }, code='max_items')
+        if not isinstance(data, list):
+            return super().to_internal_value(data)
+
+        items = []
+        errors = []
+        for item in data:
+            try:
+                items.append(self.child.run_validation(item))
+                errors.append({})
+            except serializers.ValidationError as exc:
+                items.append(None)
+                errors.append(exc.detail)
+
+        if self.instance is not None:
+            self._check_recipes(items, errors)
+        user = self.context['request'].user
+        for field, model in (('tags', Tag), ('ingredients', Ingredients)):
+            wanted = {
+                pk for item in items if item for pk in item.get(field, [])
+            }
+            owned = set(model.objects.filter(
+                user=user, id__in=wanted
+            ).values_list('id', flat=True)) if wanted else set()
+            for item, item_errors in zip(items, errors):
+                if not item:
+                    continue
+                missing = [pk for pk in item.get(field, []) if pk not in owned]
+                if missing:
+                    item_errors[field] = [
+                        self.error_messages['does_not_exist'].format(
+                            pk_values=', '.join(str(pk) for pk in missing)
+                        )
+                    ]
+
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        return items
+
+    def _check_recipes(self, items, errors):
+        """Record an error for ids not among instance or listed twice"""
+        wanted = {item['id'] for item in items if item}
+        owned = set(self.instance.filter(
+            id__in=wanted
+        ).values_list('id', flat=True)) if wanted else set()
+        seen = set()
+        for item, item_errors in zip(items, errors):
+            if not item:
+                continue
+            if item['id'] not in owned:
+                item_errors['id'] = [self.error_messages['not_found']]
+            elif item['id'] in seen:
+                item_errors['id'] = [self.error_messages['duplicate']]
+            seen.add(item['id'])
+
+    def create(self, validated_data):
+        """Create the recipes and their links in one transaction"""
+        links = []
+        recipes = []
+        for item in validated_data:
+            item = dict(item)
+            links.append((item.pop('tags', []), item.pop('ingredients', [])))
+            recipes.append(Recipe(**item))
+
+        with transaction.atomic():
+            Recipe.objects.bulk_create(recipes, batch_size=self.batch_size)
+            ids = [recipe.id for recipe in recipes]
+            self._write_links(
+                (pk, tags, ingredients)
+                for pk, (tags, ingredients) in zip(ids, links)
+            )
+            self._refresh(ids)
+        return recipes
+
+    def update(self, instance, validated_data):
+        """Update the recipes and replace their links in one transaction"""
+        # Links are replaced where given, or always by a full update
+        replaced = {'tags': {}, 'ingredients': {}}
+        changes = {}
+        ids = []
+        for item in validated_data:
+            item = dict(item)
+            pk = item.pop('id')
+            ids.append(pk)
+            for field, links in replaced.items():
+                if field in item or not self.partial:
+                    links[pk] = item.pop(field, [])
+            if item:
+                changes.setdefault(tuple(sorted(item)), []).append((pk, item))
+
+        with transaction.atomic():
+            for fields, items in changes.items():
+                for start in range(0, len(items), self.batch_size):
+                    self._update_batch(
+                        fields, items[start:start + self.batch_size]
+                    )
+            for field, links in replaced.items():
+                if links:
+                    getattr(Recipe, field).through.objects.filter(
+                        recipe_id__in=list(links)
+                    ).delete()
+            self._write_links(
+                (pk, replaced['tags'].get(pk, ()),
+                 replaced['ingredients'].get(pk, ()))
+                for pk in ids
+            )
+            self._refresh(ids)
+        return instance.filter(pk__in=ids)
+
+    def _update_batch(self, fields, items):
+        """Write the (pk, values) items changing fields in one UPDATE"""
+        updates = {}
+        for name in fields:
+            field = Recipe._meta.get_field(name)
+            # Postgres can type the CASE from its parameters as text, so
+            # cast it back to the column type
+            updates[name] = Cast(Case(*(
+                When(pk=pk, then=Value(values[name], output_field=field))
+                for pk, values in items
+            ), output_field=field), field)
+        Recipe.objects.filter(
+            pk__in=[pk for pk, values in items]
+        ).update(**updates)
+
+    def _write_links(self, links):
+        """Insert the (recipe id, tag ids, ingredient ids) links"""
+        links = list(links)
+        tag_through = Recipe.tags.through
+        ingredient_through = Recipe.ingredients.through
+        tag_through.objects.bulk_create(
+            (tag_through(recipe_id=recipe_id, tag_id=pk)
+             for recipe_id, tags, ingredients in links for pk in tags),
+            batch_size=self.batch_size
+        )
+        ingredient_through.objects.bulk_create(
+            (ingredient_through(recipe_id=recipe_id, ingredients_id=pk)
+             for recipe_id, tags, ingredients in links for pk in ingredients),
+            batch_size=self.batch_size
+        )
+
+    def _refresh(self, ids):
+        """Rebuild the search vectors and log the changes of recipes"""
+        # Bulk writes skip the signals that maintain search vectors, the
+        # change log and updated_at
+        now = timezone.now()
+        for start in range(0, len(ids), self.batch_size):
+            Recipe.objects.filter(
+                pk__in=ids[start:start + self.batch_size]
+            ).update_search_vector(updated_at=now)
+        ChangeLogEntry.objects.record(
+            self.context['request'].user.pk, ChangeLogEntry.RECIPE, ids
+        )
+
+
+class RecipeBulkSerializer(serializers.ModelSerializer):
+    """Serializer for one recipe of a bulk create"""
+    ingredients = serializers.ListField(
+        child=serializers.IntegerField(),
+        required=False,
+        write_only=True
+    )
+    tags = serializers.ListField(
+        child=serializers.IntegerField(),
+        required=False,
+        write_only=True
+    )
+
+    class Meta:
+        model = Recipe
+        fields = (
+            'id', 'title', 'ingredients', 'time_minutes', 'price', 'link',
+            'tags'
+        )
+        read_only_fields = ('id',)
+        list_serializer_class = RecipeBulkListSerializer
+
+    def validate_ingredients(self, value):
+        """Drop repeated ids so each link is written once"""
+        return list(dict.fromkeys(value))
+
+    def validate_tags(self, value):
+        """Drop repeated ids so each link is written once"""
+        return list(dict.fromkeys(value))
+
+
+class RecipeBulkUpdateSerializer(RecipeBulkSerializer):
+    """Serializer for one recipe of a bulk update"""
+    id = serializers.IntegerField()
+
+    class Meta(RecipeBulkSerializer.Meta):
+        read_only_fields = ()
+
+    def validate(self, attrs):
+        # Partial updates make every field optional, but the id
+        if 'id' not in attrs:
+            raise serializers.ValidationError(
+                {'id': [self.fields['id'].error_messages['required']]}
+            )
+        return attrs
+
+
+class RecipeBulkDeleteSerializer(serializers.Serializer):
+    """Serializer for the ids of recipes to delete in bulk"""
+    ids = serializers.ListField(
+        child=serializers.IntegerField(),
+        allow_empty=False,
+        max_length=RecipeBulkListSerializer.max_items
+    )
+
 
 class RecipeImageSerializer(serializers.ModelSerializer):
     """Serializer for uploading images to recipes"""
+    renditions = RecipeImageRenditionSerializer(many=True, read_only=True)
 
     class Meta:
         model = Recipe
-        fields = ('id', 'image')
-        read_only_fields = ('id',)
+        fields = ('id', 'image', 'image_status', 'renditions')
+        read_only_fields = ('id', 'image_status')
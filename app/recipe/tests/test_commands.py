@@ -0,0 +1,124 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db.models import Count
+from django.test import TestCase
+
+from core.models import Recipe, Tag
+from core.seeding import seed_recipes, seed_users
+
+
+class SeedingTests(TestCase):
+
+    def test_seed_recipes(self):
+        """Test seeding creates recipes linked to the user's tags"""
+        user = get_user_model().objects.create_user('seed@appdev.com')
+        seed_recipes(
+            user, recipes=20, tags=5, ingredients=10,
+            tags_per_recipe=2, ingredients_per_recipe=3, batch_size=7
+        )
+
+        recipes = Recipe.objects.filter(user=user)
+        self.assertEqual(recipes.count(), 20)
+        self.assertEqual(
+            Recipe.tags.through.objects.filter(recipe__user=user).count(), 40
+        )
+        self.assertEqual(
+            Recipe.ingredients.through.objects.filter(
+                recipe__user=user
+            ).count(),
+            60
+        )
+        self.assertFalse(recipes.filter(search_vector=None).exists())
+
+    def test_seed_recipes_skew(self):
+        """Test a skewed cookbook links the first tags most often"""
+        user = get_user_model().objects.create_user('seed@appdev.com')
+        seed_recipes(
+            user, recipes=200, tags=20, ingredients=20,
+            tags_per_recipe=2, ingredients_per_recipe=2, skew=1.5
+        )
+
+        counts = Tag.objects.filter(user=user).annotate(
+            uses=Count('recipe')
+        ).order_by('id').values_list('uses', flat=True)
+        self.assertEqual(sum(counts), 400)
+        self.assertGreater(counts[0], counts[19] * 5)
+
+    def test_seed_users(self):
+        """Test seeding users gives each a reproducible cookbook"""
+        users = seed_users(
+            2, password='testpass', prefix='seed', recipes=5, tags=3,
+            ingredients=3
+        )
+
+        self.assertEqual(
+            [u.email for u in users],
+            ['seed-0@example.com', 'seed-1@example.com']
+        )
+        self.assertTrue(users[1].check_password('testpass'))
+        self.assertEqual(Recipe.objects.filter(user=users[1]).count(), 5)
+        again = seed_users(
+            1, prefix='again', seed=1, recipes=5, tags=3, ingredients=3
+        )
+        self.assertEqual(
+            list(again[0].recipe_set.order_by('id').values_list(
+                'time_minutes', flat=True
+            )),
+            list(users[1].recipe_set.order_by('id').values_list(
+                'time_minutes', flat=True
+            ))
+        )
+
+    def test_seed_data_command(self):
+        """Test the command seeds and lists the users"""
+        out = StringIO()
+        call_command('seed_data', users=2, recipes=3, tags=2, ingredients=2,
+                     prefix='cmd', stdout=out)
+
+        self.assertIn('cmd-1@example.com', out.getvalue())
+        self.assertEqual(Recipe.objects.count(), 6)
+
+
+class ExplainViewsetsCommandTests(TestCase):
+
+    def test_explain_viewsets(self):
+        """Test the command explains every viewset and rolls back"""
+        out = StringIO()
+        call_command('explain_viewsets', recipes=20, tags=5, ingredients=5,
+                     stdout=out)
+
+        output = out.getvalue()
+        for title in ['tags list', 'ingredients assigned_only',
+                      'recipes by tag', 'recipe retrieve']:
+            self.assertIn(title, output)
+        self.assertFalse(Recipe.objects.exists())
+
+
+class BenchAssignedOnlyCommandTests(TestCase):
+
+    def test_bench_assigned_only(self):
+        """Test the benchmark reports both query shapes and rolls back"""
+        out = StringIO()
+        call_command('bench_assigned_only', recipes=20, tags=5,
+                     ingredients=5, repeat=1, stdout=out)
+
+        output = out.getvalue()
+        self.assertIn('Tag distinct join page', output)
+        self.assertIn('Ingredients exists all', output)
+        self.assertFalse(Recipe.objects.exists())
+
+
+class BenchSearchCommandTests(TestCase):
+
+    def test_bench_search(self):
+        """Test the benchmark reports both search shapes and rolls back"""
+        out = StringIO()
+        call_command('bench_search', recipes=20, tags=5, ingredients=5,
+                     repeat=1, stdout=out)
+
+        output = out.getvalue()
+        self.assertIn('rare search page', output)
+        self.assertIn('common like page', output)
+        self.assertFalse(Recipe.objects.exists())
@@ -0,0 +1,112 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredients
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+# Count the queries of every request rather than serving cached responses
+@override_settings(RESPONSE_CACHE={'BACKEND': None})
+class ExpandTests(TestCase):
+    """Test inlining and side-loading recipe tags and ingredients"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@londonappdev.com',
+            'testpass'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.vegan = Tag.objects.create(user=self.user, name='Vegan')
+        self.quick = Tag.objects.create(user=self.user, name='Quick')
+        self.salt = Ingredients.objects.create(user=self.user, name='Salt')
+        for i in range(3):
+            recipe = Recipe.objects.create(
+                user=self.user, title=f'Recipe {i}', time_minutes=5,
+                price='5.00'
+            )
+            recipe.tags.add(self.vegan)
+            if i:
+                recipe.tags.add(self.quick)
+            recipe.ingredients.add(self.salt)
+
+    def get(self, params):
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(RECIPES_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK, res.data)
+        return res, len(ctx.captured_queries)
+
+    def test_expand(self):
+        """Test expanded relations are inlined without extra queries"""
+        plain, plain_queries = self.get({})
+        res, queries = self.get({'expand': 'tags,ingredients'})
+
+        self.assertEqual(queries, plain_queries)
+        recipe = res.data['results'][0]
+        self.assertEqual(
+            sorted(recipe['tags'], key=lambda tag: tag['id']),
+            [{'id': self.vegan.id, 'name': 'Vegan'},
+             {'id': self.quick.id, 'name': 'Quick'}]
+        )
+        self.assertEqual(
+            recipe['ingredients'], [{'id': self.salt.id, 'name': 'Salt'}]
+        )
+        self.assertNotIn('included', res.data)
+
+    def test_expand_one(self):
+        """Test relations not expanded are still sent as ids"""
+        res, queries = self.get({'expand': 'tags'})
+
+        recipe = res.data['results'][0]
+        self.assertEqual(recipe['tags'][0].keys(), {'id', 'name'})
+        self.assertEqual(recipe['ingredients'], [self.salt.id])
+
+    def test_include(self):
+        """Test included objects are sent once per page"""
+        plain, plain_queries = self.get({})
+        res, queries = self.get({'include': 'tags,ingredients'})
+
+        self.assertEqual(queries, plain_queries)
+        self.assertEqual(res.data['included'], {
+            'tags': [{'id': self.vegan.id, 'name': 'Vegan'},
+                     {'id': self.quick.id, 'name': 'Quick'}],
+            'ingredients': [{'id': self.salt.id, 'name': 'Salt'}],
+        })
+        self.assertEqual(
+            res.data['results'][-1]['tags'], [self.vegan.id]
+        )
+
+    def test_include_with_fields(self):
+        """Test included relations are loaded whatever the fieldset"""
+        res, queries = self.get({'fields': 'title', 'include': 'tags'})
+
+        self.assertEqual(
+            set(res.data['results'][0]), {'id', 'title', 'tags'}
+        )
+        self.assertEqual(len(res.data['included']['tags']), 2)
+
+    def test_include_page_only(self):
+        """Test only the objects of the page's recipes are included"""
+        res, queries = self.get({'include': 'tags', 'page_size': 1})
+
+        self.assertEqual(res.data['included']['tags'], [
+            {'id': tag.id, 'name': tag.name}
+            for tag in sorted(
+                Recipe.objects.order_by('-id').first().tags.all(),
+                key=lambda tag: tag.id
+            )
+        ])
+
+    def test_unknown_relation(self):
+        """Test only tags and ingredients can be expanded"""
+        res = self.client.get(RECIPES_URL, {'expand': 'renditions'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('expand', res.data)
@@ -0,0 +1,105 @@
+import csv
+import io
+import json
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Ingredients, Tag
+from core.seeding import seed_recipes
+from recipe.views import RecipeViewSet
+
+
+EXPORT_URL = reverse('recipe:recipe-export')
+
+
+class RecipeExportTests(TestCase):
+    """Test streaming a user's recipes out"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@londonappdev.com',
+            'testpass'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.recipe = Recipe.objects.create(
+            user=self.user, title='Curry', time_minutes=30, price=7.50
+        )
+        self.recipe.tags.add(
+            Tag.objects.create(user=self.user, name='Vegan'),
+            Tag.objects.create(user=self.user, name='Hot')
+        )
+        self.recipe.ingredients.add(
+            Ingredients.objects.create(user=self.user, name='Rice')
+        )
+
+    def export(self, **params):
+        """Export with params and return the streamed response and body"""
+        res = self.client.get(EXPORT_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.streaming)
+        return res, b''.join(res.streaming_content).decode()
+
+    def test_export_ndjson(self):
+        """Test recipes are exported as one JSON object per line"""
+        res, body = self.export()
+
+        self.assertEqual(res['Content-Type'], 'application/x-ndjson')
+        self.assertEqual([json.loads(line) for line in body.splitlines()], [{
+            'id': self.recipe.id,
+            'title': 'Curry',
+            'time_minutes': 30,
+            'price': '7.50',
+            'link': '',
+            'tags': ['Hot', 'Vegan'],
+            'ingredients': ['Rice'],
+        }])
+
+    def test_export_csv(self):
+        """Test recipes are exported as CSV with a header"""
+        res, body = self.export(format='csv')
+
+        self.assertEqual(res['Content-Type'], 'text/csv')
+        self.assertIn('recipes.csv', res['Content-Disposition'])
+        rows = list(csv.DictReader(io.StringIO(body)))
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['title'], 'Curry')
+        self.assertEqual(rows[0]['tags'], 'Hot|Vegan')
+
+    def test_export_limited_to_user(self):
+        """Test other users' recipes are not exported"""
+        other = get_user_model().objects.create_user('other@appdev.com')
+        Recipe.objects.create(
+            user=other, title='Stew', time_minutes=5, price=5.00
+        )
+
+        _, body = self.export()
+
+        self.assertEqual(len(body.splitlines()), 1)
+
+    def test_export_reads_in_chunks(self):
+        """Test names are fetched once per chunk of recipes"""
+        seed_recipes(self.user, recipes=25, tags=5, ingredients=5)
+
+        with patch.object(RecipeViewSet, 'export_chunk_size', 10), \
+                CaptureQueriesContext(connection) as ctx:
+            _, body = self.export()
+
+        self.assertEqual(len(body.splitlines()), 26)
+        names = [q for q in ctx.captured_queries
+                 if 'core_recipe_tags' in q['sql']]
+        self.assertEqual(len(names), 3)
+
+    def test_export_invalid_format(self):
+        """Test an unknown format is rejected"""
+        res = self.client.get(EXPORT_URL, {'format': 'xml'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,108 @@
+from base64 import b64encode
+
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.test import TestCase
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag
+from recipe.pagination import KeysetPagination
+
+
+RECIPE_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+class PaginationTests(TestCase):
+    """Test cursor pagination of the list endpoints"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@londonappdev.com',
+            'testpass'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def walk(self, url, data=None, link='next'):
+        """Follow cursor links from url and return every page"""
+        pages = []
+        res = self.client.get(url, data)
+        while True:
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            pages.append(res.data['results'])
+            if not res.data[link]:
+                return pages
+            res = self.client.get(res.data[link])
+
+    def test_recipes_paginated_newest_first(self):
+        """Test recipes are split into pages ordered by descending id"""
+        for i in range(5):
+            Recipe.objects.create(
+                user=self.user, title=f'Recipe {i}', time_minutes=5, price=5
+            )
+
+        pages = self.walk(RECIPE_URL, {'page_size': 2})
+
+        self.assertEqual([len(page) for page in pages], [2, 2, 1])
+        ids = [recipe['id'] for page in pages for recipe in page]
+        expected = list(
+            Recipe.objects.order_by('-id').values_list('id', flat=True)
+        )
+        self.assertEqual(ids, expected)
+
+    def test_tags_paginated_with_duplicate_names(self):
+        """Test tags sharing a name are neither skipped nor repeated"""
+        for name in ['Vegan', 'Vegan', 'Vegan', 'Desert', 'Lunch', 'Vegan']:
+            Tag.objects.create(user=self.user, name=name)
+
+        pages = self.walk(TAGS_URL, {'page_size': 2})
+
+        ids = [tag['id'] for page in pages for tag in page]
+        expected = list(
+            Tag.objects.order_by('-name', '-id').values_list('id', flat=True)
+        )
+        self.assertEqual(ids, expected)
+
+    def test_previous_links_walk_backwards(self):
+        """Test following previous links returns the earlier pages"""
+        for name in ['A', 'B', 'B', 'C', 'D']:
+            Tag.objects.create(user=self.user, name=name)
+        forward_pages = self.walk(TAGS_URL, {'page_size': 2})
+        res = self.client.get(TAGS_URL, {'page_size': 2})
+        while res.data['next']:
+            res = self.client.get(res.data['next'])
+
+        pages = self.walk(res.data['previous'], link='previous')
+
+        ids = [tag['id'] for page in reversed(pages) for tag in page]
+        forward = [tag['id'] for page in forward_pages[:-1] for tag in page]
+        self.assertEqual(ids, forward)
+
+    def test_page_size_capped(self):
+        """Test the requested page size cannot exceed the maximum"""
+        cap = KeysetPagination.max_page_size
+        Tag.objects.bulk_create(
+            Tag(user=self.user, name=f'Tag {i}') for i in range(cap + 5)
+        )
+
+        res = self.client.get(TAGS_URL, {'page_size': cap * 10})
+
+        self.assertEqual(len(res.data['results']), cap)
+        self.assertIsNotNone(res.data['next'])
+
+    def test_invalid_cursor(self):
+        """Test a cursor with a malformed position returns not found"""
+        cursor = b64encode(b'p=not-a-position').decode('ascii')
+        res = self.client.get(TAGS_URL, {'cursor': cursor})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_cursor_value_of_wrong_type(self):
+        """Test a cursor value that does not fit the ordering field"""
+        cursor = b64encode(b'p=["abc"]').decode('ascii')
+        res = self.client.get(RECIPE_URL, {'cursor': cursor})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
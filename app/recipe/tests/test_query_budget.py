@@ -0,0 +1,99 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Ingredients, Tag
+
+
+RECIPE_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+INGREDIENTS_URL = reverse('recipe:ingredients-list')
+
+
+def detail_url(recipe_id):
+    """Return the url for specific recipe"""
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+class QueryBudgetMixin:
+    """Assert that an endpoint runs a fixed number of queries"""
+
+    def add_recipes(self, count):
+        """Create recipes, each linked to its own tag and ingredient"""
+        recipes = []
+        for i in range(count):
+            recipe = Recipe.objects.create(
+                user=self.user,
+                title=f'Recipe {i}',
+                time_minutes=5,
+                price=5.00
+            )
+            recipe.tags.add(
+                Tag.objects.create(user=self.user, name=f'Tag {i}')
+            )
+            recipe.ingredients.add(
+                Ingredients.objects.create(user=self.user, name=f'Ing {i}')
+            )
+            recipes.append(recipe)
+        return recipes
+
+    def get_with_budget(self, budget, url, data=None):
+        """GET a url and assert it ran at most budget queries"""
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(url, data)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertLessEqual(
+            len(ctx.captured_queries), budget,
+            '\n'.join(q['sql'] for q in ctx.captured_queries)
+        )
+        return len(ctx.captured_queries)
+
+    def assertQueryBudget(self, budget, url, data=None, grow_by=10):
+        """
+        Assert a url stays within budget and that the query count
+        does not change as the number of recipes grows
+        """
+        before = self.get_with_budget(budget, url, data)
+        self.add_recipes(grow_by)
+        after = self.get_with_budget(budget, url, data)
+        self.assertEqual(before, after)
+
+
+class QueryBudgetTests(QueryBudgetMixin, TransactionTestCase):
+    """Test the number of queries run by the recipe endpoints"""
+    # Cached responses are invalidated as changes commit
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@londonappdev.com',
+            'testpass'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.recipe = self.add_recipes(1)[0]
+
+    def test_recipe_list_budget(self):
+        """Test listing recipes uses one query per relation"""
+        self.assertQueryBudget(5, RECIPE_URL)
+
+    def test_recipe_list_filtered_budget(self):
+        """Test filtering recipes does not add queries per recipe"""
+        tag_ids = ','.join(str(tag.id) for tag in Tag.objects.all())
+        self.assertQueryBudget(5, RECIPE_URL, {'tags': tag_ids})
+
+    def test_recipe_detail_budget(self):
+        """Test retrieving a recipe uses one query per relation"""
+        self.assertQueryBudget(5, detail_url(self.recipe.id))
+
+    def test_tag_list_budget(self):
+        """Test listing tags runs the ETag and list queries"""
+        self.assertQueryBudget(2, TAGS_URL)
+
+    def test_ingredient_list_budget(self):
+        """Test listing ingredients runs the ETag and list queries"""
+        self.assertQueryBudget(2, INGREDIENTS_URL)
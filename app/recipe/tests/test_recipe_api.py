@@ -1,14 +1,21 @@
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.urls import reverse
-from django.test import TestCase
+from django.core.files.base import ContentFile
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 
 from rest_framework import status
 from rest_framework.test import APIClient
 
 from core.models import Recipe, Ingredients, Tag
+from recipe import images
 from recipe.serializers import RecipeSerializer, RecipeDetailSerializer
 import tempfile
 import os
+from io import BytesIO
+from unittest.mock import Mock, patch
 from PIL import Image
 
 
@@ -20,6 +27,11 @@ def image_upload_url(recipe_id):
     return reverse('recipe:recipe-upload-image', args=[recipe_id])
 
 
+def image_url(recipe_id):
+    """Return url for serving a recipe image"""
+    return reverse('recipe:recipe-image', args=[recipe_id])
+
+
 def sample_recipe(user, **params):
     """Create a sample recipe and return it"""
     defaults = {
@@ -76,7 +88,7 @@ class PrivateRecipeApi(TestCase):
         recipe = Recipe.objects.all().order_by('-id')
         serializer = RecipeSerializer(recipe, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_retrieve_recipe_for_limited_user(self):
         """Test retrieve recipe for authenticated user only"""
@@ -90,8 +102,8 @@ class PrivateRecipeApi(TestCase):
 
         res = self.client.get(RECIPE_URL)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data[0]['title'], recipe.title)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'][0]['title'], recipe.title)
 
     def test_view_recipe_detail(self):
         """Test viewing a recipe detail"""
@@ -188,6 +200,51 @@ class PrivateRecipeApi(TestCase):
         tags = recipe.tags.all()
         self.assertEqual(len(tags), 0)
 
+    def test_create_recipe_with_other_users_tag(self):
+        """Test tags of another user cannot be linked to a recipe"""
+        user_two = get_user_model().objects.create_user(
+            'another@appdev.com',
+            'another123'
+        )
+        own_tag = sample_tag(user=self.user)
+        other_tag = sample_tag(user=user_two, name='Foreign')
+        payload = {
+            'title': 'Borrowed Tags',
+            'tags': [own_tag.id, other_tag.id, 999999],
+            'time_minutes': 10,
+            'price': 5.00
+        }
+        res = self.client.post(RECIPE_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(len(res.data['tags']), 1)
+        self.assertIn(str(other_tag.id), res.data['tags'][0])
+        self.assertIn('999999', res.data['tags'][0])
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_create_recipe_validates_ingredients_in_one_query(self):
+        """Test all submitted ingredient ids are looked up together"""
+        ingredients = Ingredients.objects.bulk_create(
+            Ingredients(user=self.user, name=f'Ingredient {i}')
+            for i in range(50)
+        )
+        serializer = RecipeSerializer(
+            data={
+                'title': 'Everything Stew',
+                'ingredients': [ingredient.id for ingredient in ingredients],
+                'tags': [],
+                'time_minutes': 60,
+                'price': 15.00
+            },
+            context={'request': Mock(user=self.user)}
+        )
+
+        with self.assertNumQueries(1):
+            self.assertTrue(serializer.is_valid(), serializer.errors)
+        self.assertEqual(
+            serializer.validated_data['ingredients'], list(ingredients)
+        )
+
 
 class RecipeImageUploadTests(TestCase):
 
@@ -201,21 +258,182 @@ class RecipeImageUploadTests(TestCase):
         self.recipe = sample_recipe(user=self.user)
 
     def tearDown(self):
+        for rendition in self.recipe.renditions.all():
+            rendition.image.delete()
         self.recipe.image.delete()
 
-    def test_upload_image(self):
-        """Test to upload image to recipe"""
+    def upload_image(self, size=(10, 10)):
+        """Upload a JPEG of the given size to the recipe"""
         url = image_upload_url(self.recipe.id)
         with tempfile.NamedTemporaryFile(suffix='.jpg') as ntf:
-            img = Image.new('RGB', (10, 10))
+            img = Image.new('RGB', size)
             img.save(ntf, format='JPEG')
             ntf.seek(0)
-            res = self.client.post(url, {'image': ntf}, format='multipart')
+            return self.client.post(url, {'image': ntf}, format='multipart')
+
+    @patch('recipe.views.images.schedule_renditions')
+    def test_upload_image(self, schedule_renditions):
+        """Test to upload image to recipe"""
+        res = self.upload_image()
 
         self.recipe.refresh_from_db()
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertIn('image', res.data)
         self.assertTrue(os.path.exists(self.recipe.image.path))
+        self.assertEqual(res.data['image_status'], Recipe.IMAGE_PENDING)
+        self.assertEqual(self.recipe.image_status, Recipe.IMAGE_PENDING)
+        schedule_renditions.assert_called_once_with(self.recipe.id)
+
+    @override_settings(RECIPE_IMAGE_SIZES=(4, 8))
+    def test_render_renditions(self):
+        """Test rendering stores JPEG and WebP renditions of each size"""
+        self.upload_image(size=(16, 10))
+
+        images.render_renditions(self.recipe.id)
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.image_status, Recipe.IMAGE_READY)
+        renditions = {
+            (r.format, r.size): r for r in self.recipe.renditions.all()
+        }
+        self.assertEqual(set(renditions), {
+            ('jpeg', 4), ('jpeg', 8), ('webp', 4), ('webp', 8)
+        })
+        expected = {4: (4, 3), 8: (8, 5)}
+        for (fmt, size), rendition in renditions.items():
+            self.assertEqual(
+                (rendition.width, rendition.height), expected[size]
+            )
+            self.assertEqual(len(rendition.content_hash), 64)
+            with Image.open(rendition.image.path) as img:
+                self.assertEqual(img.format, fmt.upper())
+                self.assertEqual(img.size, expected[size])
+
+        res = self.client.get(detail_url(self.recipe.id))
+        self.assertEqual(res.data['image_status'], Recipe.IMAGE_READY)
+        self.assertEqual(len(res.data['renditions']), 4)
+        rendition = renditions[res.data['renditions'][0]['format'],
+                               res.data['renditions'][0]['size']]
+        self.assertIn(
+            f'v={rendition.content_hash[:16]}',
+            res.data['renditions'][0]['url']
+        )
+        res = self.client.get(RECIPE_URL)
+        self.assertEqual(len(res.data['results'][0]['renditions']), 4)
+
+    def test_render_replaces_previous_renditions(self):
+        """Test rendering a new upload removes the old renditions"""
+        self.upload_image()
+        images.render_renditions(self.recipe.id)
+        old_paths = [r.image.path for r in self.recipe.renditions.all()]
+
+        self.upload_image()
+        images.render_renditions(self.recipe.id)
+
+        sizes = settings.RECIPE_IMAGE_SIZES
+        self.assertEqual(self.recipe.renditions.count(), 2 * len(sizes))
+        for path in old_paths:
+            self.assertFalse(os.path.exists(path))
+
+    def test_render_failure_recorded(self):
+        """Test an image that cannot be decoded is marked failed"""
+        self.recipe.image.save('broken.jpg', ContentFile(b'not an image'))
+
+        with self.assertRaises(Exception):
+            images.render_renditions(self.recipe.id)
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.image_status, Recipe.IMAGE_FAILED)
+        self.assertFalse(self.recipe.renditions.exists())
+
+    @patch('recipe.images.get_executor')
+    def test_schedule_renditions_on_commit(self, get_executor):
+        """Test rendering is submitted to the worker pool after commit"""
+        with patch('recipe.images.transaction.on_commit') as on_commit:
+            images.schedule_renditions(self.recipe.id)
+            on_commit.call_args[0][0]()
+
+        get_executor.return_value.submit.assert_called_once_with(
+            images._render_in_worker, self.recipe.id
+        )
+
+    @override_settings(RECIPE_IMAGE_SIZES=(4, 8))
+    def test_serve_image_picks_size(self):
+        """Test the smallest rendition covering ?size= is served"""
+        self.upload_image(size=(16, 10))
+        images.render_renditions(self.recipe.id)
+        url = image_url(self.recipe.id)
+
+        for size, expected in (('3', (4, 3)), ('5', (8, 5)), ('50', (8, 5))):
+            res = self.client.get(url, {'size': size, 'format': 'jpeg'})
+
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertEqual(res['Content-Type'], 'image/jpeg')
+            with Image.open(BytesIO(b''.join(res.streaming_content))) as img:
+                self.assertEqual(img.size, expected)
+
+    def test_serve_versioned_image_immutable(self):
+        """Test only the url of the served content is cached for good"""
+        self.upload_image()
+        images.render_renditions(self.recipe.id)
+        rendition = self.recipe.renditions.get(format='jpeg', size=160)
+        params = {'size': 160, 'format': 'jpeg'}
+        url = image_url(self.recipe.id)
+
+        res = self.client.get(url, dict(params, v=rendition.content_hash[:16]))
+        self.assertIn('immutable', res['Cache-Control'])
+
+        for version in ({}, {'v': 'stale'}):
+            res = self.client.get(url, dict(params, **version))
+
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertNotIn('immutable', res['Cache-Control'])
+            self.assertIn('no-cache', res['Cache-Control'])
+
+    def test_serve_image_negotiates_format(self):
+        """Test WebP is served to clients that accept it"""
+        self.upload_image()
+        images.render_renditions(self.recipe.id)
+        url = image_url(self.recipe.id)
+
+        res = self.client.get(url, HTTP_ACCEPT='image/webp,image/*')
+        self.assertEqual(res['Content-Type'], 'image/webp')
+        self.assertIn('Accept', res['Vary'])
+        res = self.client.get(url, HTTP_ACCEPT='image/*')
+        self.assertEqual(res['Content-Type'], 'image/jpeg')
+
+    def test_serve_image_not_modified(self):
+        """Test a request with the current ETag gets a 304"""
+        self.upload_image()
+        images.render_renditions(self.recipe.id)
+        url = image_url(self.recipe.id)
+        etag = self.client.get(url)['ETag']
+
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res.content, b'')
+
+    @override_settings(RECIPE_IMAGE_SENDFILE='x-accel-redirect')
+    def test_serve_image_accel_redirect(self):
+        """Test the file is handed to the web server when configured"""
+        self.upload_image()
+        images.render_renditions(self.recipe.id)
+        rendition = self.recipe.renditions.get(format='jpeg', size=160)
+
+        res = self.client.get(image_url(self.recipe.id), {'size': 100})
+
+        self.assertEqual(
+            res['X-Accel-Redirect'],
+            f'/protected-media/{rendition.image.name}'
+        )
+        self.assertEqual(res.content, b'')
+
+    def test_serve_image_without_renditions(self):
+        """Test requesting an image that has not been rendered"""
+        res = self.client.get(image_url(self.recipe.id))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
 
     def test_upload_image_bad_request(self):
         """Test uploading an invalid image"""
@@ -243,9 +461,9 @@ class RecipeImageUploadTests(TestCase):
         serializer_two = RecipeSerializer(recipe_two)
         serializer_three = RecipeSerializer(recipe_three)
 
-        self.assertIn(serializer_one.data, res.data)
-        self.assertIn(serializer_two.data, res.data)
-        self.assertNotIn(serializer_three.data, res.data)
+        self.assertIn(serializer_one.data, res.data['results'])
+        self.assertIn(serializer_two.data, res.data['results'])
+        self.assertNotIn(serializer_three.data, res.data['results'])
 
     def test_filter_recipes_by_ingredients(self):
         """test return recipes with specific ingredients"""
@@ -266,6 +484,83 @@ class RecipeImageUploadTests(TestCase):
         serializer_two = RecipeSerializer(recipe2)
         serializer_three = RecipeSerializer(recipe3)
 
-        self.assertIn(serializer_one.data, res.data)
-        self.assertIn(serializer_two.data, res.data)
-        self.assertNotIn(serializer_three.data, res.data)
+        self.assertIn(serializer_one.data, res.data['results'])
+        self.assertIn(serializer_two.data, res.data['results'])
+        self.assertNotIn(serializer_three.data, res.data['results'])
+
+
+class RecipeFilterMatchTests(TestCase):
+    """Test filtering recipes on any or all of several tags/ingredients"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@londonapp@dev.com',
+            'testpass'
+        )
+        self.client.force_authenticate(self.user)
+        self.vegan = sample_tag(user=self.user, name='Vegan')
+        self.quick = sample_tag(user=self.user, name='Quick')
+        self.rice = sample_ingredient(user=self.user, name='Rice')
+        self.beans = sample_ingredient(user=self.user, name='Beans')
+
+        self.both = sample_recipe(user=self.user, title='Rice and beans')
+        self.both.tags.add(self.vegan, self.quick)
+        self.both.ingredients.add(self.rice, self.beans)
+        self.vegan_only = sample_recipe(user=self.user, title='Rice bowl')
+        self.vegan_only.tags.add(self.vegan)
+        self.vegan_only.ingredients.add(self.rice)
+        self.neither = sample_recipe(user=self.user, title='Steak')
+
+    def filter_ids(self, **params):
+        """Return the ids of the recipes listed for the filter params"""
+        res = self.client.get(RECIPE_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [recipe['id'] for recipe in res.data['results']]
+
+    def test_match_any_returns_each_recipe_once(self):
+        """Test recipes matching several ids in both filters are unique"""
+        ids = self.filter_ids(
+            tags=f'{self.vegan.id},{self.quick.id}',
+            ingredients=f'{self.rice.id},{self.beans.id}'
+        )
+
+        self.assertEqual(ids, [self.vegan_only.id, self.both.id])
+
+    def test_match_all(self):
+        """Test match=all only returns recipes linked to every id"""
+        ids = self.filter_ids(
+            tags=f'{self.vegan.id},{self.quick.id}', match='all'
+        )
+        self.assertEqual(ids, [self.both.id])
+
+        ids = self.filter_ids(
+            tags=f'{self.vegan.id},{self.vegan.id}',
+            ingredients=f'{self.rice.id}',
+            match='all'
+        )
+        self.assertEqual(ids, [self.vegan_only.id, self.both.id])
+
+    def test_invalid_match(self):
+        """Test an unknown match value is rejected"""
+        res = self.client.get(
+            RECIPE_URL, {'tags': self.vegan.id, 'match': 'some'}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_filters_do_not_join_links(self):
+        """Test the recipe query filters in subqueries instead of joins"""
+        for match in ('any', 'all'):
+            with CaptureQueriesContext(connection) as ctx:
+                self.filter_ids(
+                    tags=f'{self.vegan.id},{self.quick.id}',
+                    ingredients=f'{self.rice.id}',
+                    match=match
+                )
+
+            # The first query is the ETag aggregate
+            sql = ctx.captured_queries[1]['sql']
+            self.assertIn('core_recipe_tags', sql)
+            self.assertNotIn('JOIN', sql)
+            self.assertNotIn('DISTINCT', sql)
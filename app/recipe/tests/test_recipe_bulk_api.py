@@ -0,0 +1,322 @@
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import ChangeLogEntry, Recipe, Ingredients, Tag
+from recipe.serializers import RecipeBulkListSerializer
+
+
+BULK_URL = reverse('recipe:recipe-bulk')
+
+
+def recipe_payload(**params):
+    """Return a payload for one recipe of a bulk create"""
+    defaults = {
+        'title': 'Sample Recipe',
+        'time_minutes': 10,
+        'price': '10.00'
+    }
+    defaults.update(params)
+    return defaults
+
+
+class PublicRecipeBulkApi(TestCase):
+    """Test unauthenticated bulk access"""
+
+    def test_auth_required(self):
+        """Test that authentication is required for bulk create"""
+        res = APIClient().post(BULK_URL, [recipe_payload()], format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateRecipeBulkApi(TestCase):
+    """Test authorised bulk create, update and delete"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@londonappdev.com',
+            'test123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.tag = Tag.objects.create(user=self.user, name='Vegan')
+        self.ingredient = Ingredients.objects.create(
+            user=self.user, name='Tofu'
+        )
+
+    def test_bulk_create(self):
+        """Test creating many recipes with their links"""
+        payload = [
+            recipe_payload(title='Tofu Stir Fry', tags=[self.tag.id],
+                           ingredients=[self.ingredient.id]),
+            recipe_payload(title='Plain Rice'),
+        ]
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(res.data['created']), 2)
+        stir_fry = Recipe.objects.get(id=res.data['created'][0])
+        self.assertEqual(stir_fry.user, self.user)
+        self.assertEqual(stir_fry.title, 'Tofu Stir Fry')
+        self.assertEqual(list(stir_fry.tags.all()), [self.tag])
+        self.assertEqual(list(stir_fry.ingredients.all()), [self.ingredient])
+        rice = Recipe.objects.get(id=res.data['created'][1])
+        self.assertFalse(rice.tags.exists())
+
+    def test_bulk_create_query_count_is_constant(self):
+        """Test the number of queries does not grow with the list"""
+        counts = []
+        for size in (5, 50):
+            payload = [
+                recipe_payload(title=f'Recipe {i}', tags=[self.tag.id],
+                               ingredients=[self.ingredient.id])
+                for i in range(size)
+            ]
+            with CaptureQueriesContext(connection) as ctx:
+                res = self.client.post(BULK_URL, payload, format='json')
+            self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+            counts.append(len(ctx.captured_queries))
+
+        self.assertEqual(counts[0], counts[1])
+        self.assertEqual(Recipe.objects.count(), 55)
+
+    def test_bulk_create_reports_errors_per_item(self):
+        """Test invalid items are reported and nothing is created"""
+        user_two = get_user_model().objects.create_user(
+            'another@appdev.com',
+            'another123'
+        )
+        other_tag = Tag.objects.create(user=user_two, name='Foreign')
+        payload = [
+            recipe_payload(tags=[self.tag.id]),
+            recipe_payload(title=''),
+            recipe_payload(tags=[other_tag.id]),
+        ]
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(len(res.data), 3)
+        self.assertEqual(res.data[0], {})
+        self.assertIn('title', res.data[1])
+        self.assertIn(str(other_tag.id), res.data[2]['tags'][0])
+        self.assertFalse(Recipe.objects.exists())
+
+    @patch.object(RecipeBulkListSerializer, 'max_items', 2)
+    def test_bulk_create_too_many_items(self):
+        """Test the number of recipes per request is capped"""
+        payload = [recipe_payload() for _ in range(3)]
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_bulk_create_requires_list(self):
+        """Test a single object is rejected"""
+        res = self.client.post(BULK_URL, recipe_payload(), format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_update(self):
+        """Test patching many recipes and replacing given links"""
+        stir_fry = Recipe.objects.create(
+            user=self.user, title='Stir Fry', time_minutes=5, price=5
+        )
+        stir_fry.tags.add(self.tag)
+        rice = Recipe.objects.create(
+            user=self.user, title='Rice', time_minutes=5, price=5
+        )
+        rice.tags.add(self.tag)
+        rice.ingredients.add(self.ingredient)
+        spicy = Tag.objects.create(user=self.user, name='Spicy')
+        payload = [
+            {'id': stir_fry.id, 'title': 'Tofu Stir Fry', 'tags': [spicy.id]},
+            {'id': rice.id, 'time_minutes': 20},
+        ]
+        logged = ChangeLogEntry.objects.count()
+
+        res = self.client.patch(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['updated'], [stir_fry.id, rice.id])
+        stir_fry.refresh_from_db()
+        self.assertEqual(stir_fry.title, 'Tofu Stir Fry')
+        self.assertEqual(list(stir_fry.tags.all()), [spicy])
+        rice.refresh_from_db()
+        self.assertEqual(rice.time_minutes, 20)
+        self.assertEqual(list(rice.tags.all()), [self.tag])
+        self.assertEqual(list(rice.ingredients.all()), [self.ingredient])
+        self.assertEqual(
+            list(Recipe.objects.filter(search_vector='spicy')), [stir_fry]
+        )
+        self.assertEqual(ChangeLogEntry.objects.count(), logged + 2)
+
+    def test_bulk_put_replaces_links(self):
+        """Test a full update replaces every field and link"""
+        recipe = Recipe.objects.create(
+            user=self.user, title='Stir Fry', time_minutes=5, price=5
+        )
+        recipe.tags.add(self.tag)
+
+        res = self.client.put(BULK_URL, [
+            dict(recipe_payload(title='Curry'), id=recipe.id,
+                 ingredients=[self.ingredient.id])
+        ], format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.title, 'Curry')
+        self.assertFalse(recipe.tags.exists())
+        self.assertEqual(list(recipe.ingredients.all()), [self.ingredient])
+
+        res = self.client.put(
+            BULK_URL, [{'id': recipe.id, 'title': 'Soup'}], format='json'
+        )
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('price', res.data[0])
+
+    def test_bulk_update_reports_errors_per_item(self):
+        """Test unknown, foreign and repeated ids update nothing"""
+        user_two = get_user_model().objects.create_user(
+            'another@appdev.com',
+            'another123'
+        )
+        own = Recipe.objects.create(
+            user=self.user, title='Mine', time_minutes=5, price=5
+        )
+        other = Recipe.objects.create(
+            user=user_two, title='Theirs', time_minutes=5, price=5
+        )
+        payload = [
+            {'id': own.id, 'title': 'Changed'},
+            {'id': other.id, 'title': 'Changed'},
+            {'id': own.id, 'title': 'Again'},
+            {'title': 'No id'},
+        ]
+
+        res = self.client.patch(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {})
+        for errors in res.data[1:]:
+            self.assertIn('id', errors)
+        own.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual(own.title, 'Mine')
+        self.assertEqual(other.title, 'Theirs')
+
+    def test_bulk_update_links_written_at_once(self):
+        """Test the queries of a bulk update do not grow with the list"""
+        counts = []
+        for size in (5, 50):
+            recipes = [
+                Recipe.objects.create(
+                    user=self.user, title=f'Recipe {i}', time_minutes=5,
+                    price=5
+                )
+                for i in range(size)
+            ]
+            payload = [
+                {'id': recipe.id, 'title': f'Renamed {recipe.id}',
+                 'tags': [self.tag.id], 'ingredients': [self.ingredient.id]}
+                for recipe in recipes
+            ]
+            with CaptureQueriesContext(connection) as ctx:
+                res = self.client.patch(BULK_URL, payload, format='json')
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            counts.append(len(ctx.captured_queries))
+
+        self.assertEqual(counts[0], counts[1])
+        self.assertEqual(self.tag.recipe_set.count(), 55)
+
+    def test_bulk_partial_update_different_fields(self):
+        """Test items changing different fields each keep the rest"""
+        first = Recipe.objects.create(
+            user=self.user, title='First', time_minutes=5, price=5
+        )
+        second = Recipe.objects.create(
+            user=self.user, title='Second', time_minutes=10, price=10
+        )
+        third = Recipe.objects.create(
+            user=self.user, title='Third', time_minutes=15, price=15
+        )
+        payload = [
+            {'id': first.id, 'title': 'Renamed'},
+            {'id': second.id, 'time_minutes': 20, 'price': '12.50'},
+            {'id': third.id, 'title': 'Also renamed'},
+        ]
+        res = self.client.patch(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        for recipe in (first, second, third):
+            recipe.refresh_from_db()
+        self.assertEqual(
+            (first.title, first.time_minutes, first.price),
+            ('Renamed', 5, Decimal('5'))
+        )
+        self.assertEqual(
+            (second.title, second.time_minutes, second.price),
+            ('Second', 20, Decimal('12.50'))
+        )
+        self.assertEqual(third.title, 'Also renamed')
+
+    def test_bulk_delete_limited_to_user(self):
+        """Test bulk delete only removes the user's own recipes"""
+        user_two = get_user_model().objects.create_user(
+            'another@appdev.com',
+            'another123'
+        )
+        own = Recipe.objects.create(
+            user=self.user, title='Mine', time_minutes=5, price=5
+        )
+        kept = Recipe.objects.create(
+            user=self.user, title='Keep', time_minutes=5, price=5
+        )
+        other = Recipe.objects.create(
+            user=user_two, title='Theirs', time_minutes=5, price=5
+        )
+        res = self.client.delete(
+            BULK_URL, {'ids': [own.id, other.id]}, format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(Recipe.objects.filter(id=own.id).exists())
+        self.assertTrue(Recipe.objects.filter(id=kept.id).exists())
+        self.assertTrue(Recipe.objects.filter(id=other.id).exists())
+
+    def test_bulk_delete_query_count_is_capped(self):
+        """Test deleting many recipes logs and invalidates them at once"""
+        counts = []
+        for size in (10, 200):
+            ids = [
+                Recipe.objects.create(
+                    user=self.user, title=f'Recipe {i}', time_minutes=5,
+                    price=5
+                ).id
+                for i in range(size)
+            ]
+            with CaptureQueriesContext(connection) as ctx:
+                res = self.client.delete(BULK_URL, {'ids': ids},
+                                         format='json')
+            self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+            counts.append(len(ctx.captured_queries))
+
+            self.assertEqual(
+                set(ChangeLogEntry.objects.filter(
+                    user=self.user, deleted=True, object_id__in=ids
+                ).values_list('object_id', flat=True)),
+                set(ids)
+            )
+
+        # Only the DELETE statement is split, into batches of 100 ids
+        self.assertLessEqual(counts[1], counts[0] + 1)
+        self.assertLessEqual(counts[1], 12)
+        self.assertFalse(Recipe.objects.exists())
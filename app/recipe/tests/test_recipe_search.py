@@ -0,0 +1,124 @@
+from django.contrib.auth import get_user_model
+from django.test import TransactionTestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Ingredients, Tag
+
+
+RECIPE_URL = reverse('recipe:recipe-list')
+BULK_URL = reverse('recipe:recipe-bulk')
+
+
+def sample_recipe(user, title):
+    """Create and return a recipe with the given title"""
+    return Recipe.objects.create(
+        user=user, title=title, time_minutes=10, price=5.00
+    )
+
+
+class RecipeSearchTests(TransactionTestCase):
+    """Test the full text recipe search"""
+    # Cached responses are invalidated as changes commit
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@londonappdev.com',
+            'testpass'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def search(self, term, **params):
+        """Return the ids of the recipes found for term"""
+        res = self.client.get(RECIPE_URL, dict(params, search=term))
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [recipe['id'] for recipe in res.data['results']]
+
+    def test_search_title(self):
+        """Test searching matches stemmed words of the title"""
+        curry = sample_recipe(self.user, 'Thai green curries')
+        sample_recipe(self.user, 'Fish and chips')
+
+        self.assertEqual(self.search('curry'), [curry.id])
+
+    def test_search_tag_and_ingredient_names(self):
+        """Test searching matches the names of linked tags and ingredients"""
+        recipe = sample_recipe(self.user, 'Dinner')
+        sample_recipe(self.user, 'Lunch')
+        recipe.tags.add(Tag.objects.create(user=self.user, name='Vegan'))
+        recipe.ingredients.add(
+            Ingredients.objects.create(user=self.user, name='Tofu')
+        )
+
+        self.assertEqual(self.search('vegan'), [recipe.id])
+        self.assertEqual(self.search('tofu'), [recipe.id])
+
+    def test_search_follows_link_changes(self):
+        """Test renamed, unlinked and deleted names stop matching"""
+        recipe = sample_recipe(self.user, 'Dinner')
+        tag = Tag.objects.create(user=self.user, name='Spicy')
+        ingredient = Ingredients.objects.create(user=self.user, name='Tofu')
+        recipe.tags.add(tag)
+        recipe.ingredients.add(ingredient)
+
+        tag.name = 'Mild'
+        tag.save()
+        self.assertEqual(self.search('spicy'), [])
+        self.assertEqual(self.search('mild'), [recipe.id])
+
+        recipe.tags.remove(tag)
+        self.assertEqual(self.search('mild'), [])
+
+        ingredient.delete()
+        self.assertEqual(self.search('tofu'), [])
+
+    def test_search_ranks_title_matches_first(self):
+        """Test a title match ranks above an ingredient match"""
+        by_ingredient = sample_recipe(self.user, 'Dinner')
+        by_ingredient.ingredients.add(
+            Ingredients.objects.create(user=self.user, name='Lemon')
+        )
+        by_title = sample_recipe(self.user, 'Lemon tart')
+
+        self.assertEqual(
+            self.search('lemon'), [by_title.id, by_ingredient.id]
+        )
+
+    def test_search_paginates(self):
+        """Test search results page through every match once"""
+        recipes = [sample_recipe(self.user, f'Soup {i}') for i in range(5)]
+        recipes[2].tags.add(Tag.objects.create(user=self.user, name='Soup'))
+        sample_recipe(self.user, 'Salad')
+
+        seen = []
+        res = self.client.get(RECIPE_URL, {'search': 'soup', 'page_size': 2})
+        while True:
+            seen.extend(recipe['id'] for recipe in res.data['results'])
+            if not res.data['next']:
+                break
+            res = self.client.get(res.data['next'])
+
+        self.assertEqual(seen[0], recipes[2].id)
+        self.assertEqual(sorted(seen), sorted(r.id for r in recipes))
+
+    def test_search_limited_to_user(self):
+        """Test recipes of other users are not found"""
+        other = get_user_model().objects.create_user('other@appdev.com')
+        sample_recipe(other, 'Curry')
+
+        self.assertEqual(self.search('curry'), [])
+
+    def test_bulk_created_recipes_searchable(self):
+        """Test recipes created in bulk are searchable"""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        payload = [
+            {'title': 'Bean chilli', 'time_minutes': 30, 'price': '4.00',
+             'tags': [tag.id]},
+        ]
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(self.search('chilli'), res.data['created'])
+        self.assertEqual(self.search('vegan'), res.data['created'])
@@ -0,0 +1,169 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredients
+from recipe.serializers import RecipeSerializer
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+def detail_url(recipe_id):
+    """Return the url for specific recipe"""
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+# Count the queries of every request rather than serving cached responses
+@override_settings(RESPONSE_CACHE={'BACKEND': None})
+class SparseFieldsTests(TestCase):
+    """Test choosing recipe fields with ?fields= and ?omit="""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@londonappdev.com',
+            'testpass'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        for i in range(3):
+            recipe = Recipe.objects.create(
+                user=self.user, title=f'Recipe {i}', time_minutes=5 + i,
+                price='5.50', link=''
+            )
+            recipe.tags.add(Tag.objects.create(user=self.user, name='Vegan'))
+            recipe.ingredients.add(
+                Ingredients.objects.create(user=self.user, name='Salt')
+            )
+
+    def get(self, url, params):
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(url, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK, res.data)
+        return res, [q['sql'] for q in ctx.captured_queries]
+
+    def test_fields(self):
+        """Test only the requested fields and the id are sent"""
+        with patch.object(RecipeSerializer, 'to_representation') as render:
+            res, queries = self.get(RECIPES_URL, {'fields': 'title'})
+
+        render.assert_not_called()
+        self.assertEqual(res.data['results'], [
+            {'id': recipe.id, 'title': recipe.title}
+            for recipe in Recipe.objects.order_by('-id')
+        ])
+        listed = queries[-1]
+        self.assertNotIn('time_minutes', listed)
+        self.assertFalse(any('core_tag' in sql for sql in queries))
+
+    def test_fields_match_full_representation(self):
+        """Test values rendered from rows match the serializer's"""
+        full, queries = self.get(RECIPES_URL, {})
+        res, queries = self.get(
+            RECIPES_URL, {'fields': 'title,price,time_minutes,link'}
+        )
+
+        for sparse, recipe in zip(res.data['results'],
+                                  full.data['results']):
+            self.assertEqual(sparse, {
+                key: recipe[key]
+                for key in ('id', 'title', 'price', 'time_minutes', 'link')
+            })
+
+    def test_omit(self):
+        """Test omitted relations are neither sent nor prefetched"""
+        res, queries = self.get(
+            RECIPES_URL, {'omit': 'tags,ingredients,renditions'}
+        )
+
+        recipe = res.data['results'][0]
+        self.assertEqual(
+            set(recipe), {'id', 'title', 'time_minutes', 'price', 'link'}
+        )
+        self.assertFalse(any('core_tag' in sql for sql in queries))
+
+    def test_relation_prefetched_alone(self):
+        """Test a requested relation is the only one prefetched"""
+        res, queries = self.get(RECIPES_URL, {'fields': 'title,tags'})
+
+        recipe = res.data['results'][0]
+        self.assertEqual(set(recipe), {'id', 'title', 'tags'})
+        self.assertEqual(len(recipe['tags']), 1)
+        self.assertTrue(any('core_tag' in sql for sql in queries))
+        self.assertFalse(any('core_ingredients' in sql for sql in queries))
+        self.assertFalse(
+            any('core_recipeimagerendition' in sql for sql in queries)
+        )
+
+    def test_pagination(self):
+        """Test sparse pages link to the same following pages"""
+        full, queries = self.get(RECIPES_URL, {'page_size': 2})
+        res, queries = self.get(
+            RECIPES_URL, {'page_size': 2, 'fields': 'title'}
+        )
+        self.assertEqual(len(res.data['results']), 2)
+
+        res = self.client.get(res.data['next'])
+
+        self.assertEqual(res.data['results'], [
+            {'id': recipe['id'], 'title': recipe['title']}
+            for recipe in self.client.get(
+                full.data['next']
+            ).data['results']
+        ])
+
+    def test_search_ordering(self):
+        """Test sparse search results keep their rank ordering"""
+        res, queries = self.get(
+            RECIPES_URL, {'search': 'recipe', 'fields': 'title'}
+        )
+
+        self.assertEqual(len(res.data['results']), 3)
+        self.assertNotIn('rank', res.data['results'][0])
+
+    def test_retrieve(self):
+        """Test a detail can be trimmed too"""
+        recipe = Recipe.objects.first()
+
+        res, queries = self.get(
+            detail_url(recipe.id), {'fields': 'title,image_status'}
+        )
+
+        self.assertEqual(res.data, {
+            'id': recipe.id, 'title': recipe.title, 'image_status': ''
+        })
+        self.assertFalse(any('core_tag' in sql for sql in queries))
+
+    def test_unknown_field(self):
+        """Test unknown fields are rejected"""
+        res = self.client.get(RECIPES_URL, {'fields': 'title,secret'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('secret', str(res.data['fields']))
+
+    def test_fields_and_omit(self):
+        """Test fields and omit cannot be combined"""
+        res = self.client.get(
+            RECIPES_URL, {'fields': 'title', 'omit': 'tags'}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_writes_ignore_fields(self):
+        """Test a create answers with every field whatever is asked"""
+        tag = Tag.objects.first()
+        ingredient = Ingredients.objects.first()
+
+        res = self.client.post(RECIPES_URL + '?fields=title', {
+            'title': 'Soup', 'time_minutes': 10, 'price': '2.00',
+            'tags': [tag.id], 'ingredients': [ingredient.id]
+        })
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertIn('tags', res.data)
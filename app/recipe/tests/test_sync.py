@@ -0,0 +1,245 @@
+import threading
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.db.models.signals import post_delete
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Ingredients, Tag, ChangeLogEntry
+from core.seeding import seed_recipes
+from recipe.views import SyncViewSet
+
+
+SYNC_URL = reverse('recipe:sync-list')
+
+
+def sample_recipe(user, title='Curry'):
+    """Create and return a sample recipe"""
+    return Recipe.objects.create(
+        user=user, title=title, time_minutes=10, price=5.00
+    )
+
+
+class SyncApiTests(TestCase):
+    """Test the delta sync endpoint"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@londonappdev.com',
+            'testpass'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def sync(self, since=None):
+        """Sync from the since cursor and return the response data"""
+        params = {} if since is None else {'since': since}
+        res = self.client.get(SYNC_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res.data
+
+    def test_login_required(self):
+        """Test syncing requires authentication"""
+        res = APIClient().get(SYNC_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_initial_sync_returns_everything(self):
+        """Test a sync without a cursor returns every object"""
+        recipe = sample_recipe(self.user)
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        recipe.tags.add(tag)
+        ingredient = Ingredients.objects.create(user=self.user, name='Rice')
+
+        data = self.sync()
+
+        self.assertEqual([r['id'] for r in data['recipes']], [recipe.id])
+        self.assertEqual(data['recipes'][0]['tags'], [tag.id])
+        self.assertEqual([t['id'] for t in data['tags']], [tag.id])
+        self.assertEqual(
+            [i['id'] for i in data['ingredients']], [ingredient.id]
+        )
+        self.assertFalse(data['has_more'])
+
+    def test_sync_returns_changes_since_cursor(self):
+        """Test only objects saved after the cursor are returned"""
+        sample_recipe(self.user, 'Unchanged')
+        changed = sample_recipe(self.user, 'Changed')
+        cursor = self.sync()['cursor']
+
+        changed.title = 'Changed again'
+        changed.save()
+        data = self.sync(cursor)
+
+        self.assertEqual([r['id'] for r in data['recipes']], [changed.id])
+        self.assertEqual(data['recipes'][0]['title'], 'Changed again')
+        self.assertEqual(data['tags'], [])
+        self.assertEqual(self.sync(data['cursor'])['recipes'], [])
+
+    def test_sync_returns_tombstones(self):
+        """Test deleted objects and cascaded link changes are reported"""
+        recipe = sample_recipe(self.user)
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        recipe.tags.add(tag)
+        deleted = sample_recipe(self.user, 'Deleted')
+        deleted_ids = (deleted.id, tag.id)
+        cursor = self.sync()['cursor']
+
+        deleted.delete()
+        tag.delete()
+        data = self.sync(cursor)
+
+        self.assertEqual(data['deleted']['recipes'], [deleted_ids[0]])
+        self.assertEqual(data['deleted']['tags'], [deleted_ids[1]])
+        self.assertEqual([r['id'] for r in data['recipes']], [recipe.id])
+        self.assertEqual(data['recipes'][0]['tags'], [])
+
+    def test_sync_pages_through_changes(self):
+        """Test a sync with more changes than fit continues from cursor"""
+        recipes = [sample_recipe(self.user, f'Recipe {i}') for i in range(5)]
+
+        seen = []
+        cursor = None
+        with patch.object(SyncViewSet, 'max_changes', 2):
+            while True:
+                data = self.sync(cursor)
+                seen.extend(r['id'] for r in data['recipes'])
+                cursor = data['cursor']
+                if not data['has_more']:
+                    break
+
+        self.assertEqual(sorted(seen), sorted(r.id for r in recipes))
+
+    def test_sync_limited_to_user(self):
+        """Test changes of other users are not returned"""
+        other = get_user_model().objects.create_user('other@appdev.com')
+        sample_recipe(other)
+
+        data = self.sync()
+
+        self.assertEqual(data['recipes'], [])
+
+    def test_sync_cost_follows_changes(self):
+        """Test a delta sync runs the same queries for a large account"""
+        seed_recipes(self.user, recipes=200, tags=20, ingredients=20)
+        cursor = self.sync()['cursor']
+        sample_recipe(self.user)
+
+        # Log, recipes with their tags, ingredients and renditions
+        with self.assertNumQueries(5):
+            data = self.sync(cursor)
+        self.assertEqual(len(data['recipes']), 1)
+
+    def test_invalid_cursor(self):
+        """Test a cursor that is not a log position is rejected"""
+        for since in ('abc', '-1', '1.-1', 'a.1'):
+            res = self.client.get(SYNC_URL, {'since': since})
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_deleting_user_drops_log(self):
+        """Test deleting a user removes their log without new entries"""
+        sample_recipe(self.user).tags.add(
+            Tag.objects.create(user=self.user, name='Vegan')
+        )
+
+        self.user.delete()
+
+        self.assertFalse(ChangeLogEntry.objects.exists())
+
+    def test_deleting_users_drops_log(self):
+        """Test deleting users in bulk adds no entries either"""
+        sample_recipe(self.user)
+
+        get_user_model().objects.filter(pk=self.user.pk).delete()
+
+        self.assertFalse(ChangeLogEntry.objects.exists())
+
+    def test_failed_user_deletion_keeps_logging(self):
+        """Test a user deletion that fails leaves logging on"""
+        Tag.objects.create(user=self.user, name='Vegan')
+
+        def fail(**kwargs):
+            raise RuntimeError
+
+        post_delete.connect(fail, sender=Tag)
+        try:
+            with self.assertRaises(RuntimeError):
+                with transaction.atomic():
+                    self.user.delete()
+        finally:
+            post_delete.disconnect(fail, sender=Tag)
+        logged = ChangeLogEntry.objects.count()
+        sample_recipe(self.user)
+
+        self.assertEqual(ChangeLogEntry.objects.count(), logged + 1)
+
+
+class SyncConcurrencyTests(TransactionTestCase):
+    """Test syncing while other transactions are writing"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@londonappdev.com',
+            'testpass'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def sync(self, since=None):
+        """Sync from the since cursor and return the response data"""
+        params = {} if since is None else {'since': since}
+        res = self.client.get(SYNC_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res.data
+
+    def test_late_commit_not_skipped(self):
+        """Test changes committed after a later cursor are still synced"""
+        written, release = threading.Event(), threading.Event()
+
+        def write_slowly():
+            try:
+                with transaction.atomic():
+                    sample_recipe(self.user, 'Slow')
+                    written.set()
+                    release.wait(10)
+            finally:
+                connection.close()
+
+        writer = threading.Thread(target=write_slowly)
+        writer.start()
+        try:
+            self.assertTrue(written.wait(10))
+            # Logged after the slow recipe, but committed before it
+            fast = sample_recipe(self.user, 'Fast')
+
+            data = self.sync()
+            self.assertEqual(data['recipes'], [])
+        finally:
+            release.set()
+            writer.join()
+
+        data = self.sync(data['cursor'])
+
+        self.assertEqual(
+            sorted(r['title'] for r in data['recipes']), ['Fast', 'Slow']
+        )
+        self.assertIn(fast.id, [r['id'] for r in data['recipes']])
+        self.assertEqual(self.sync(data['cursor'])['recipes'], [])
+
+    def test_bare_id_cursor(self):
+        """Test a cursor from before transactions were logged still works"""
+        old = sample_recipe(self.user, 'Old')
+        ChangeLogEntry.objects.update(txid=0)
+        cursor = str(ChangeLogEntry.objects.get().id)
+        sample_recipe(self.user, 'New')
+
+        data = self.sync(cursor)
+
+        self.assertEqual([r['title'] for r in data['recipes']], ['New'])
+        self.assertNotIn(old.id, [r['id'] for r in data['recipes']])
@@ -1,6 +1,8 @@
 from django.contrib.auth import get_user_model
 from django.urls import reverse
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 
 from rest_framework import status
 from rest_framework.test import APIClient
@@ -46,7 +48,7 @@ class PrivateTagsApi(TestCase):
         serializer = TagSerializer(tags, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_tags_limited_to_user(self):
         """Test that tags returned are for authenticated user"""
@@ -62,8 +64,8 @@ class PrivateTagsApi(TestCase):
         tags = Tag.objects.all().filter(user=self.user)
         serializer = TagSerializer(tags, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_create_tag_successful(self):
         """Test create tags successfull"""
@@ -96,8 +98,8 @@ class PrivateTagsApi(TestCase):
         res = self.client.get(TAGS_URL, {'assigned_only': 1})
         serializer1 = TagSerializer(tag1)
         serializer2 = TagSerializer(tag2)
-        self.assertIn(serializer1.data, res.data)
-        self.assertNotIn(serializer2.data, res.data)
+        self.assertIn(serializer1.data, res.data['results'])
+        self.assertNotIn(serializer2.data, res.data['results'])
 
     def test_retrieve_tags_assigned_unique(self):
         """Test filtering tags by assigned returns unique items"""
@@ -119,4 +121,32 @@ class PrivateTagsApi(TestCase):
         recipe2.tags.add(tag)
         res = self.client.get(TAGS_URL, {'assigned_only': 1})
 
-        self.assertEqual(len(res.data), 1)
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_assigned_only_not_an_integer(self):
+        """Test a non-integer assigned_only is rejected"""
+        res = self.client.get(TAGS_URL, {'assigned_only': 'no'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_retrieve_tags_assigned_without_distinct(self):
+        """Test assigned_only filtering uses a semi-join, not DISTINCT"""
+        tag = Tag.objects.create(user=self.user, name='Dinner')
+        for title in ['Curry', 'Stew', 'Roast']:
+            recipe = Recipe.objects.create(
+                title=title,
+                time_minutes=30,
+                price=5.00,
+                user=self.user
+            )
+            recipe.tags.add(tag)
+
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(TAGS_URL, {'assigned_only': 1})
+
+        self.assertEqual(res.data['results'], [TagSerializer(tag).data])
+        # The tag and recipe ETag aggregates run ahead of the list query
+        self.assertEqual(len(ctx.captured_queries), 3)
+        sql = ctx.captured_queries[2]['sql']
+        self.assertIn('EXISTS', sql)
+        self.assertNotIn('DISTINCT', sql)
@@ -0,0 +1,101 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Ingredients, Tag
+
+
+TAGS_URL = reverse('recipe:tag-list')
+INGREDIENTS_URL = reverse('recipe:ingredients-list')
+
+
+def has_trigram_extension():
+    """Return whether the database server ships pg_trgm"""
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'"
+        )
+        return cursor.fetchone() is not None
+
+
+class TypeaheadTests(TestCase):
+    """Test the prefix and q typeahead filters"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@londonappdev.com',
+            'testpass'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_prefix_matches_start_of_name(self):
+        """Test prefix matches case insensitively from the start"""
+        basil = Tag.objects.create(user=self.user, name='Basil')
+        Tag.objects.create(user=self.user, name='Thai basil')
+
+        res = self.client.get(TAGS_URL, {'prefix': 'bas'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, [{'id': basil.id, 'name': 'Basil'}])
+
+    def test_q_matches_anywhere_in_name(self):
+        """Test q matches names containing the text in name order"""
+        thai = Ingredients.objects.create(user=self.user, name='Thai basil')
+        basil = Ingredients.objects.create(user=self.user, name='Basil')
+        Ingredients.objects.create(user=self.user, name='Salt')
+
+        res = self.client.get(INGREDIENTS_URL, {'q': 'BASIL'})
+
+        self.assertEqual(
+            [row['id'] for row in res.data], [basil.id, thai.id]
+        )
+
+    def test_typeahead_limited_to_user(self):
+        """Test names of other users are not suggested"""
+        other = get_user_model().objects.create_user('other@appdev.com')
+        Tag.objects.create(user=other, name='Basil')
+
+        res = self.client.get(TAGS_URL, {'prefix': 'bas'})
+
+        self.assertEqual(res.data, [])
+
+    def test_typeahead_limit(self):
+        """Test results are capped by limit and never exceed the maximum"""
+        Tag.objects.bulk_create(
+            Tag(user=self.user, name=f'Tag {i:02}') for i in range(30)
+        )
+
+        res = self.client.get(TAGS_URL, {'prefix': 'tag'})
+        self.assertEqual(len(res.data), 10)
+        res = self.client.get(TAGS_URL, {'prefix': 'tag', 'limit': 3})
+        self.assertEqual(len(res.data), 3)
+        res = self.client.get(TAGS_URL, {'prefix': 'tag', 'limit': 500})
+        self.assertEqual(len(res.data), 20)
+
+    def test_typeahead_single_query(self):
+        """Test each keystroke runs a single query"""
+        Tag.objects.create(user=self.user, name='Basil')
+
+        with self.assertNumQueries(1):
+            self.client.get(TAGS_URL, {'prefix': 'b'})
+
+    def test_trigram_indexes_used(self):
+        """Test the typeahead filters can be served by trigram indexes"""
+        if not has_trigram_extension():
+            self.skipTest('requires pg_trgm')
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+        for model, index in ((Tag, 'core_tag_upper_name_trgm_idx'),
+                             (Ingredients,
+                              'core_ingredients_upper_name_trgm_idx')):
+            for lookup in ('name__istartswith', 'name__icontains'):
+                plan = model.objects.filter(**{lookup: 'bas'}).explain()
+
+                self.assertIn(index, plan)
@@ -1,32 +1,101 @@
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import transaction
+from django.db.models import (
+    Count, Exists, F, FloatField, OuterRef, Q
+)
+from django.db.models.functions import Cast
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
 from rest_framework import viewsets, mixins, status
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 
-from core.models import Tag, Ingredients, Recipe
+from core.authentication import CachedTokenAuthentication
+from core.cache import CachedListMixin, CachedRetrieveMixin, response_cache
+from core.conditional import ConditionalListMixin, ConditionalDetailMixin
+from core.fieldsets import SparseFieldsetMixin
+from core.metrics import SerializerTimingMixin, metrics
+from core.models import (
+    SEARCH_CONFIG, Tag, Ingredients, Recipe, RecipeImageRendition,
+    ChangeLogEntry, quiet_changes
+)
 
-from recipe import serializers
+from recipe import serializers, pagination, images, export
 
 
-class BaseRecipeViewSetAttr(viewsets.GenericViewSet,
+class BaseRecipeViewSetAttr(ConditionalListMixin,
+                            CachedListMixin,
+                            SerializerTimingMixin,
+                            viewsets.GenericViewSet,
                             mixins.ListModelMixin,
                             mixins.CreateModelMixin):
     """Base class for Tag and Ingredient viewset"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
+    pagination_class = pagination.NamePagination
+
+    typeahead_limit = 10
+    max_typeahead_limit = 20
 
     def get_queryset(self):
         """Returns object for authenticated user only"""
-        assigned_only = bool(
-            int(self.request.query_params.get('assigned_only', 0))
-        )
-        queryset = self.queryset
-        if assigned_only:
-            queryset = queryset.filter(recipe__isnull=False)
-        return queryset.filter(
-            user=self.request.user
-        ).order_by('-name').distinct()
+        prefix = self.request.query_params.get('prefix')
+        q = self.request.query_params.get('q')
+        queryset = self.queryset.filter(user=self.request.user)
+        # Both are ILIKE patterns served by the pg_trgm index on name
+        if prefix:
+            queryset = queryset.filter(name__istartswith=prefix)
+        if q:
+            queryset = queryset.filter(name__icontains=q)
+        if self._assigned_only():
+            # A semi-join on the through table returns each object once,
+            # without joining every recipe link and de-duplicating them
+            queryset = queryset.annotate(
+                assigned=Exists(self._recipe_links())
+            ).filter(assigned=True)
+        return queryset.order_by('-name')
+
+    def get_etag_querysets(self):
+        """Include recipes, whose links decide what assigned_only lists"""
+        querysets = super().get_etag_querysets()
+        if self._assigned_only():
+            querysets.append(Recipe.objects.filter(user=self.request.user))
+        return querysets
+
+    def _assigned_only(self):
+        """Return whether only objects assigned to a recipe are listed"""
+        try:
+            return bool(int(self.request.query_params.get('assigned_only', 0)))
+        except ValueError:
+            raise ValidationError({'assigned_only': ['Must be 0 or 1.']})
+
+    def _recipe_links(self):
+        """Return the recipe links of the outer queryset's object"""
+        rel = self.queryset.model._meta.get_field('recipe')
+        return rel.through.objects.filter(**{
+            rel.field.m2m_reverse_field_name(): OuterRef('pk')
+        })
+
+    def list(self, request, *args, **kwargs):
+        """List objects, or the first few matches when typing ahead"""
+        params = request.query_params
+        if 'prefix' not in params and 'q' not in params:
+            return super().list(request, *args, **kwargs)
+
+        try:
+            limit = int(params.get('limit', self.typeahead_limit))
+        except ValueError:
+            limit = self.typeahead_limit
+        limit = max(1, min(limit, self.max_typeahead_limit))
+        rows = self.get_queryset().order_by('name', 'id').values(
+            'id', 'name'
+        )[:limit]
+        with metrics.timing('serialize'):
+            data = serializers.NameSerializer(rows, many=True).data
+        return Response(data)
 
     def perform_create(self, serializer):
         """Create a new object"""
@@ -45,12 +114,23 @@ class IngredientViewSet(BaseRecipeViewSetAttr):
     serializer_class = serializers.IngredientSerializer
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(ConditionalListMixin, ConditionalDetailMixin,
+                    CachedListMixin, CachedRetrieveMixin,
+                    SerializerTimingMixin, SparseFieldsetMixin,
+                    viewsets.ModelViewSet):
     """Manage recipes in database"""
     serializer_class = serializers.RecipeSerializer
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
+    pagination_class = pagination.RecipePagination
     queryset = Recipe.objects.all()
+    MATCH_ANY = 'any'
+    MATCH_ALL = 'all'
+    expandable_fields = {
+        'tags': serializers.TagSerializer,
+        'ingredients': serializers.IngredientSerializer,
+    }
+    export_chunk_size = export.CHUNK_SIZE
 
     def _params_to_ints(self, qs):
         """Convert a list of string ids into a list of integers"""
@@ -60,30 +140,92 @@ class RecipeViewSet(viewsets.ModelViewSet):
         """Return recipes for authenticated user only"""
         tags = self.request.query_params.get('tags')
         ingredients = self.request.query_params.get('ingredients')
+        search = self.request.query_params.get('search')
         queryset = self.queryset
+        if search:
+            query = SearchQuery(search, config=SEARCH_CONFIG)
+            # Cast the float4 rank to float8 so it survives the round trip
+            # through the pagination cursor exactly
+            queryset = queryset.filter(search_vector=query).annotate(
+                rank=Cast(SearchRank(F('search_vector'), query), FloatField())
+            )
+        match = self.request.query_params.get('match', self.MATCH_ANY)
+        if match not in (self.MATCH_ANY, self.MATCH_ALL):
+            raise ValidationError(
+                {'match': [f'Must be {self.MATCH_ANY} or {self.MATCH_ALL}.']}
+            )
         if tags:
             tag_ids = self._params_to_ints(tags)
-            queryset = queryset.filter(tags__id__in=tag_ids)
+            queryset = self._filter_linked(queryset, 'tags', tag_ids, match)
         if ingredients:
             ingredients_ids = self._params_to_ints(ingredients)
-            queryset = queryset.filter(ingredients__id__in=ingredients_ids)
+            queryset = self._filter_linked(
+                queryset, 'ingredients', ingredients_ids, match
+            )
+        if self.action in ('list', 'retrieve'):
+            # Load every recipe's tags, ingredients and renditions in one
+            # query per relation rather than one query per recipe, and
+            # with ?fields= or ?omit= only what is asked for
+            queryset = queryset.prefetch_related(*self.get_sparse_relations(
+                ('tags', 'ingredients', 'renditions')
+            ))
+            columns = self.get_sparse_columns()
+            if columns is not None:
+                queryset = queryset.only(*columns)
 
         return queryset.filter(
             user=self.request.user
         )
 
+    def _filter_linked(self, queryset, field, ids, match):
+        """
+        Filter recipes linked to any or all of ids through an M2M field
+
+        Both run against the through table in a subquery, so each recipe
+        comes back once however many of the ids it is linked to, and
+        filtering on tags and ingredients does not join the two tables.
+        """
+        rel = Recipe._meta.get_field(field)
+        recipe_field = rel.m2m_field_name()
+        target_field = rel.m2m_reverse_field_name()
+        links = rel.remote_field.through.objects.filter(**{
+            f'{target_field}__in': ids
+        })
+        if match == self.MATCH_ALL:
+            matched = links.values(recipe_field).annotate(
+                linked=Count(target_field)
+            ).filter(linked=len(set(ids))).values(recipe_field)
+            return queryset.filter(pk__in=matched)
+        return queryset.annotate(**{
+            f'has_{field}': Exists(links.filter(**{
+                recipe_field: OuterRef('pk')
+            }))
+        }).filter(**{f'has_{field}': True})
+
     def get_serializer_class(self):
         """Return appropriate serializer class"""
         if self.action == 'retrieve':
             return serializers.RecipeDetailSerializer
         elif self.action == 'upload_image':
             return serializers.RecipeImageSerializer
+        elif self.action == 'bulk':
+            if self.request.method == 'DELETE':
+                return serializers.RecipeBulkDeleteSerializer
+            if self.request.method in ('PUT', 'PATCH'):
+                return serializers.RecipeBulkUpdateSerializer
+            return serializers.RecipeBulkSerializer
         return self.serializer_class
 
     def perform_create(self, serializer):
         """Create a new recipe"""
         serializer.save(user=self.request.user)
 
+    def perform_content_negotiation(self, request, force=False):
+        """Leave ?format= to the file actions rather than the renderers"""
+        if self.action in ('image', 'export_recipes'):
+            force = True
+        return super().perform_content_negotiation(request, force)
+
     @action(methods=['POST'], detail=True, url_path='upload-image')
     def upload_image(self, request, pk=None):
         """Upload an image to a recipe"""
@@ -93,7 +235,10 @@ class RecipeViewSet(viewsets.ModelViewSet):
             data=request.data
         )
         if serializer.is_valid():
-            serializer.save()
+            # Only the upload is stored here, decoding and resizing happen
+            # on a worker once the transaction commits
+            serializer.save(image_status=Recipe.IMAGE_PENDING)
+            images.schedule_renditions(recipe.id)
             return Response(
                 serializer.data,
                 status=status.HTTP_200_OK
@@ -102,3 +247,202 @@ class RecipeViewSet(viewsets.ModelViewSet):
             serializer.errors,
             status=status.HTTP_400_BAD_REQUEST
         )
+
+    @action(methods=['POST', 'PUT', 'PATCH', 'DELETE'], detail=False,
+            url_path='bulk')
+    def bulk(self, request):
+        """Create, update or delete many recipes in one request"""
+        if request.method == 'DELETE':
+            serializer = self.get_serializer(data=request.data)
+            serializer.is_valid(raise_exception=True)
+            user_id = request.user.pk
+            # One tombstone statement and one bump rather than a change log
+            # insert and a bump per recipe from the post_delete receivers
+            with transaction.atomic(), quiet_changes(user_id):
+                ids = list(self.get_queryset().filter(
+                    id__in=serializer.validated_data['ids']
+                ).values_list('id', flat=True))
+                Recipe.objects.filter(pk__in=ids).delete()
+                ChangeLogEntry.objects.record(
+                    user_id, ChangeLogEntry.RECIPE, ids, deleted=True
+                )
+            response_cache.bump(user_id)
+            return Response(status=status.HTTP_204_NO_CONTENT)
+
+        if request.method in ('PUT', 'PATCH'):
+            serializer = self.get_serializer(
+                self.get_queryset(), data=request.data, many=True,
+                partial=request.method == 'PATCH'
+            )
+            serializer.is_valid(raise_exception=True)
+            serializer.save()
+            # Written without the signals that invalidate the cache
+            response_cache.bump(self.request.user.pk)
+            return Response({'updated': [
+                item['id'] for item in serializer.validated_data
+            ]})
+
+        serializer = self.get_serializer(data=request.data, many=True)
+        if serializer.is_valid():
+            recipes = serializer.save(user=self.request.user)
+            # bulk_create sends no signals to invalidate the cache with
+            response_cache.bump(self.request.user.pk)
+            return Response(
+                {'created': [recipe.id for recipe in recipes]},
+                status=status.HTTP_201_CREATED
+            )
+        return Response(
+            serializer.errors,
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    @action(methods=['GET'], detail=True, url_path='image')
+    def image(self, request, pk=None):
+        """
+        Serve the rendition closest to ?size= in ?format=
+
+        The smallest rendition at least size pixels wide and high is sent,
+        or the largest one if none is. Without ?format= WebP is sent to
+        clients that accept it. Rendition urls carry the content hash as
+        ?v=, responses to them can be cached for good. Other urls may be
+        served another rendition later, so they are revalidated by ETag.
+        """
+        recipe = self.get_object()
+        fmt = request.query_params.get('format')
+        if fmt not in dict(RecipeImageRendition.FORMAT_CHOICES):
+            fmt = RecipeImageRendition.JPEG
+            if 'image/webp' in request.META.get('HTTP_ACCEPT', ''):
+                fmt = RecipeImageRendition.WEBP
+        try:
+            size = int(request.query_params.get('size', 0))
+        except ValueError:
+            size = 0
+
+        renditions = sorted(
+            recipe.renditions.filter(format=fmt), key=lambda r: r.size
+        )
+        if not renditions:
+            return Response(status=status.HTTP_404_NOT_FOUND)
+        rendition = next(
+            (r for r in renditions if r.size >= size), renditions[-1]
+        )
+
+        etag = f'"{rendition.content_hash}"'
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH', '')
+        if etag in (tag.strip() for tag in if_none_match.split(',')):
+            response = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+        elif settings.RECIPE_IMAGE_SENDFILE == 'x-accel-redirect':
+            response = HttpResponse(content_type=f'image/{fmt}')
+            response['X-Accel-Redirect'] = (
+                settings.RECIPE_IMAGE_ACCEL_PREFIX + rendition.image.name
+            )
+        elif settings.RECIPE_IMAGE_SENDFILE == 'x-sendfile':
+            response = HttpResponse(content_type=f'image/{fmt}')
+            response['X-Sendfile'] = rendition.image.path
+        else:
+            response = FileResponse(
+                rendition.image.open('rb'), content_type=f'image/{fmt}'
+            )
+        response['ETag'] = etag
+        if request.query_params.get('v') == rendition.content_hash[:16]:
+            response['Cache-Control'] = (
+                'private, max-age=31536000, immutable'
+            )
+        else:
+            response['Cache-Control'] = 'private, no-cache'
+        patch_vary_headers(response, ('Accept',))
+        return response
+
+    @action(methods=['GET'], detail=False, url_path='export',
+            url_name='export')
+    def export_recipes(self, request):
+        """Stream every recipe of the user as ?format=ndjson or csv"""
+        fmt = request.query_params.get('format', 'ndjson')
+        if fmt not in export.FORMATS:
+            raise ValidationError(
+                {'format': [f"Must be one of {', '.join(export.FORMATS)}."]}
+            )
+        content_type, encode = export.FORMATS[fmt]
+        response = StreamingHttpResponse(
+            encode(export.iter_recipes(request.user, self.export_chunk_size)),
+            content_type=content_type
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="recipes.{fmt}"'
+        )
+        return response
+
+
+class SyncViewSet(viewsets.GenericViewSet):
+    """
+    Return the recipes, tags and ingredients changed since a cursor
+
+    The cursor is the transaction and id of the last change log entry a
+    client has seen, entries of transactions still running are left for a
+    later sync so none commits behind a cursor. Only the log entries after
+    it are read, so a sync costs as much as the changes it returns.
+    Objects saved since are returned in full and objects deleted since are
+    listed as tombstones under "deleted". While has_more is true the client
+    should sync again from the new cursor.
+    """
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+    queryset = ChangeLogEntry.objects.committed()
+    max_changes = 1000
+    # Change log kind, response key, queryset and serializer of each model
+    kinds = (
+        (ChangeLogEntry.RECIPE, 'recipes',
+         Recipe.objects.prefetch_related('tags', 'ingredients', 'renditions'),
+         serializers.RecipeSerializer),
+        (ChangeLogEntry.TAG, 'tags',
+         Tag.objects.all(), serializers.TagSerializer),
+        (ChangeLogEntry.INGREDIENT, 'ingredients',
+         Ingredients.objects.all(), serializers.IngredientSerializer),
+    )
+
+    def list(self, request):
+        """Return the changes after the ?since= cursor"""
+        since = request.query_params.get('since', '0')
+        txid, entry_id = self.parse_cursor(since)
+
+        entries = list(self.queryset.filter(
+            Q(txid=txid, id__gt=entry_id) | Q(txid__gt=txid),
+            user=request.user
+        ).order_by('txid', 'id').values_list(
+            'txid', 'id', 'kind', 'object_id'
+        )[:self.max_changes + 1])
+        has_more = len(entries) > self.max_changes
+        entries = entries[:self.max_changes]
+        changed = {kind: set() for kind, _, _, _ in self.kinds}
+        for _, _, kind, object_id in entries:
+            changed[kind].add(object_id)
+
+        data = {
+            'cursor': '{}.{}'.format(*entries[-1][:2]) if entries else since,
+            'has_more': has_more,
+            'deleted': {},
+        }
+        context = self.get_serializer_context()
+        for kind, key, queryset, serializer_class in self.kinds:
+            ids = changed[kind]
+            objs = list(queryset.filter(
+                user=request.user, pk__in=ids
+            )) if ids else []
+            with metrics.timing('serialize'):
+                data[key] = serializer_class(
+                    objs, many=True, context=context
+                ).data
+            data['deleted'][key] = sorted(ids - {obj.pk for obj in objs})
+        return Response(data)
+
+    def parse_cursor(self, since):
+        """Return the transaction and entry id of a ?since= cursor"""
+        # Cursors from before entries had a transaction are a bare id
+        txid, _, entry_id = since.rpartition('.')
+        try:
+            cursor = int(txid or 0), int(entry_id)
+        except ValueError:
+            cursor = (-1, -1)
+        if min(cursor) < 0:
+            raise ValidationError({'since': ['Invalid cursor.']})
+        return cursor
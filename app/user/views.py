@@ -1,10 +1,14 @@
-from rest_framework import generics, authentication, permissions
+from rest_framework import generics, permissions
 from rest_framework.authtoken.views import ObtainAuthToken
+from rest_framework.exceptions import ValidationError
 from rest_framework.settings import api_settings
+from core.authentication import CachedTokenAuthentication
+from core.metrics import SerializerTimingMixin
+from core.throttling import LoginThrottle
 from user.serializers import UserSerializer, AuthTokenSerializer
 
 
-class CreateUserView(generics.CreateAPIView):
+class CreateUserView(SerializerTimingMixin, generics.CreateAPIView):
     """ create a new user in the system"""
     serializer_class = UserSerializer
 
@@ -13,12 +17,25 @@ class CreateTokenView(ObtainAuthToken):
     """Create a new auth token for user"""
     serializer_class = AuthTokenSerializer
     renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
+    throttle_classes = (LoginThrottle,)
 
+    def post(self, request, *args, **kwargs):
+        """Count the attempt towards the login throttle"""
+        throttle = LoginThrottle()
+        try:
+            response = super().post(request, *args, **kwargs)
+        except ValidationError:
+            throttle.failed(request)
+            raise
+        throttle.succeeded(request)
+        return response
 
-class ManageUserView(generics.RetrieveUpdateAPIView):
+
+class ManageUserView(SerializerTimingMixin,
+                     generics.RetrieveUpdateAPIView):
     """Manage the authenticated user"""
     serializer_class = UserSerializer
-    authentication_classes = (authentication.TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (permissions.IsAuthenticated,)
 
     def get_object(self):